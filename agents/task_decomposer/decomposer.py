@@ -18,6 +18,15 @@ class TaskDecomposerAgent(BaseModel):
     plan_namespace: str | None = None
 
     def decompose(self, plan: Any) -> TaskGraph:
+        if isinstance(plan, str) and plan.endswith(".ndjson") and Path(plan).is_file():
+            # A TaskGraph written by write_ndjson(): stream it instead of parsing it whole
+            with open(plan, encoding="utf-8") as f:
+                g = TaskGraph.read_ndjson(f)
+            if self.plan_namespace:
+                g.plan_id = self.plan_namespace
+            g.validate_acyclic()
+            return g
+
         data = self._load_plan(plan)
         plan_id = self.plan_namespace or self._compute_plan_id(data)
 
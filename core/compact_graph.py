@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import sys
+from array import array
+from typing import Any, get_args
+
+from core.task_graph import Artifact, Task, TaskGraph, TaskType
+
+TASK_TYPES: tuple[str, ...] = get_args(TaskType)
+_TYPE_CODES = {t: i for i, t in enumerate(TASK_TYPES)}
+_NO_DETAILS: tuple[dict[str, Any], list[Artifact], list[Artifact]] = ({}, [], [])
+
+
+class CompactTaskGraph:
+    """Array-backed form of a TaskGraph for very large plans.
+
+    Tasks are numbered 0..n-1 in TaskGraph order. Ids and names are interned strings,
+    types are one byte each, and edges are kept in CSR form: the dependencies of task i
+    are ``deps[deps_offsets[i]:deps_offsets[i + 1]]``, in depends_on order, and its
+    dependents are ``dependents[dependents_offsets[i]:dependents_offsets[i + 1]]``,
+    sorted by id. A dependency on an id outside the graph is stored as ``-1 - k``,
+    ``k`` indexing ``external_ids``; as in TaskGraph, such a task can never be ready,
+    so the graph does not validate.
+
+    Params and artifacts are only kept for tasks that have them, and are shared with
+    the Task models converted from or to, not copied.
+    """
+
+    __slots__ = (
+        "plan_id",
+        "ids",
+        "names",
+        "types",
+        "explicit_ids",
+        "details",
+        "external_ids",
+        "deps_offsets",
+        "deps",
+        "dependents_offsets",
+        "dependents",
+        "_index_of",
+        "_by_id",
+        "_rank",
+    )
+
+    def __init__(
+        self,
+        plan_id: str,
+        ids: list[str],
+        names: list[str],
+        types: array,
+        explicit_ids: array,
+        details: dict[int, tuple[dict[str, Any], list[Artifact], list[Artifact]]],
+        external_ids: list[str],
+        deps_offsets: array,
+        deps: array,
+    ):
+        """Initialize from arrays; from_task_graph() is the usual way to build one.
+
+        Args:
+            plan_id: Plan namespace of the task ids
+            ids: Task ids, by task index
+            names: Task names, by task index
+            types: Index into TASK_TYPES of each task's type
+            explicit_ids: 1 where the Task had its id set, 0 where it was computed
+            details: (params, inputs, outputs) of the tasks that have any
+            external_ids: Dependency ids not in the graph
+            deps_offsets: CSR offsets into deps, n + 1 entries
+            deps: Dependency task indices, or -1 - k for external_ids[k]
+
+        Raises:
+            ValueError: If two tasks have the same id
+        """
+        self.plan_id = plan_id
+        self.ids = ids
+        self.names = names
+        self.types = types
+        self.explicit_ids = explicit_ids
+        self.details = details
+        self.external_ids = external_ids
+        self.deps_offsets = deps_offsets
+        self.deps = deps
+        self._index_of = {tid: i for i, tid in enumerate(ids)}
+        if len(self._index_of) != len(ids):
+            raise ValueError("CompactTaskGraph requires unique task ids")
+
+        # Task indices sorted by id, and each task's rank in that order: topological
+        # order breaks ties by id
+        n = len(ids)
+        self._by_id = array("l", sorted(range(n), key=ids.__getitem__))
+        rank = array("l", [0]) * n
+        for r, i in enumerate(self._by_id):
+            rank[i] = r
+        self._rank = rank
+
+        # Reverse the edges: count dependents per task, then fill each task's slice
+        counts = [0] * (n + 1)
+        for d in deps:
+            if d >= 0:
+                counts[d + 1] += 1
+        offsets = array("l", counts)
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+        dependents = array("l", [0]) * offsets[n]
+        fill = offsets[:-1]  # next free slot in each task's slice
+        for i in range(n):
+            for j in range(deps_offsets[i], deps_offsets[i + 1]):
+                d = deps[j]
+                if d >= 0:
+                    dependents[fill[d]] = i
+                    fill[d] += 1
+        for i in range(n):
+            start, end = offsets[i], offsets[i + 1]
+            if end - start > 1:
+                ordered = sorted(dependents[start:end], key=rank.__getitem__)
+                dependents[start:end] = array("l", ordered)
+        self.dependents_offsets = offsets
+        self.dependents = dependents
+
+    @classmethod
+    def from_task_graph(cls, graph: TaskGraph) -> CompactTaskGraph:
+        """Build the compact form of a TaskGraph."""
+        ids = [sys.intern(tid) for tid in graph.task_ids()]
+        index_of = {tid: i for i, tid in enumerate(ids)}
+        names: list[str] = []
+        types = array("B")
+        explicit_ids = array("B")
+        details: dict[int, tuple[dict[str, Any], list[Artifact], list[Artifact]]] = {}
+        external: dict[str, int] = {}
+        deps_offsets = array("l", [0])
+        deps = array("l")
+        for i, t in enumerate(graph.tasks):
+            names.append(sys.intern(t.name))
+            types.append(_TYPE_CODES[t.type])
+            explicit_ids.append(1 if t.id else 0)
+            if t.params or t.inputs or t.outputs:
+                details[i] = (t.params, t.inputs, t.outputs)
+            for dep in t.depends_on:
+                d = index_of.get(dep)
+                if d is None:
+                    d = -1 - external.setdefault(dep, len(external))
+                deps.append(d)
+            deps_offsets.append(len(deps))
+        return cls(
+            graph.plan_id,
+            ids,
+            names,
+            types,
+            explicit_ids,
+            details,
+            list(external),
+            deps_offsets,
+            deps,
+        )
+
+    def to_task_graph(self) -> TaskGraph:
+        """Rebuild the TaskGraph this graph was built from."""
+        ids, deps, offsets, external = self.ids, self.deps, self.deps_offsets, self.external_ids
+        tasks = []
+        for i, tid in enumerate(ids):
+            params, inputs, outputs = self.details.get(i, _NO_DETAILS)
+            depends_on = [
+                ids[d] if d >= 0 else external[-1 - d] for d in deps[offsets[i] : offsets[i + 1]]
+            ]
+            tasks.append(
+                Task.model_construct(
+                    name=self.names[i],
+                    type=TASK_TYPES[self.types[i]],
+                    params=dict(params),
+                    inputs=list(inputs),
+                    outputs=list(outputs),
+                    depends_on=depends_on,
+                    id=tid if self.explicit_ids[i] else None,
+                )
+            )
+        return TaskGraph(plan_id=self.plan_id, tasks=tasks)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def index(self, task_id: str) -> int:
+        """Index of the task with this id.
+
+        Raises:
+            KeyError: If no task has this id
+        """
+        return self._index_of[task_id]
+
+    def _in_degrees(self) -> array:
+        offsets = self.deps_offsets
+        return array("l", [offsets[i + 1] - offsets[i] for i in range(len(self.ids))])
+
+    def topological_indices(self) -> array | None:
+        """Task indices in the same order as TaskGraph.topological_order(); None on a cycle."""
+        indeg = self._in_degrees()
+        offsets, dependents = self.dependents_offsets, self.dependents
+        order = array("l", [i for i in self._by_id if indeg[i] == 0])
+        head = 0
+        while head < len(order):
+            u = order[head]
+            head += 1
+            for v in dependents[offsets[u] : offsets[u + 1]]:
+                indeg[v] -= 1
+                if indeg[v] == 0:
+                    order.append(v)
+        return order if len(order) == len(self.ids) else None
+
+    def validate_acyclic(self) -> None:
+        if self.topological_indices() is None:
+            raise ValueError("TaskGraph has at least one cycle")
+
+    def topological_order(self) -> list[str]:
+        order = self.topological_indices()
+        if order is None:
+            raise ValueError("TaskGraph has at least one cycle")
+        ids = self.ids
+        return [ids[i] for i in order]
+
+    def level_indices(self) -> array:
+        """Level of each task: 0 without dependencies, else 1 + its deepest dependency.
+
+        Raises:
+            ValueError: If the graph has a cycle
+        """
+        order = self.topological_indices()
+        if order is None:
+            raise ValueError("TaskGraph has at least one cycle")
+        level = array("l", [0]) * len(order)
+        offsets, dependents = self.dependents_offsets, self.dependents
+        for u in order:
+            next_level = level[u] + 1
+            for v in dependents[offsets[u] : offsets[u + 1]]:
+                if level[v] < next_level:
+                    level[v] = next_level
+        return level
+
+    def levels(self) -> list[list[str]]:
+        """Task ids grouped by level, each level sorted by id.
+
+        The tasks of a level depend only on tasks of earlier levels, so they can run in
+        parallel once those are done.
+
+        Raises:
+            ValueError: If the graph has a cycle
+        """
+        level = self.level_indices()
+        groups: list[list[str]] = [[] for _ in range(max(level) + 1)] if level else []
+        ids = self.ids
+        for i in self._by_id:
+            groups[level[i]].append(ids[i])
+        return groups
@@ -1,8 +1,55 @@
-import uuid
-from datetime import datetime
+import random
+import threading
+import time
+from datetime import UTC, datetime, timedelta
 from typing import Any
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+# ULIDs are 26 Crockford base32 chars (130 bits, the top 2 unused): a 48-bit millisecond
+# timestamp then 80 random bits. Encoding goes 10 bits (2 chars) at a time.
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_PAIRS = [a + b for a in _CROCKFORD for b in _CROCKFORD]
+_RANDOM_BITS = 80
+_LOW_BITS = 20  # ids from one millisecond differ only here until a carry
+_ulid_lock = threading.Lock()
+_ulid_ms = 0
+_ulid_rand = 0
+_ulid_prefix: tuple[int, str] = (-1, "")
+
+
+def _encode_pairs(value: int, pairs: int) -> str:
+    return "".join([_PAIRS[(value >> s) & 0x3FF] for s in range(10 * (pairs - 1), -1, -10)])
+
+
+def new_event_id() -> str:
+    """Return a ULID: unique, and sorting in creation order within this process.
+
+    Ids created in the same millisecond increment the random part of the previous one
+    instead of drawing new bits, so they stay strictly increasing.
+    """
+    global _ulid_ms, _ulid_rand, _ulid_prefix
+    now = time.time_ns() // 1_000_000
+    with _ulid_lock:
+        if now > _ulid_ms:
+            _ulid_ms = now
+            _ulid_rand = random.getrandbits(_RANDOM_BITS)
+        else:
+            # Same millisecond, or the clock went backwards: keep counting up
+            _ulid_rand += 1
+            if _ulid_rand >> _RANDOM_BITS:
+                _ulid_ms += 1
+                _ulid_rand = 0
+        value = (_ulid_ms << _RANDOM_BITS) | _ulid_rand
+        high = value >> _LOW_BITS
+        if _ulid_prefix[0] != high:
+            _ulid_prefix = (high, _encode_pairs(high, 11))
+        return _ulid_prefix[1] + _PAIRS[(value >> 10) & 0x3FF] + _PAIRS[value & 0x3FF]
+
+
+def _utcnow() -> datetime:
+    """Current time as a naive UTC datetime, the timestamp convention of events."""
+    return datetime.now(UTC).replace(tzinfo=None)
 
 
 class BaseEvent(BaseModel):
@@ -10,8 +57,8 @@ class BaseEvent(BaseModel):
 
     type: str = "event"
     data: Any = None
-    id: str = str(uuid.uuid4())
-    timestamp: datetime = datetime.utcnow()
+    id: str = Field(default_factory=new_event_id)
+    timestamp: datetime = Field(default_factory=_utcnow)
     correlation_id: str | None = None
 
 
@@ -45,3 +92,78 @@ class EscalationNeededEvent(BaseEvent):
     type: str = "escalation.needed"
     task_id: str
     reason: str
+
+
+_EPOCH = datetime(1970, 1, 1)
+_models: dict[str, type[BaseEvent]] = {}
+
+
+def model_for(event_type: str) -> type[BaseEvent]:
+    """The BaseEvent subclass declaring event_type as its default type, or BaseEvent."""
+    cls = _models.get(event_type)
+    if cls is None:
+        # Rescan on a miss so subclasses defined later are found
+        pending = list(BaseEvent.__subclasses__())
+        while pending:
+            sub = pending.pop()
+            pending.extend(sub.__subclasses__())
+            _models.setdefault(sub.model_fields["type"].default, sub)
+        cls = _models.get(event_type, BaseEvent)
+    return cls
+
+
+class LiteEvent:
+    """Unvalidated event for internal hot paths.
+
+    A plain __slots__ object: nothing is validated on construction, the timestamp is
+    kept as integer epoch nanoseconds and turned into a datetime only when read, and
+    type-specific fields (task_id, agent_id...) are read as attributes. The bus, WAL
+    and codecs accept it wherever they take a BaseEvent. to_model() builds and
+    validates the pydantic event at API boundaries.
+    """
+
+    __slots__ = ("type", "data", "id", "ts_ns", "correlation_id", "fields")
+
+    def __init__(
+        self,
+        type: str,
+        data: Any = None,
+        correlation_id: str | None = None,
+        **fields: Any,
+    ):
+        self.type = type
+        self.data = data
+        self.correlation_id = correlation_id
+        self.fields = fields
+        self.id = new_event_id()
+        self.ts_ns = time.time_ns()
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for names that are not slots (or unset ones, e.g. while copying)
+        try:
+            return object.__getattribute__(self, "fields")[name]
+        except (KeyError, AttributeError):
+            raise AttributeError(name) from None
+
+    def __repr__(self) -> str:
+        return f"LiteEvent(type={self.type!r}, id={self.id!r}, fields={self.fields!r})"
+
+    @property
+    def timestamp(self) -> datetime:
+        return _EPOCH + timedelta(microseconds=self.ts_ns // 1000)
+
+    def to_model(self) -> BaseEvent:
+        """Validate into the pydantic event class registered for this type."""
+        return model_for(self.type)(
+            type=self.type,
+            data=self.data,
+            id=self.id,
+            timestamp=self.timestamp,
+            correlation_id=self.correlation_id,
+            **self.fields,
+        )
+
+
+def as_model(event: BaseEvent | LiteEvent) -> BaseEvent:
+    """Return event as a pydantic BaseEvent, converting a LiteEvent."""
+    return event.to_model() if isinstance(event, LiteEvent) else event
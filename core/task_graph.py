@@ -3,9 +3,11 @@ from __future__ import annotations
 import hashlib
 import json
 from collections import defaultdict, deque
-from typing import Any, Literal
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from typing import IO, Any, Literal
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, PrivateAttr, field_validator
 
 TaskType = Literal["generate_code", "assemble", "validate", "test", "package", "deploy", "custom"]
 
@@ -18,6 +20,58 @@ def _sha256_hex(s: str) -> str:
     return hashlib.sha256(s.encode("utf-8")).hexdigest()
 
 
+def _task_digest(canonical_task: dict[str, Any]) -> int:
+    payload = _canonical(canonical_task).encode("utf-8")
+    return int.from_bytes(hashlib.sha256(payload).digest())
+
+
+def _root_hash(plan_id: str, digests: list[int]) -> str:
+    """SHA-256 of the plan id, the task count and the sorted task digests."""
+    digests = sorted(digests)
+    h = hashlib.sha256(_canonical({"plan_id": plan_id, "count": len(digests)}).encode("utf-8"))
+    h.update(b"".join(d.to_bytes(32) for d in digests))
+    return h.hexdigest()
+
+
+NDJSON_FORMAT = "taskgraph-ndjson/1"
+
+
+_MISSING = object()
+
+
+def _snapshot(value: Any) -> Any:
+    """Copy of a JSON-like value that later in-place changes to value do not affect."""
+    if type(value) is dict:
+        return {k: _snapshot(v) for k, v in value.items()}
+    if type(value) is list:
+        return [_snapshot(v) for v in value]
+    return value
+
+
+def _same(a: Any, b: Any) -> bool:
+    """Whether two JSON-like values are equal and of the same types throughout.
+
+    Unlike ==, 1, 1.0 and True differ: their canonical JSON does.
+    """
+    cls = type(a)
+    if cls is not type(b):
+        return False
+    if cls is dict:
+        if len(a) != len(b):
+            return False
+        for k, v in a.items():
+            # Scalars are compared here rather than in a recursive call: params are
+            # checked on every graph call
+            w = b.get(k, _MISSING)
+            c = type(v)
+            if c is not type(w) or (not _same(v, w) if c is dict or c is list else v != w):
+                return False
+        return True
+    if cls is list:
+        return len(a) == len(b) and all(map(_same, a, b))
+    return a == b
+
+
 class Artifact(BaseModel):
     name: str
     kind: Literal["input", "output"] = "output"
@@ -60,7 +114,9 @@ class Task(BaseModel):
         return _sha256_hex(payload)[:16]
 
     def canonical(self, namespace: str) -> dict[str, Any]:
-        tid = self.compute_id(namespace)
+        return self._canonical(self.compute_id(namespace))
+
+    def _canonical(self, tid: str) -> dict[str, Any]:
         return {
             "id": tid,
             "name": self.name,
@@ -72,82 +128,443 @@ class Task(BaseModel):
         }
 
 
+@dataclass(slots=True)
+class TaskGraphDiff:
+    """Task ids added, removed and changed from one TaskGraph to another, each sorted."""
+
+    added: list[str]
+    removed: list[str]
+    changed: list[str]  # same id, different content: only possible for explicit ids
+
+
+@dataclass(slots=True)
+class TaskGraphAnalysis:
+    """Levels, critical path and slack of a TaskGraph for given task durations."""
+
+    levels: list[list[str]]  # task ids by level, each sorted by id
+    widest_level: int  # index of the level with the most tasks
+    makespan: float  # finish time of the last task with unlimited workers
+    total_work: float  # sum of the task durations
+    critical_path: list[str]  # a longest chain of dependent tasks, first task first
+    earliest_start: dict[str, float]
+    slack: dict[str, float]  # delay a task can take without delaying the makespan
+
+    @property
+    def max_parallelism(self) -> int:
+        """Number of tasks in the widest level."""
+        return len(self.levels[self.widest_level]) if self.levels else 0
+
+
+@dataclass(slots=True)
+class _TaskEntry:
+    """A task's id and digest, valid while the task keeps the same field values."""
+
+    task: Task
+    plan_id: str
+    fields: tuple[Any, ...]  # copies of the task's fields other than params when indexed
+    params: dict[str, Any]  # deep copy of the task's params when indexed
+    id: str
+    digest: int | None = None  # sha256 of the task's canonical JSON, computed on demand
+
+    @classmethod
+    def of(cls, task: Task, plan_id: str) -> _TaskEntry:
+        fields = (
+            task.name,
+            task.type,
+            [a.model_copy() for a in task.inputs],
+            [a.model_copy() for a in task.outputs],
+            list(task.depends_on),
+            task.id,
+        )
+        tid = task.id or task.compute_id(plan_id)
+        return cls(task, plan_id, fields, _snapshot(task.params), tid)
+
+    def matches(self, task: Task, plan_id: str) -> bool:
+        """Whether task is the task indexed and its fields still have the same values.
+
+        Fields are compared by value, so in-place changes (``task.params["x"] = 2``) are
+        detected too.
+        """
+        t = task
+        return (
+            self.task is t
+            and self.plan_id == plan_id
+            and (t.name, t.type, t.inputs, t.outputs, t.depends_on, t.id) == self.fields
+            and _same(t.params, self.params)
+        )
+
+
+@dataclass(slots=True)
+class _GraphIndex:
+    """Task ids, adjacency and in-degrees of a TaskGraph, with results derived from them."""
+
+    plan_id: str
+    entries: list[_TaskEntry]
+    ids: list[str]
+    adj: dict[str, list[str]] | None = None  # dependency id -> sorted dependent ids
+    indeg: dict[str, int] | None = None
+    order: list[str] | None = None
+    order_done: bool = False
+    hash: str | None = None
+    positions: dict[str, int] | None = None  # task id -> position in the task list
+
+    @classmethod
+    def build(cls, plan_id: str, tasks: list[Task], known: dict[int, _TaskEntry]) -> _GraphIndex:
+        """Index tasks, reusing the entries of tasks that did not change since known."""
+        entries = []
+        for t in tasks:
+            entry = known.get(id(t))
+            if entry is None or not entry.matches(t, plan_id):
+                entry = _TaskEntry.of(t, plan_id)
+            entries.append(entry)
+        return cls(plan_id, entries, [e.id for e in entries])
+
+    def position(self) -> dict[str, int]:
+        """Position of each task id in the task list, built on first use."""
+        if self.positions is None:
+            self.positions = {tid: i for i, tid in enumerate(self.ids)}
+        return self.positions
+
+    def edges(self) -> tuple[dict[str, list[str]], dict[str, int]]:
+        """Adjacency and in-degrees, built on first use."""
+        if self.adj is None or self.indeg is None:
+            indeg: dict[str, int] = defaultdict(int)
+            adj: dict[str, list[str]] = defaultdict(list)
+            for e in self.entries:
+                tid = e.id
+                for dep in e.task.depends_on:
+                    indeg[tid] += 1
+                    adj[dep].append(tid)
+            for dependents in adj.values():
+                dependents.sort()
+            self.adj, self.indeg = dict(adj), dict(indeg)
+        return self.adj, self.indeg
+
+    def matches(self, plan_id: str, tasks: list[Task]) -> bool:
+        """Whether the index is still valid for these tasks: same tasks, none changed."""
+        return (
+            self.plan_id == plan_id
+            and len(self.entries) == len(tasks)
+            and all(e.matches(t, plan_id) for e, t in zip(self.entries, tasks, strict=True))
+        )
+
+    def digests(self) -> list[_TaskEntry]:
+        """The entries, with their digests computed."""
+        for e in self.entries:
+            if e.digest is None:
+                e.digest = _task_digest(e.task._canonical(e.id))
+        return self.entries
+
+    def topological_order(self) -> list[str] | None:
+        """Kahn's order, smallest id first among ready tasks; None if there is a cycle."""
+        if not self.order_done:
+            adj, indeg = self.edges()
+            indeg = dict(indeg)
+            q = deque(sorted([tid for tid in self.ids if not indeg.get(tid)]))
+            order: list[str] = []
+            while q:
+                u = q.popleft()
+                order.append(u)
+                for v in adj.get(u, ()):
+                    indeg[v] -= 1
+                    if indeg[v] == 0:
+                        q.append(v)
+            self.order = order if len(order) == len(self.ids) else None
+            self.order_done = True
+        return self.order
+
+
 class TaskGraph(BaseModel):
+    """A plan's tasks and their dependencies.
+
+    Task ids, the adjacency index and in-degrees are computed once and reused until the
+    graph changes. Each call checks the tasks against copies of their fields taken when
+    indexed, so any change is detected on the next call: replacing, adding or removing
+    tasks, assigning a field, or changing one in place (``task.params["x"] = 2``).
+
+    On a change, ids and digests are only recomputed for the tasks that changed.
+    """
+
     plan_id: str
     tasks: list[Task] = Field(default_factory=list)
+    _index: _GraphIndex | None = PrivateAttr(default=None)
+    # Entries of the last index by id(task), reused by the next one
+    _entries: dict[int, _TaskEntry] = PrivateAttr(default_factory=dict)
+
+    def __eq__(self, other: Any) -> bool:
+        # Compare fields only, not whether an index happens to be cached
+        if not isinstance(other, TaskGraph):
+            return NotImplemented
+        return self.plan_id == other.plan_id and self.tasks == other.tasks
+
+    def _graph_index(self) -> _GraphIndex:
+        index = self._index
+        if index is None or not index.matches(self.plan_id, self.tasks):
+            index = self._index = _GraphIndex.build(self.plan_id, self.tasks, self._entries)
+            # A new dict rather than an update: copies of the graph may share the old one
+            self._entries = {id(e.task): e for e in index.entries}
+        return index
+
+    def invalidate(self) -> None:
+        """Drop the cached index and digests, e.g. to free their memory."""
+        self._index = None
+        self._entries = {}
+
+    def task_digests(self) -> dict[str, str]:
+        """SHA-256 of each task's canonical JSON, by task id."""
+        return {e.id: f"{e.digest:064x}" for e in self._graph_index().digests()}
+
+    def differing_tasks(self, other: TaskGraph) -> list[str]:
+        """Ids of the tasks that are in only one of the graphs or differ between them.
+
+        Task ids are content hashes unless set explicitly, so an edited task usually
+        shows up twice: under its old id and under its new one.
+        """
+        mine = {(e.id, e.digest) for e in self._graph_index().digests()}
+        theirs = {(e.id, e.digest) for e in other._graph_index().digests()}
+        return sorted({tid for tid, _ in mine ^ theirs})
+
+    def diff(self, other: TaskGraph) -> TaskGraphDiff:
+        """Compare tasks by id with a newer version of the graph.
+
+        Returns:
+            Ids only in other (added), only in this graph (removed), and in both with
+            different content (changed)
+        """
+        mine = self.task_digests()
+        theirs = other.task_digests()
+        return TaskGraphDiff(
+            added=sorted(theirs.keys() - mine.keys()),
+            removed=sorted(mine.keys() - theirs.keys()),
+            changed=sorted(tid for tid in mine.keys() & theirs.keys() if mine[tid] != theirs[tid]),
+        )
+
+    def impacted_subgraph(self, changed_ids: Iterable[str]) -> TaskGraph:
+        """The tasks downstream of changed_ids, i.e. those to rerun after a change.
+
+        changed_ids may include ids that are not tasks of this graph, such as removed
+        tasks: the tasks still depending on them are impacted. The tasks of the
+        subgraph keep their ids (set explicitly) and only their dependencies within the
+        subgraph, so it can be run as is; the other tasks are unaffected.
+
+        Args:
+            changed_ids: Ids of added, changed or removed tasks, e.g. from diff()
+
+        Returns:
+            The impacted tasks, in the order of this graph
+        """
+        index = self._graph_index()
+        adj, _ = index.edges()
+        positions = index.position()
+        seen = set(changed_ids)
+        stack = list(seen)
+        while stack:
+            for dependent in adj.get(stack.pop(), ()):
+                if dependent not in seen:
+                    seen.add(dependent)
+                    stack.append(dependent)
+        impacted = {tid for tid in seen if tid in positions}
+        tasks = []
+        for i in sorted(positions[tid] for tid in impacted):
+            t = self.tasks[i]
+            depends_on = [dep for dep in t.depends_on if dep in impacted]
+            tasks.append(t.model_copy(update={"id": index.ids[i], "depends_on": depends_on}))
+        return TaskGraph(plan_id=self.plan_id, tasks=tasks)
+
+    def task_ids(self) -> list[str]:
+        """Ids of the tasks, in task order."""
+        return list(self._graph_index().ids)
 
     def validate_acyclic(self) -> None:
-        ns = self.plan_id
-        indeg = defaultdict(int)
-        adj = defaultdict(list)
-        ids: list[str] = []
-        for t in self.tasks:
-            tid = t.id or t.compute_id(ns)
-            ids.append(tid)
-        for t in self.tasks:
-            tid = t.id or t.compute_id(ns)
-            for dep in t.depends_on:
-                indeg[tid] += 1
-                adj[dep].append(tid)
-        q = deque([tid for tid in ids if indeg[tid] == 0])
-        visited = 0
-        while q:
-            u = q.popleft()
-            visited += 1
-            for v in adj[u]:
-                indeg[v] -= 1
-                if indeg[v] == 0:
-                    q.append(v)
-        if visited != len(ids):
+        if self._graph_index().topological_order() is None:
             raise ValueError("TaskGraph has at least one cycle")
 
     def topological_order(self) -> list[str]:
-        ns = self.plan_id
-        indeg = defaultdict(int)
-        adj = defaultdict(list)
-        ids: list[str] = []
-        for t in self.tasks:
-            tid = t.id or t.compute_id(ns)
-            ids.append(tid)
-        for t in self.tasks:
-            tid = t.id or t.compute_id(ns)
-            for dep in t.depends_on:
-                indeg[tid] += 1
-                adj[dep].append(tid)
-        q = deque(sorted([tid for tid in ids if indeg[tid] == 0]))
-        order: list[str] = []
-        while q:
-            u = q.popleft()
-            order.append(u)
-            for v in sorted(adj[u]):
-                indeg[v] -= 1
-                if indeg[v] == 0:
-                    q.append(v)
-        if len(order) != len(ids):
+        order = self._graph_index().topological_order()
+        if order is None:
+            raise ValueError("TaskGraph has at least one cycle")
+        return list(order)
+
+    def levels(self) -> list[list[str]]:
+        """Task ids grouped by level, each level sorted by id.
+
+        A task's level is 0 without dependencies, else 1 + the level of its deepest
+        dependency, so the tasks of a level can run in parallel once earlier levels are
+        done.
+
+        Raises:
+            ValueError: If the graph has a cycle
+        """
+        return self.analyze().levels
+
+    def analyze(self, duration: Callable[[Task], float] | None = None) -> TaskGraphAnalysis:
+        """Compute levels, the widest level, the critical path and slack per task.
+
+        Start times assume every task starts as soon as its dependencies finish, i.e.
+        unlimited workers. total_work / makespan is then the average parallelism needed
+        to reach the makespan, and max_parallelism the most tasks running in one level.
+
+        Args:
+            duration: Estimated duration of a task, e.g. TaskDurationHistory.estimate;
+                      every task takes 1.0 by default, so the critical path is the
+                      longest chain
+
+        Returns:
+            The analysis; times are in the unit of duration
+
+        Raises:
+            ValueError: If the graph has a cycle or a duration is negative
+        """
+        index = self._graph_index()
+        order = index.topological_order()
+        if order is None:
             raise ValueError("TaskGraph has at least one cycle")
-        return order
+        positions = index.position()
+        adj, _ = index.edges()
+        tasks = self.tasks
+
+        durations: dict[str, float] = {}
+        level: dict[str, int] = {}
+        start: dict[str, float] = {}
+        finish: dict[str, float] = {}
+        for tid in order:
+            t = tasks[positions[tid]]
+            d = duration(t) if duration is not None else 1.0
+            if d < 0:
+                raise ValueError(f"Task {tid} has a negative duration: {d}")
+            lv, es = 0, 0.0
+            for dep in t.depends_on:
+                if level[dep] >= lv:
+                    lv = level[dep] + 1
+                if finish[dep] > es:
+                    es = finish[dep]
+            durations[tid], level[tid], start[tid], finish[tid] = d, lv, es, es + d
+        makespan = max(finish.values(), default=0.0)
+
+        # Latest start times, from the last tasks back
+        latest: dict[str, float] = {}
+        slack: dict[str, float] = {}
+        for tid in reversed(order):
+            lf = makespan
+            for v in adj.get(tid, ()):
+                if latest[v] < lf:
+                    lf = latest[v]
+            latest[tid] = ls = lf - durations[tid]
+            slack[tid] = ls - start[tid] if ls > start[tid] else 0.0
+
+        # Walk back from the last task to finish along the dependencies finishing last
+        critical_path: list[str] = []
+        if order:
+            tid = min(order, key=lambda i: (-finish[i], i))
+            while True:
+                critical_path.append(tid)
+                deps = tasks[positions[tid]].depends_on
+                if not deps:
+                    break
+                tid = min(deps, key=lambda i: (-finish[i], i))
+            critical_path.reverse()
+
+        levels: list[list[str]] = [[] for _ in range(max(level.values(), default=-1) + 1)]
+        for tid in sorted(level):
+            levels[level[tid]].append(tid)
+        widest = max(range(len(levels)), key=lambda i: len(levels[i]), default=0)
+        return TaskGraphAnalysis(
+            levels=levels,
+            widest_level=widest,
+            makespan=makespan,
+            total_work=sum(durations.values()),
+            critical_path=critical_path,
+            earliest_start=start,
+            slack=slack,
+        )
 
     def stable_hash(self) -> str:
-        ns = self.plan_id
-        canonical_tasks = [t.canonical(ns) for t in self.tasks]
-        canonical_tasks.sort(key=lambda x: (x["id"], x["name"]))
-        payload = _canonical({"plan_id": ns, "tasks": canonical_tasks})
-        return _sha256_hex(payload)
+        """Root of a two-level hash: the SHA-256 of the plan id, the task count and the
+        task digests (see task_digests()), sorted.
+
+        Sorting makes the root independent of task order. After a change only the
+        changed tasks are re-hashed; the root itself is rehashed over 32 bytes per task.
+        """
+        index = self._graph_index()
+        if index.hash is None:
+            index.hash = _root_hash(self.plan_id, [e.digest for e in index.digests()])
+        return index.hash
 
     def to_json(self) -> str:
-        ns = self.plan_id
-        data = {"plan_id": self.plan_id, "tasks": [t.canonical(ns) for t in self.tasks]}
+        ids = self._graph_index().ids
+        tasks = [t._canonical(tid) for tid, t in zip(ids, self.tasks, strict=True)]
+        data = {"plan_id": self.plan_id, "tasks": tasks}
         return json.dumps(data, indent=2, ensure_ascii=False, sort_keys=True)
 
+    def write_ndjson(self, fp: IO[str]) -> None:
+        """Write the graph as NDJSON: a header line with the plan id, then one task per
+        line in the canonical form of to_json(), ids included.
+
+        Tasks are serialized one at a time, so memory does not grow with the output.
+        """
+        fp.write(_canonical({"format": NDJSON_FORMAT, "plan_id": self.plan_id}) + "\n")
+        for tid, t in zip(self._graph_index().ids, self.tasks, strict=True):
+            fp.write(_canonical(t._canonical(tid)) + "\n")
+
+    @classmethod
+    def read_ndjson(cls, fp: IO[str]) -> TaskGraph:
+        """Load a graph written by write_ndjson(), one line at a time.
+
+        The tasks get their ids explicitly, so the graph has the same stable_hash() as
+        the one written.
+
+        Raises:
+            ValueError: If the header or a task line is invalid
+        """
+        plan_id = read_ndjson_header(fp)
+        return cls(plan_id=plan_id, tasks=list(iter_ndjson_tasks(fp)))
+
     def to_mermaid(self) -> str:
-        ns = self.plan_id
+        ids = self._graph_index().ids
         lines = ["graph TD"]
-        for t in self.tasks:
-            tid = t.id or t.compute_id(ns)
+        for tid, t in zip(ids, self.tasks, strict=True):
             safe = t.name.replace("[", "(").replace("]", ")")
             lines.append(f"  {tid}[{safe}]")
-        for t in self.tasks:
-            tid = t.id or t.compute_id(ns)
+        for tid, t in zip(ids, self.tasks, strict=True):
             for dep in t.depends_on:
                 lines.append(f"  {dep} --> {tid}")
         return "\n".join(lines)
+
+
+def read_ndjson_header(fp: IO[str]) -> str:
+    """Read the header line of a TaskGraph NDJSON stream and return its plan id.
+
+    Raises:
+        ValueError: If the first line is not a header
+    """
+    line = fp.readline()
+    try:
+        header = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid TaskGraph NDJSON header: {line[:100]!r}") from e
+    if not isinstance(header, dict) or not isinstance(header.get("plan_id"), str):
+        raise ValueError(f"Invalid TaskGraph NDJSON header: {line[:100]!r}")
+    return header["plan_id"]
+
+
+def iter_ndjson_tasks(fp: IO[str]) -> Iterator[Task]:
+    """Yield the tasks of a TaskGraph NDJSON stream whose header was already read.
+
+    Raises:
+        ValueError: If a line is not a valid task
+    """
+    for line in fp:
+        if line.strip():
+            yield Task.model_validate_json(line)
+
+
+def ndjson_stable_hash(fp: IO[str]) -> str:
+    """stable_hash() of the graph in a TaskGraph NDJSON stream, without loading it.
+
+    Only the task digests are kept, 32 bytes per task whatever the size of the tasks.
+    """
+    plan_id = read_ndjson_header(fp)
+    digests = [
+        _task_digest(t._canonical(t.id or t.compute_id(plan_id))) for t in iter_ndjson_tasks(fp)
+    ]
+    return _root_hash(plan_id, digests)
@@ -1,4 +1,5 @@
 import contextvars
+import math
 import time
 import uuid
 from collections.abc import Generator
@@ -54,6 +55,94 @@ class MetricsCollector:
         return self.metrics.copy()
 
 
+class Histogram:
+    """Fixed-memory log-linear histogram.
+
+    Values are counted in integer multiples of unit. Counts below 16 units are exact;
+    above, each power of two is split into 8 buckets, so percentiles are within 12.5%
+    of the true value while memory stays at a few hundred counters whatever the number
+    of recorded values. Min, max and mean are exact.
+    """
+
+    _EXACT = 16
+    _SUB = 8
+
+    def __init__(self, unit: float = 1e-6, max_exponent: int = 40):
+        """Initialize the histogram.
+
+        Args:
+            unit: Resolution of recorded values (default: 1 µs for durations in seconds)
+            max_exponent: Values up to unit * 2**max_exponent get their own bucket;
+                          larger ones share the last bucket
+        """
+        self.unit = unit
+        self.counts = [0] * (self._EXACT + max_exponent * self._SUB)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def record(self, value: float, count: int = 1) -> None:
+        """Count value, count times."""
+        self.count += count
+        self.total += value * count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        n = int(value / self.unit)
+        if n < 16:  # _EXACT
+            self.counts[n if n > 0 else 0] += count
+        else:
+            e = n.bit_length() - 4  # n >> e is in [8, 16)
+            i = e * 8 + (n >> e)  # _EXACT + (e - 1) * _SUB + (n >> e) - 8
+            counts = self.counts
+            counts[i if i < len(counts) else -1] += count
+
+    def _bounds(self, i: int) -> tuple[float, float]:
+        if i < self._EXACT:
+            return i * self.unit, (i + 1) * self.unit
+        e, m = divmod(i - self._EXACT, self._SUB)
+        return (m + 8) << (e + 1), (m + 9) << (e + 1)
+
+    def percentile(self, p: float) -> float:
+        """Estimate the value below which p percent of the recorded values fall."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                low, high = self._bounds(i)
+                if i >= self._EXACT:
+                    low, high = low * self.unit, high * self.unit
+                return min(max((low + high) / 2, self.min), self.max)
+        return self.max
+
+    def merge(self, other: "Histogram") -> None:
+        """Add the counts of a histogram with the same unit and size."""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts, strict=True)]
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def snapshot(self) -> dict[str, float]:
+        """Count, mean, min, max and p50/p90/p99 of the recorded values."""
+        if not self.count:
+            return dict.fromkeys(("count", "mean", "min", "max", "p50", "p90", "p99"), 0.0)
+        return {
+            "count": self.count,
+            "mean": self.total / self.count,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+        }
+
+
 # Global metrics collector
 metrics_collector = MetricsCollector()
 
@@ -0,0 +1,90 @@
+import json
+from dataclasses import dataclass
+from typing import Any
+
+from core.task_graph import Task
+from services.memory.interface import ProjectMemory
+
+MEMORY_KEY = "task_durations"
+
+
+@dataclass(slots=True)
+class _DurationStats:
+    count: int = 0
+    total: float = 0.0
+
+
+class TaskDurationHistory:
+    """Recorded task durations, used to estimate how long a task will take.
+
+    Durations are kept by task name and by task type, not by task id: ids are content
+    hashes, so they change whenever a task's params change, while its duration usually
+    does not. A task is estimated by the mean of its name's durations, else of its
+    type's, else by the default.
+    """
+
+    def __init__(self, default: float = 1.0):
+        """Initialize an empty history.
+
+        Args:
+            default: Estimate for tasks whose name and type have no recorded duration
+        """
+        self.default = default
+        self.by_name: dict[str, _DurationStats] = {}
+        self.by_type: dict[str, _DurationStats] = {}
+
+    def record(self, task: Task, seconds: float) -> None:
+        """Record that task ran for this many seconds."""
+        for stats, key in ((self.by_name, task.name), (self.by_type, task.type)):
+            entry = stats.get(key)
+            if entry is None:
+                entry = stats[key] = _DurationStats()
+            entry.count += 1
+            entry.total += seconds
+
+    def estimate(self, task: Task) -> float:
+        """Estimated duration of task in seconds."""
+        entry = self.by_name.get(task.name) or self.by_type.get(task.type)
+        return entry.total / entry.count if entry else self.default
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "default": self.default,
+            "by_name": {k: [v.count, v.total] for k, v in self.by_name.items()},
+            "by_type": {k: [v.count, v.total] for k, v in self.by_type.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "TaskDurationHistory":
+        history = cls(default=data.get("default", 1.0))
+        for attr in ("by_name", "by_type"):
+            stats = getattr(history, attr)
+            for key, (count, total) in data.get(attr, {}).items():
+                stats[key] = _DurationStats(count, total)
+        return history
+
+    async def save(
+        self, memory: ProjectMemory, tenant_id: str = "default", project_id: str = "default"
+    ) -> None:
+        """Store the history in ProjectMemory, as a new version of its key."""
+        await memory.put(
+            MEMORY_KEY,
+            json.dumps(self.to_dict()),
+            tenant_id=tenant_id,
+            project_id=project_id,
+            artifact_type="task_durations",
+        )
+
+    @classmethod
+    async def load(
+        cls,
+        memory: ProjectMemory,
+        tenant_id: str = "default",
+        project_id: str = "default",
+        default: float = 1.0,
+    ) -> "TaskDurationHistory":
+        """Load the latest stored history, or an empty one if none was saved."""
+        artifact = await memory.get(MEMORY_KEY, tenant_id=tenant_id, project_id=project_id)
+        if artifact is None:
+            return cls(default=default)
+        return cls.from_dict(json.loads(artifact.data))
@@ -1,8 +1,13 @@
 import asyncio
+import time
 from collections import defaultdict, deque
 from collections.abc import Callable
 from typing import Any
 
+from core.task_graph import Task, TaskGraph
+from orchestrator.duration_history import TaskDurationHistory
+from orchestrator.result_cache import TaskResultCache
+
 
 class ParallelExecutor:
     def __init__(self, max_workers: int = 10):
@@ -55,3 +60,53 @@ class ParallelExecutor:
             await asyncio.sleep(0.01)
 
         return results
+
+    async def execute_graph(
+        self,
+        graph: TaskGraph,
+        task_func: Callable[[Task], Any],
+        cache: TaskResultCache | None = None,
+        history: TaskDurationHistory | None = None,
+    ) -> dict[str, Any]:
+        """Execute the tasks of a TaskGraph in parallel, respecting depends_on.
+
+        With a cache, a task whose cache key already has a stored result is not run; the
+        stored result is used instead. The key covers the task, its input artifacts and
+        everything upstream, so after a change only the affected subgraph runs.
+
+        Args:
+            graph: Tasks to run
+            task_func: async function executing a task
+            cache: Result cache consulted before and filled after each task
+            history: Duration history recording how long each task that runs takes
+
+        Returns:
+            Results by task id
+        """
+        ns = graph.plan_id
+        keys: dict[str, str] = {}  # cache key by task id, set once a task has run
+
+        async def execute(task: Task) -> Any:
+            start = time.perf_counter()
+            result = await task_func(task)
+            if history is not None:
+                history.record(task, time.perf_counter() - start)
+            return result
+
+        async def run(node: dict[str, Any]) -> Any:
+            task = node["task"]
+            if cache is None:
+                return await execute(task)
+            key = await cache.key(task, ns, [keys[dep] for dep in node["depends_on"]])
+            keys[node["name"]] = key
+            hit, result = await cache.get(key)
+            if not hit:
+                result = await execute(task)
+                await cache.put(key, result, task_id=node["name"])
+            return result
+
+        nodes = [
+            {"name": tid, "depends_on": t.depends_on, "task": t}
+            for tid, t in zip(graph.task_ids(), graph.tasks, strict=True)
+        ]
+        return await self.execute_dag(nodes, run)
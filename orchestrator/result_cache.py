@@ -0,0 +1,126 @@
+import asyncio
+import hashlib
+import json
+import os
+import stat
+from collections.abc import Callable
+from typing import Any
+
+from core.task_graph import Artifact, Task
+from services.memory.interface import ProjectMemory
+
+
+def _digest(obj: Any) -> str:
+    """SHA-256 hex digest of obj as canonical JSON (sorted keys, no whitespace)."""
+    payload = json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TaskResultCache:
+    """Content-addressed store of task results, kept in ProjectMemory.
+
+    A result is stored under a key hashed from the task id, the digests of the task's
+    input artifacts, and the keys of the tasks it depends on. The task id already
+    covers its name, type, params, artifacts and dependency ids. Changing a task, one of
+    its inputs, or anything upstream of it thus changes its key, so re-running a plan
+    only misses the cache for the affected subgraph.
+
+    Tasks are assumed to be deterministic given their key. Results must be
+    JSON-serializable; other results are not cached.
+    """
+
+    def __init__(
+        self,
+        memory: ProjectMemory,
+        tenant_id: str = "default",
+        project_id: str = "default",
+        digest: Callable[[Artifact], str] | None = None,
+    ):
+        """Initialize the cache.
+
+        Args:
+            memory: Store holding the cached results
+            tenant_id: Tenant the results are stored under
+            project_id: Project the results are stored under
+            digest: Function returning the content digest of an input artifact;
+                    defaults to file_digest
+        """
+        self.memory = memory
+        self.tenant_id = tenant_id
+        self.project_id = project_id
+        self.digest = digest or self.file_digest
+        self.hits = 0
+        self.misses = 0
+        # path -> (mtime_ns, size, sha256) of input files hashed so far
+        self._file_digests: dict[str, tuple[int, int, str]] = {}
+
+    def file_digest(self, artifact: Artifact) -> str:
+        """Digest of an input artifact: the sha256 of its content if its uri is a local
+        file, else a hash of its metadata (the uri then has to identify the content).
+
+        File digests are reused while the file's mtime and size are unchanged.
+        """
+        path = artifact.uri or ""
+        if path.startswith("file://"):
+            path = path[len("file://") :]
+        try:
+            st = os.stat(path)
+        except (OSError, ValueError):
+            st = None
+        if st is None or not stat.S_ISREG(st.st_mode):
+            return _digest(artifact.model_dump())
+        known = self._file_digests.get(path)
+        if known is not None and known[:2] == (st.st_mtime_ns, st.st_size):
+            return known[2]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        self._file_digests[path] = (st.st_mtime_ns, st.st_size, digest)
+        return digest
+
+    async def key(self, task: Task, namespace: str, dependency_keys: list[str]) -> str:
+        """Cache key of a task whose dependencies have the given cache keys."""
+        digests = await asyncio.to_thread(lambda: [self.digest(a) for a in task.inputs])
+        return _digest(
+            {
+                "task": task.id or task.compute_id(namespace),
+                "inputs": digests,
+                "depends_on": sorted(dependency_keys),
+            }
+        )
+
+    def _memory_key(self, key: str) -> str:
+        return f"task_cache:{key}"
+
+    async def get(self, key: str) -> tuple[bool, Any]:
+        """Look up a result.
+
+        Returns:
+            (True, result) on a hit, (False, None) on a miss
+        """
+        artifact = await self.memory.get(
+            self._memory_key(key), tenant_id=self.tenant_id, project_id=self.project_id
+        )
+        if artifact is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, json.loads(artifact.data)
+
+    async def put(self, key: str, result: Any, task_id: str | None = None) -> None:
+        """Store the result of the task with this cache key."""
+        try:
+            data = json.dumps(result)
+        except (TypeError, ValueError) as e:
+            print(f"Error caching result of task {task_id}: {e}")
+            return
+        await self.memory.put(
+            self._memory_key(key),
+            data,
+            meta={"task_id": task_id},
+            tenant_id=self.tenant_id,
+            project_id=self.project_id,
+            artifact_type="task_result_cache",
+        )
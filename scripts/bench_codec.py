@@ -0,0 +1,61 @@
+import time
+
+from core.events import TaskCompletedEvent, TaskStartedEvent
+from services.event_bus.codec import BinaryCodec, EventCodec, JsonLinesCodec
+
+N = 100000
+CODECS: tuple[EventCodec, ...] = (JsonLinesCodec(), BinaryCodec())
+
+
+def make_events() -> list:
+    """A mix of task events with small nested payloads, as emitted by the orchestrator."""
+    events = []
+    for i in range(N):
+        if i % 2:
+            events.append(
+                TaskStartedEvent(
+                    task_id=f"task{i}",
+                    agent_id="coder",
+                    correlation_id=f"plan{i % 16}",
+                    data={"attempt": 1, "step": i},
+                )
+            )
+        else:
+            events.append(
+                TaskCompletedEvent(
+                    task_id=f"task{i}",
+                    result={"status": "ok", "files": ["a.py", "b.py"]},
+                    correlation_id=f"plan{i % 16}",
+                )
+            )
+    return events
+
+
+def run(codec: EventCodec, events: list) -> tuple[float, float, int]:
+    """Encode events as one stream and decode it back; return both rates and the size."""
+    encoder = codec.new_encoder()
+    start = time.perf_counter()
+    data = b"".join([encoder.encode(e) for e in events])
+    encode_rate = len(events) / (time.perf_counter() - start)
+
+    decoder = codec.new_decoder()
+    start = time.perf_counter()
+    decoded = [decoder.decode(record) for _, record in decoder.records(data)]
+    decode_rate = len(decoded) / (time.perf_counter() - start)
+    assert len(decoded) == len(events)
+    return encode_rate, decode_rate, len(data)
+
+
+def main():
+    """Benchmark WAL codecs: encode/decode throughput and encoded size."""
+    events = make_events()
+    for codec in CODECS:
+        encode_rate, decode_rate, size = run(codec, events)
+        print(
+            f"codec={codec.name:<7} encode: {encode_rate:.2f} events/sec "
+            f"decode: {decode_rate:.2f} events/sec size: {size / N:.1f} bytes/event"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,35 @@
 import asyncio
 import time
+from collections.abc import Callable
+from typing import Any
 
-from core.events import TaskStartedEvent
+from core.events import LiteEvent, TaskStartedEvent
 from services.event_bus.bus_inmem import InMemoryEventBus
 
+N = 20000
+SUBSCRIPTION_COUNTS = (1, 100, 1000)
+EVENT_KINDS: dict[str, Callable[[int], Any]] = {
+    "pydantic": lambda i: TaskStartedEvent(task_id=f"task{i}", agent_id="bench"),
+    "lite": lambda i: LiteEvent("task.started", task_id=f"task{i}", agent_id="bench"),
+}
 
-async def main():
-    """Benchmark EventBus throughput with 20k task.started events."""
+
+def construction(make_event: Callable[[int], Any]) -> float:
+    """Measure how many events per second make_event builds."""
+    start = time.perf_counter()
+    for i in range(N):
+        make_event(i)
+    return N / (time.perf_counter() - start)
+
+
+async def run(
+    subscriptions: int, make_event: Callable[[int], Any] = EVENT_KINDS["pydantic"]
+) -> float:
+    """Measure throughput of N task.started events with the given number of subscriptions.
+
+    One subscription counts task events; the others are non-matching noise, half exact
+    topics and half wildcard patterns, so the run measures routing cost.
+    """
     bus = InMemoryEventBus()
     await bus.start()
 
@@ -16,26 +39,37 @@ async def main():
         nonlocal counter
         counter += 1
 
+    async def noise(event):
+        pass
+
     bus.subscribe("task.*", handler)
+    for i in range(subscriptions - 1):
+        pattern = f"agent.{i}.heartbeat" if i % 2 else f"agent.{i}.*"
+        bus.subscribe(pattern, noise)
 
-    N = 20000
     start = time.perf_counter()
 
     for i in range(N):
-        event = TaskStartedEvent(task_id=f"task{i}", agent_id="bench")
-        await bus.emit(event)
+        await bus.emit(make_event(i))
 
     # Wait for all events to be processed
     while counter < N:
         await asyncio.sleep(0.001)
 
     end = time.perf_counter()
-    duration = end - start
-    throughput = N / duration
+    await bus.stop()
+    return N / (end - start)
 
-    print(f"throughput: {throughput:.2f} events/sec")
 
-    await bus.stop()
+async def main():
+    """Benchmark event construction and EventBus throughput with 20k task.started events."""
+    for kind, make_event in EVENT_KINDS.items():
+        print(f"construction={kind:<8} {construction(make_event):.2f} events/sec")
+    for subscriptions in SUBSCRIPTION_COUNTS:
+        throughput = await run(subscriptions)
+        print(f"subscriptions={subscriptions:<5} throughput: {throughput:.2f} events/sec")
+    throughput = await run(1, EVENT_KINDS["lite"])
+    print(f"subscriptions=1     events=lite throughput: {throughput:.2f} events/sec")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,76 @@
+import asyncio
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+from core.events import TaskStartedEvent
+from services.event_bus.bus_uds import EventBroker, UnixSocketEventBus
+
+N = 20000
+FAN_OUT = (1, 2, 4)
+
+
+def subscriber(path: str, ready, done) -> None:
+    """Subscriber process: count task events and report once all N arrived."""
+
+    async def run():
+        bus = UnixSocketEventBus(path)
+        finished = asyncio.Event()
+        counter = 0
+
+        async def handler(events):
+            nonlocal counter
+            counter += len(events)
+            if counter >= N:
+                finished.set()
+
+        bus.subscribe("task.*", handler, batch=True)
+        await bus.start()
+        ready.set()
+        await finished.wait()
+        done.put(time.perf_counter())
+        await bus.stop()
+
+    asyncio.run(run())
+
+
+async def run(path: str, processes: int) -> float:
+    """Measure throughput of N events published by this process to `processes` subscribers."""
+    ctx = mp.get_context("spawn")
+    done = ctx.Queue()
+    readies = [ctx.Event() for _ in range(processes)]
+    procs = [ctx.Process(target=subscriber, args=(path, r, done)) for r in readies]
+    for p in procs:
+        p.start()
+    for r in readies:
+        await asyncio.to_thread(r.wait)
+
+    publisher = UnixSocketEventBus(path)
+    await publisher.start()
+    events = [TaskStartedEvent(task_id=f"task{i}", agent_id="bench") for i in range(N)]
+
+    start = time.perf_counter()
+    await publisher.emit_many(events)
+    finished = [await asyncio.to_thread(done.get) for _ in procs]
+    end = max(finished)
+
+    await publisher.stop()
+    for p in procs:
+        p.join()
+    return N / (end - start)
+
+
+async def main():
+    """Benchmark cross-process fan-out of 20k task.started events over a Unix socket."""
+    path = os.path.join(tempfile.mkdtemp(), "bus.sock")
+    broker = EventBroker(path)
+    await broker.start()
+    for processes in FAN_OUT:
+        throughput = await run(path, processes)
+        print(f"fan-out=1->{processes:<3} throughput: {throughput:.2f} events/sec per subscriber")
+    await broker.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
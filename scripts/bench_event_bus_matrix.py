@@ -0,0 +1,258 @@
+import argparse
+import asyncio
+import gc
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+
+from core.events import TaskStartedEvent
+from services.event_bus.bus_inmem import InMemoryEventBus
+from services.event_bus.wal import WAL
+
+EVENT_COUNTS = (1000, 10000)
+SUBSCRIBER_COUNTS = (1, 100)
+PATTERNS = ("exact", "wildcard")
+HANDLERS = ("async", "sync")
+WAL_MODES = ("off", "on")
+BATCH_SIZES = (1, 256)
+QUEUE_SIZE = 1024  # producers block beyond this, so a saturated case has a bounded backlog
+BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "bench_event_bus_matrix.json")
+
+
+@dataclass(frozen=True)
+class Case:
+    """One point of the benchmark matrix."""
+
+    events: int
+    subscribers: int
+    pattern: str  # "exact" or "wildcard" subscription patterns
+    handler: str  # "async" or "sync" (run on the bus thread pool)
+    wal: str  # "on": every event is appended to a WAL (fsync="never") before it is emitted
+    batch: int  # bus batch_size; above 1, events are also emitted in chunks of this size
+
+    @property
+    def key(self) -> str:
+        return (
+            f"events={self.events} subs={self.subscribers} pattern={self.pattern} "
+            f"handler={self.handler} wal={self.wal} batch={self.batch}"
+        )
+
+
+async def run(case: Case, tmp: str) -> tuple[float, float, float]:
+    """Run one case; return throughput (events/sec) and p50/p99 emit-to-handler latency.
+
+    One subscription receives the events; the others are non-matching noise of the
+    same pattern kind, so the run includes routing cost. The WAL does not fsync: disk
+    flush times vary too much between runs to compare against a baseline.
+    """
+    bus = InMemoryEventBus(batch_size=case.batch, max_queue_size=QUEUE_SIZE)
+    wal = WAL(os.path.join(tmp, "bench.wal"), fsync="never") if case.wal == "on" else None
+    latencies: list[float] = []  # list.append is atomic, so sync handlers can share it
+
+    async def async_handler(event):
+        latencies.append(time.perf_counter() - event.data)
+
+    def sync_handler(event):
+        latencies.append(time.perf_counter() - event.data)
+
+    async def noise(event):
+        pass
+
+    wildcard = case.pattern == "wildcard"
+    handler = async_handler if case.handler == "async" else sync_handler
+    bus.subscribe("task.*" if wildcard else "task.started", handler)
+    for i in range(case.subscribers - 1):
+        bus.subscribe(f"agent.{i}.*" if wildcard else f"agent.{i}.heartbeat", noise)
+    await bus.start()
+
+    # Event construction is not measured; each event is stamped when it is emitted
+    events = [TaskStartedEvent(task_id=f"task{i}", agent_id="bench") for i in range(case.events)]
+    chunk = case.batch
+    # As timeit does, keep collector pauses out of the measurement
+    gc.collect()
+    gc.disable()
+    start = time.perf_counter()
+    for i in range(0, case.events, chunk):
+        batch = events[i : i + chunk]
+        if wal is not None:
+            for event in batch:
+                wal.append(event)
+        # Latency is measured from emit; the WAL append cost shows in throughput
+        now = time.perf_counter()
+        for event in batch:
+            event.data = now
+        if chunk == 1:
+            await bus.emit(batch[0])
+        else:
+            await bus.emit_many(batch)
+        # Let the bus run, as a producer doing other work would; otherwise the whole run
+        # is queued up front and latency only measures the backlog
+        await asyncio.sleep(0)
+
+    # Wait for all events to be handled
+    while len(latencies) < case.events:
+        await asyncio.sleep(0.001)
+
+    duration = time.perf_counter() - start
+    gc.enable()
+    await bus.stop()
+    if wal is not None:
+        wal.close()
+        wal.clear()
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[int(len(latencies) * 0.99)]
+    return case.events / duration, p50, p99
+
+
+async def measure(case: Case, tmp: str, repeat: int) -> dict:
+    """Run a case repeat times and return the median run (by throughput) as a result."""
+    runs = sorted([await run(case, tmp) for _ in range(repeat)])
+    throughput, p50, p99 = runs[len(runs) // 2]
+    return {
+        "key": case.key,
+        **asdict(case),
+        "throughput": throughput,
+        "p50_ms": p50 * 1000,
+        "p99_ms": p99 * 1000,
+    }
+
+
+def print_result(result: dict, base: dict | None) -> None:
+    change = f"{result['throughput'] / base['throughput'] - 1:+.0%}" if base else "-"
+    print(
+        f"{result['events']:>6} {result['subscribers']:>4} {result['pattern']:<8} "
+        f"{result['handler']:<7} {result['wal']:<3} {result['batch']:>5}  "
+        f"{result['throughput']:>11.0f} {result['p50_ms']:>8.3f} {result['p99_ms']:>8.3f} "
+        f"{change:>7}"
+    )
+
+
+def compare(
+    results: list[dict], baseline: dict[str, dict], tolerance: float
+) -> list[tuple[str, str]]:
+    """Return (case key, reason) for every result regressing from its baseline entry.
+
+    Throughput may drop by the tolerance fraction. Latency is reported but not checked:
+    it swings with thread scheduling (sync handlers) and is too noisy to gate on.
+    """
+    regressions = []
+    for result in results:
+        base = baseline.get(result["key"])
+        if base is None:
+            continue
+        if result["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(
+                (
+                    result["key"],
+                    f"throughput {result['throughput']:.0f} < baseline "
+                    f"{base['throughput']:.0f} events/sec",
+                )
+            )
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    def ints(value: str) -> list[int]:
+        return [int(v) for v in value.split(",")]
+
+    def strs(choices: tuple[str, ...]):
+        def parse(value: str) -> list[str]:
+            values = value.split(",")
+            for v in values:
+                if v not in choices:
+                    raise argparse.ArgumentTypeError(f"{v!r} is not one of {choices}")
+            return values
+
+        return parse
+
+    parser = argparse.ArgumentParser(
+        description="Sweep InMemoryEventBus throughput and latency over a matrix of cases."
+    )
+    parser.add_argument("--events", type=ints, default=list(EVENT_COUNTS))
+    parser.add_argument("--subscribers", type=ints, default=list(SUBSCRIBER_COUNTS))
+    parser.add_argument("--patterns", type=strs(PATTERNS), default=list(PATTERNS))
+    parser.add_argument("--handlers", type=strs(HANDLERS), default=list(HANDLERS))
+    parser.add_argument("--wal", type=strs(WAL_MODES), default=list(WAL_MODES))
+    parser.add_argument("--batch-sizes", type=ints, default=list(BATCH_SIZES))
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="runs per case; the median one is reported"
+    )
+    parser.add_argument("--json", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline JSON to compare to")
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="write the results as the new baseline"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.3,
+        help="allowed throughput drop before a case counts as a regression",
+    )
+    return parser.parse_args()
+
+
+async def main() -> int:
+    """Benchmark the event bus over the case matrix and check for regressions."""
+    args = parse_args()
+    cases = [
+        Case(*values)
+        for values in itertools.product(
+            args.events, args.subscribers, args.patterns, args.handlers, args.wal, args.batch_sizes
+        )
+    ]
+    baseline: dict[str, dict] = {}
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = {r["key"]: r for r in json.load(f)["results"]}
+
+    print(
+        f"{'events':>6} {'subs':>4} {'pattern':<8} {'handler':<7} {'wal':<3} {'batch':>5}  "
+        f"{'events/sec':>11} {'p50 ms':>8} {'p99 ms':>8} {'vs base':>7}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        results = []
+        for case in cases:
+            result = await measure(case, tmp, args.repeat)
+            print_result(result, baseline.get(case.key))
+            results.append(result)
+
+        regressions = [] if args.save_baseline else compare(results, baseline, args.tolerance)
+        if regressions:
+            # Measure regressed cases again so one noisy run does not fail the suite
+            suspects = {key for key, _ in regressions}
+            print(f"\nRe-running {len(suspects)} case(s) slower than the baseline:")
+            for i, case in enumerate(cases):
+                if case.key in suspects:
+                    results[i] = await measure(case, tmp, args.repeat)
+                    print_result(results[i], baseline[case.key])
+            regressions = compare(results, baseline, args.tolerance)
+
+    report = {"python": sys.version.split()[0], "results": results}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"\nREGRESSION: {len(regressions)} check(s) exceed the baseline:", file=sys.stderr)
+        for key, reason in regressions:
+            print(f"  {key}: {reason}", file=sys.stderr)
+        return 1
+    if baseline:
+        print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,188 @@
+import argparse
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from functools import partial
+
+from core.compact_graph import CompactTaskGraph
+from core.task_graph import Task, TaskGraph, ndjson_stable_hash
+
+OPERATIONS = ("validate_acyclic", "topological_order", "to_mermaid", "stable_hash")
+
+
+def make_graph(n: int, preset_ids: bool = False) -> TaskGraph:
+    """A DAG of n tasks, each depending on up to two earlier tasks.
+
+    Without preset ids, each task id is computed from its content when first needed.
+    """
+    tasks: list[Task] = []
+    ids: list[str] = []
+    for i in range(n):
+        deps = sorted({ids[i - 1], ids[i // 2]}) if i else []
+        task = Task(name=f"task{i}", params={"step": i}, depends_on=deps)
+        tid = task.compute_id("bench")
+        if preset_ids:
+            task.id = tid
+        tasks.append(task)
+        ids.append(tid)
+    return TaskGraph(plan_id="bench", tasks=tasks)
+
+
+def run(graph: TaskGraph, cached: bool) -> dict[str, float]:
+    """Time each operation once; without the cache, the index is dropped before each call."""
+    times = {}
+    for op in OPERATIONS:
+        if not cached:
+            graph.invalidate()
+        start = time.perf_counter()
+        getattr(graph, op)()
+        times[op] = time.perf_counter() - start
+    return times
+
+
+def timed(func) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def traced_size(build) -> int:
+    """Bytes still allocated once build() returns, other than those it freed."""
+    gc.collect()
+    tracemalloc.start()
+    kept = build()  # noqa: F841 - held so its memory is counted
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+def bench_compact(n: int) -> None:
+    """Compare the compact CSR form with TaskGraph: memory and traversal times.
+
+    Task ids are preset so the TaskGraph times measure the traversal, not id hashing.
+    """
+    graph = make_graph(n, preset_ids=True)
+    convert, compact = timed(partial(CompactTaskGraph.from_task_graph, graph))
+    graph.invalidate()
+    graph_topo, _ = timed(graph.topological_order)
+    compact_topo, _ = timed(compact.topological_order)
+    levels, _ = timed(compact.levels)
+    back, _ = timed(compact.to_task_graph)
+    del graph, compact
+
+    graph_size = traced_size(lambda: make_graph(n, preset_ids=True))
+    compact_size = traced_size(
+        lambda: CompactTaskGraph.from_task_graph(make_graph(n, preset_ids=True))
+    )
+    print(f"\ncompact form (tasks={n})")
+    print(f"memory: TaskGraph {graph_size / n:.0f} B/task, compact {compact_size / n:.0f} B/task")
+    print(f"from_task_graph {convert:.4f}s  to_task_graph {back:.4f}s")
+    print(
+        f"topological_order: TaskGraph (cold) {graph_topo:.4f}s, compact {compact_topo:.4f}s; "
+        f"compact levels {levels:.4f}s"
+    )
+
+
+def traced_peak(func) -> int:
+    """Run func; return the peak memory it allocated on top of what existed."""
+    gc.collect()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def bench_ndjson(n: int) -> None:
+    """Compare NDJSON streaming with to_json() and a whole-document load."""
+    graph = make_graph(n, preset_ids=True)
+    graph.stable_hash()
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path, ndjson_path = os.path.join(tmp, "g.json"), os.path.join(tmp, "g.ndjson")
+
+        def write_json():
+            with open(json_path, "w", encoding="utf-8") as f:
+                f.write(graph.to_json())
+
+        def write_ndjson():
+            with open(ndjson_path, "w", encoding="utf-8") as f:
+                graph.write_ndjson(f)
+
+        def read_json():
+            with open(json_path, encoding="utf-8") as f:
+                return TaskGraph.model_validate(json.load(f))
+
+        def read_ndjson():
+            with open(ndjson_path, encoding="utf-8") as f:
+                return TaskGraph.read_ndjson(f)
+
+        def hash_ndjson():
+            with open(ndjson_path, encoding="utf-8") as f:
+                return ndjson_stable_hash(f)
+
+        print(f"\nserialization (tasks={n})")
+        rows = [
+            ("to_json + write", write_json),
+            ("write_ndjson", write_ndjson),
+            ("json.load", read_json),
+            ("read_ndjson", read_ndjson),
+            ("ndjson_stable_hash", hash_ndjson),
+        ]
+        for name, func in rows:
+            duration, _ = timed(func)
+            peak = traced_peak(func)  # measured apart: tracing slows the run down
+            print(f"{name:<20} {duration:>8.4f}s  peak {peak / 2**20:>8.1f} MiB")
+        json_size, ndjson_size = os.path.getsize(json_path), os.path.getsize(ndjson_path)
+        print(f"file size: json {json_size / 2**20:.1f} MiB, ndjson {ndjson_size / 2**20:.1f} MiB")
+
+
+def main():
+    """Benchmark TaskGraph operations with and without the memoized index."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--tasks", type=int, default=100000)
+    args = parser.parse_args()
+
+    graph = make_graph(args.tasks)
+    uncached = run(graph, cached=False)
+    graph.invalidate()
+    cold = run(graph, cached=True)  # the first call builds the index
+    warm = run(graph, cached=True)
+    print(f"tasks={args.tasks}")
+    print(f"{'operation':<18} {'uncached s':>10} {'cached s':>10} {'warm s':>10}")
+    for op in OPERATIONS:
+        print(f"{op:<18} {uncached[op]:>10.4f} {cold[op]:>10.4f} {warm[op]:>10.4f}")
+    total_uncached, total_cold = sum(uncached.values()), sum(cold.values())
+    print(
+        f"{'all':<18} {total_uncached:>10.4f} {total_cold:>10.4f} {sum(warm.values()):>10.4f}"
+        f"  ({total_uncached / total_cold:.1f}x)"
+    )
+
+    # Only the edited task is re-hashed; the others are checked against their copies
+    previous = TaskGraph(plan_id=graph.plan_id, tasks=list(graph.tasks))
+    previous.stable_hash()
+    mid = len(graph.tasks) // 2
+    graph.tasks[mid] = graph.tasks[mid].model_copy(update={"params": {"edited": True}})
+    edited, _ = timed(graph.stable_hash)
+    print(f"stable_hash after editing one task: {edited:.4f}s")
+    diff_time, diff = timed(partial(previous.diff, graph))
+    impacted_time, impacted = timed(partial(graph.impacted_subgraph, diff.added + diff.removed))
+    print(
+        f"diff: {diff_time:.4f}s, impacted_subgraph: {impacted_time:.4f}s "
+        f"({len(impacted.tasks)} impacted tasks)"
+    )
+    analyze_time, analysis = timed(previous.analyze)
+    print(
+        f"analyze: {analyze_time:.4f}s ({len(analysis.levels)} levels, "
+        f"critical path of {len(analysis.critical_path)} tasks)"
+    )
+    del graph, previous
+    bench_compact(args.tasks)
+    bench_ndjson(args.tasks)
+
+
+if __name__ == "__main__":
+    main()
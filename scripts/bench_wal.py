@@ -0,0 +1,50 @@
+import asyncio
+import os
+import tempfile
+import time
+
+from core.events import TaskStartedEvent
+from services.event_bus.wal import WAL
+
+N = 20000
+PRODUCERS = 512
+POLICIES = ("always", "batch", "never")
+
+
+async def run(policy: str, log_file: str) -> tuple[float, float, float]:
+    """Append N events from concurrent producers; return throughput, p50 and p99 latency."""
+    wal = WAL(log_file, fsync=policy)
+    latencies: list[float] = []
+    events = [TaskStartedEvent(task_id=f"task{i}", agent_id="bench") for i in range(N)]
+
+    async def producer(share):
+        for event in share:
+            t0 = time.perf_counter()
+            await wal.append_async(event)
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(producer(events[i::PRODUCERS]) for i in range(PRODUCERS)))
+    duration = time.perf_counter() - start
+    wal.close()
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[int(len(latencies) * 0.99)]
+    return N / duration, p50, p99
+
+
+async def main():
+    """Benchmark group-commit WAL appends for each fsync policy."""
+    with tempfile.TemporaryDirectory() as tmp:
+        for policy in POLICIES:
+            log_file = os.path.join(tmp, f"{policy}.wal")
+            throughput, p50, p99 = await run(policy, log_file)
+            print(
+                f"fsync={policy:<6} throughput: {throughput:.2f} appends/sec "
+                f"p50: {p50 * 1000:.2f} ms p99: {p99 * 1000:.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,5 +2,7 @@
 # Provides in-process pub/sub messaging for LunaCore components
 
 from .bus_inmem import InMemoryEventBus
+from .bus_partitioned import PartitionedEventBus
+from .bus_uds import EventBroker, UnixSocketEventBus
 
-__all__ = ["InMemoryEventBus"]
+__all__ = ["InMemoryEventBus", "PartitionedEventBus", "EventBroker", "UnixSocketEventBus"]
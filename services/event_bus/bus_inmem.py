@@ -1,18 +1,476 @@
 import asyncio
 import contextlib
 import fnmatch
-from collections.abc import Callable
-from typing import Any
+import itertools
+import re
+import time
+from collections import deque
+from collections.abc import Callable, Hashable, Iterable, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import Any, Literal
 
-from core.events import BaseEvent
+from core.events import BaseEvent, LiteEvent
+from core.telemetry import Histogram, MetricsCollector
+from services.event_bus.wal import WAL
+
+OverflowPolicy = Literal["block", "drop_oldest", "drop_newest", "spill"]
+LaneOverflowPolicy = Literal["block", "drop_oldest", "drop_newest"]
+LaneOrdering = Literal["fifo", "correlation_id", "none"]
+
+_WILDCARD_CHARS = frozenset("*?[")
+
+
+def _is_wildcard(pattern: str) -> bool:
+    return not _WILDCARD_CHARS.isdisjoint(pattern)
+
+
+def _field(event: BaseEvent, name: str) -> Any:
+    """Value of an event field, or None; cheaper than getattr on a missing pydantic field."""
+    return (event.fields if isinstance(event, LiteEvent) else event.__dict__).get(name)
+
+
+def task_key(event: BaseEvent) -> Hashable | None:
+    """Default coalescing key: (type, task_id), or None for events without a task_id."""
+    task_id = _field(event, "task_id")
+    return None if task_id is None else (event.type, task_id)
+
+
+@dataclass(slots=True)
+class _HandlerStats:
+    """Calls, errors and execution time of the handlers subscribed to one pattern."""
+
+    calls: int = 0
+    errors: int = 0
+    time: Histogram = field(default_factory=Histogram)
+
+    def merge(self, other: "_HandlerStats"):
+        self.calls += other.calls
+        self.errors += other.errors
+        self.time.merge(other.time)
+
+
+@dataclass(slots=True)
+class _BusStats:
+    """Fixed-memory instrumentation of a bus, snapshotted by stats()."""
+
+    dispatch_latency: Histogram = field(default_factory=Histogram)  # seconds
+    queue_depth: Histogram = field(default_factory=lambda: Histogram(unit=1))  # events
+    handlers: dict[str, _HandlerStats] = field(default_factory=dict)
+
+    def merge(self, other: "_BusStats"):
+        self.dispatch_latency.merge(other.dispatch_latency)
+        self.queue_depth.merge(other.queue_depth)
+        for pattern, handler_stats in other.handlers.items():
+            self.handlers.setdefault(pattern, _HandlerStats()).merge(handler_stats)
+
+    def snapshot(self, **current: Any) -> dict[str, Any]:
+        return {
+            **current,
+            "dispatch_latency": self.dispatch_latency.snapshot(),
+            "queue_depth_samples": self.queue_depth.snapshot(),
+            "handlers": {
+                pattern: {"calls": h.calls, "errors": h.errors, "time": h.time.snapshot()}
+                for pattern, h in self.handlers.items()
+            },
+        }
+
+
+@dataclass(slots=True)
+class Subscription:
+    """A handler registered on the bus for a topic pattern."""
+
+    pattern: str
+    handler: Callable[..., Any]
+    batch: bool = False  # handler receives a list of matching events per drained batch
+    inline: bool = False  # sync handler runs directly on the event loop, no thread hop
+    is_async: bool = field(init=False)
+    lane: "_Lane | None" = field(default=None, init=False)
+    coalescer: "_Coalescer | None" = field(default=None, init=False)
+    stats: _HandlerStats | None = field(default=None, init=False)
+
+    def __post_init__(self):
+        handler = self.handler
+        self.is_async = asyncio.iscoroutinefunction(handler) or (
+            callable(handler) and asyncio.iscoroutinefunction(handler.__call__)
+        )
+
+
+class _Lane:
+    """Bounded queue(s) and worker task(s) dedicated to one subscription.
+
+    Ordering "fifo" uses one queue and one worker. "correlation_id" uses one queue and
+    worker per concurrency slot, keyed by correlation_id, so events sharing a key stay in
+    order. "none" shares one queue between all workers.
+    """
+
+    def __init__(
+        self,
+        bus: "InMemoryEventBus",
+        sub: Subscription,
+        concurrency: int,
+        ordering: LaneOrdering,
+        maxsize: int,
+        overflow: LaneOverflowPolicy,
+    ):
+        self.bus = bus
+        self.sub = sub
+        self.concurrency = concurrency
+        self.overflow = overflow
+        nqueues = concurrency if ordering == "correlation_id" else 1
+        self.queues: list[asyncio.Queue] = [asyncio.Queue(maxsize=maxsize) for _ in range(nqueues)]
+        self.tasks: list[asyncio.Task] = []
+
+    @property
+    def depth(self) -> int:
+        return sum(q.qsize() for q in self.queues)
+
+    def start(self):
+        if self.tasks:
+            return
+        if len(self.queues) == 1:
+            self.tasks = [
+                asyncio.create_task(self._work(self.queues[0])) for _ in range(self.concurrency)
+            ]
+        else:
+            self.tasks = [asyncio.create_task(self._work(q)) for q in self.queues]
+
+    def cancel(self) -> list[asyncio.Task]:
+        tasks, self.tasks = self.tasks, []
+        for task in tasks:
+            task.cancel()
+        return tasks
+
+    async def put(self, event: BaseEvent):
+        queues = self.queues
+        queue = (
+            queues[0]
+            if len(queues) == 1
+            else queues[hash(event.correlation_id or event.id) % len(queues)]
+        )
+        if not queue.full():
+            queue.put_nowait(event)
+        elif self.overflow == "block":
+            await queue.put(event)
+        else:
+            if self.overflow == "drop_oldest":
+                queue.get_nowait()
+                queue.task_done()
+                queue.put_nowait(event)
+            self.bus.metrics.increment(f"event_bus.lane.{self.sub.pattern}.dropped")
+
+    async def _work(self, queue: asyncio.Queue):
+        sub = self.sub
+        call = self.bus._call
+        while True:
+            batch = [await queue.get()]
+            if sub.batch:
+                while len(batch) < self.bus.batch_size and not queue.empty():
+                    batch.append(queue.get_nowait())
+                await call(sub, batch)
+            else:
+                await call(sub, batch[0])
+            for _ in batch:
+                queue.task_done()
+
+
+class _Coalescer:
+    """Coalescing window in front of one subscription.
+
+    Matching events are held for `window` seconds from the first one, then delivered in
+    one go: only the latest event per key, in the order those arrived. Events whose key
+    is None are all kept. An event whose id was seen in this window or the previous one
+    is dropped as a duplicate.
+    """
+
+    def __init__(
+        self,
+        bus: "InMemoryEventBus",
+        sub: Subscription,
+        window: float,
+        key: Callable[[BaseEvent], Hashable | None],
+    ):
+        self.bus = bus
+        self.sub = sub
+        self.window = window
+        self.key = key
+        self.pending: dict[Hashable, BaseEvent] = {}
+        self.seen: set[str] = set()
+        self.seen_before: set[str] = set()  # ids seen in the previous window
+        self.ready = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+    @property
+    def depth(self) -> int:
+        return len(self.pending)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._work())
+
+    def cancel(self) -> list[asyncio.Task]:
+        task, self.task = self.task, None
+        if task is None:
+            return []
+        task.cancel()
+        return [task]
+
+    def add(self, event: BaseEvent):
+        if event.id in self.seen or event.id in self.seen_before:
+            self.bus.metrics.increment("event_bus.deduplicated")
+            return
+        self.seen.add(event.id)
+        key = self.key(event)
+        if key is None:
+            key = event.id
+        elif self.pending.pop(key, None) is not None:
+            self.bus.metrics.increment("event_bus.coalesced")
+        self.pending[key] = event
+        self.ready.set()
+
+    async def _work(self):
+        sub = self.sub
+        call = self.bus._call
+        while True:
+            await self.ready.wait()
+            await asyncio.sleep(self.window)
+            self.ready.clear()
+            events = list(self.pending.values())
+            self.pending.clear()
+            self.seen_before, self.seen = self.seen, set()
+            if sub.lane:
+                for event in events:
+                    await sub.lane.put(event)
+            elif sub.batch:
+                await call(sub, events)
+            else:
+                for event in events:
+                    await call(sub, event)
+
+
+class _PriorityLanes:
+    """Deque-like store of (enqueued_at, event) items with one FIFO per priority class.
+
+    popleft() takes from the highest non-empty class. After starvation_limit items in a
+    row were taken ahead of waiting lower-class items, it takes the longest-waiting
+    lower-class item instead, so lower classes keep at least one dispatch slot in
+    starvation_limit + 1 under sustained high-priority load.
+    """
+
+    def __init__(self, classify: Callable[[BaseEvent], int], starvation_limit: int):
+        self.classify = classify
+        self.starvation_limit = starvation_limit
+        self.lanes: dict[int, deque] = {}
+        self.ranked: list[deque] = []  # lanes, highest class first
+        self.size = 0
+        self.skipped = 0  # consecutive pops that passed over a waiting lower class
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, item: tuple[float, BaseEvent]):
+        level = self.classify(item[1])
+        lane = self.lanes.get(level)
+        if lane is None:
+            lane = self.lanes[level] = deque()
+            self.ranked = [self.lanes[k] for k in sorted(self.lanes, reverse=True)]
+        lane.append(item)
+        self.size += 1
+
+    def popleft(self) -> tuple[float, BaseEvent]:
+        waiting = [lane for lane in self.ranked if lane]
+        if len(waiting) == 1:
+            self.skipped = 0
+            lane = waiting[0]
+        elif self.skipped < self.starvation_limit:
+            self.skipped += 1
+            lane = waiting[0]
+        else:
+            self.skipped = 0
+            lane = min(waiting[1:], key=lambda q: q[0][0])
+        self.size -= 1
+        return lane.popleft()
+
+    def pop_lowest(self) -> tuple[float, BaseEvent]:
+        """Remove the oldest item of the lowest non-empty class."""
+        lane = next(lane for lane in reversed(self.ranked) if lane)
+        self.size -= 1
+        return lane.popleft()
+
+    def lowest_level(self) -> int:
+        return min(level for level, lane in self.lanes.items() if lane)
+
+
+class _BusQueue(asyncio.Queue):
+    """asyncio.Queue with bulk put and get.
+
+    emit_many and the dispatch loop move whole runs of items at once instead of paying the
+    per-item capacity check and waiter wakeup of put_nowait and get_nowait.
+    """
+
+    def put_many_nowait(self, items: list[tuple[float, BaseEvent]]) -> int:
+        """Queue the leading items that fit and return how many were queued."""
+        n = len(items)
+        if self._maxsize > 0:
+            n = max(0, min(n, self._maxsize - self.qsize()))
+        if n:
+            self._extend(items if n == len(items) else items[:n])
+            self._unfinished_tasks += n
+            self._finished.clear()
+            for _ in range(min(n, len(self._getters))):
+                self._wakeup_next(self._getters)
+        return n
+
+    def _extend(self, items: list[tuple[float, BaseEvent]]):
+        self._queue.extend(items)
+
+    def get_many_nowait(self, limit: int) -> list[tuple[float, BaseEvent]]:
+        """Remove and return up to limit items, without waiting."""
+        popleft = self._queue.popleft
+        items = [popleft() for _ in range(min(limit, self.qsize()))]
+        for _ in range(min(len(items), len(self._putters))):
+            self._wakeup_next(self._putters)
+        return items
+
+    def tasks_done(self, n: int):
+        """task_done() for n items."""
+        if n > self._unfinished_tasks:
+            raise ValueError("tasks_done() called too many times")
+        self._unfinished_tasks -= n
+        if self._unfinished_tasks == 0:
+            self._finished.set()
+
+
+class _PriorityQueue(_BusQueue):
+    """asyncio.Queue storing its items in _PriorityLanes."""
+
+    def __init__(self, maxsize: int, lanes: _PriorityLanes):
+        self._lanes = lanes
+        super().__init__(maxsize)
+
+    def _init(self, maxsize: int):
+        self._queue = self._lanes
+
+    def _extend(self, items: list[tuple[float, BaseEvent]]):
+        for item in items:
+            self._lanes.append(item)
+
+    def depths(self) -> dict[int, int]:
+        return {level: len(lane) for level, lane in sorted(self._lanes.lanes.items())}
+
+    def replace_lowest(self, item: tuple[float, BaseEvent]) -> bool:
+        """Put item on a full queue in place of the oldest item of the lowest class.
+
+        Returns:
+            False if item itself is below every queued class and was not queued
+        """
+        lanes = self._lanes
+        if lanes.classify(item[1]) < lanes.lowest_level():
+            return False
+        lanes.pop_lowest()
+        self.task_done()
+        self.put_nowait(item)
+        return True
 
 
 class InMemoryEventBus:
     """In-memory event bus with pub/sub pattern matching and FIFO queue."""
 
-    def __init__(self):
-        self._subscribers: dict[str, list[Callable]] = {}
-        self._queue: asyncio.Queue = asyncio.Queue()
+    def __init__(
+        self,
+        batch_size: int = 256,
+        max_queue_size: int = 0,
+        overflow: OverflowPolicy = "block",
+        spill_wal: WAL | None = None,
+        lanes: bool = False,
+        lane_size: int = 1024,
+        lane_overflow: LaneOverflowPolicy = "block",
+        sync_workers: int = 4,
+        sync_queue_size: int = 1024,
+        sync_thread_name: str = "lunacore-event-bus",
+        instrument: bool = False,
+        priorities: Mapping[str, int] | None = None,
+        starvation_limit: int = 16,
+    ):
+        """Initialize the bus.
+
+        Args:
+            batch_size: Maximum number of queued events drained and dispatched per wakeup
+            max_queue_size: Queue capacity; 0 means unbounded
+            overflow: What emit does when the queue is full: "block" the producer,
+                      "drop_oldest" queued event, "drop_newest" (the incoming one), or
+                      "spill" the incoming event to spill_wal for later recovery
+            spill_wal: WAL receiving spilled events, required by the "spill" policy
+            lanes: Give every subscription its own queue and worker task by default, so a
+                   slow handler does not hold up the others
+            lane_size: Capacity of each subscription lane queue
+            lane_overflow: Policy applied when a lane queue is full: "block" (the bus
+                           consumer waits), "drop_oldest" or "drop_newest"
+            sync_workers: Threads in the bus-owned pool running sync handlers; kept apart
+                          from the default executor used by asyncio.to_thread
+            sync_queue_size: Sync handler calls allowed to wait for a thread before
+                             dispatch itself waits
+            sync_thread_name: Thread name prefix of the sync handler pool
+            instrument: Record queue latency, queue depth and per-pattern handler time
+                        and errors, reported by stats(); off by default, as it costs almost
+                        half of per-event emit throughput
+            priorities: Priority class per event type pattern (default class 0; the
+                        highest matching class wins). Events may also carry their own
+                        class in a `priority` field. Higher classes are dispatched first;
+                        None keeps a single FIFO queue
+            starvation_limit: With priorities, lower classes still get at least one
+                              event dispatched after this many higher-class ones
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+        if max_queue_size < 0:
+            raise ValueError("max_queue_size must be >= 0")
+        if overflow not in ("block", "drop_oldest", "drop_newest", "spill"):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        if overflow == "spill" and spill_wal is None:
+            raise ValueError("overflow='spill' requires a spill_wal")
+        if sync_workers < 1:
+            raise ValueError("sync_workers must be >= 1")
+        if starvation_limit < 1:
+            raise ValueError("starvation_limit must be >= 1")
+        self.batch_size = batch_size
+        self.max_queue_size = max_queue_size
+        self.overflow = overflow
+        self._spill_wal = spill_wal
+        self.lanes = lanes
+        self.lane_size = lane_size
+        self.lane_overflow = lane_overflow
+        self.sync_workers = sync_workers
+        self.sync_queue_size = sync_queue_size
+        self.sync_thread_name = sync_thread_name
+        self._executor: ThreadPoolExecutor | None = None
+        self._sync_slots = asyncio.Semaphore(sync_workers + sync_queue_size)
+        self._sync_in_flight = 0
+        self.metrics = MetricsCollector()
+        self.instrument = instrument
+        self._stats = _BusStats()
+        self._subscribers: dict[str, list[Subscription]] = {}
+        # Routing index: exact topics are looked up directly, wildcard patterns are
+        # compiled once, and the resolved handler list is cached per event type.
+        self._pattern_seq: dict[str, int] = {}
+        self._pattern_counter = itertools.count()
+        self._exact: set[str] = set()
+        self._wildcards: dict[str, Callable[[str], Any]] = {}
+        self._routes: dict[str, list[Subscription]] = {}
+        self.priorities = dict(priorities) if priorities is not None else None
+        self._priority_matchers = [
+            (re.compile(fnmatch.translate(pattern)).match, level)
+            for pattern, level in (priorities or {}).items()
+        ]
+        self._type_priority: dict[str, int] = {}
+        if priorities is None:
+            self._queue: _BusQueue = _BusQueue(maxsize=max_queue_size)
+        else:
+            lanes = _PriorityLanes(self._priority, starvation_limit)
+            self._queue = _PriorityQueue(max_queue_size, lanes)
+        # Live events held back while a catch-up-then-live replay is in progress
+        self._held: list[BaseEvent] | None = None
         self._running = False
         self._task: asyncio.Task | None = None
 
@@ -21,6 +479,12 @@ class InMemoryEventBus:
         if self._running:
             return
         self._running = True
+        for subs in self._subscribers.values():
+            for sub in subs:
+                if sub.lane:
+                    sub.lane.start()
+                if sub.coalescer:
+                    sub.coalescer.start()
         self._task = asyncio.create_task(self._process_queue())
 
     async def stop(self):
@@ -32,40 +496,384 @@ class InMemoryEventBus:
             self._task.cancel()
             with contextlib.suppress(asyncio.CancelledError):
                 await self._task
+        tasks: list[asyncio.Task] = []
+        for subs in self._subscribers.values():
+            for sub in subs:
+                if sub.lane:
+                    tasks += sub.lane.cancel()
+                if sub.coalescer:
+                    tasks += sub.coalescer.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def subscribe(
+        self,
+        pattern: str,
+        handler: Callable[..., Any],
+        batch: bool = False,
+        lane: bool | None = None,
+        concurrency: int = 1,
+        ordering: LaneOrdering = "fifo",
+        inline: bool = False,
+        coalesce: float | None = None,
+        coalesce_key: Callable[[BaseEvent], Hashable | None] = task_key,
+    ):
+        """Subscribe to events matching the pattern (supports wildcards).
 
-    def subscribe(self, pattern: str, handler: Callable[[BaseEvent], Any]):
-        """Subscribe to events matching the pattern (supports wildcards)."""
+        With batch=True the handler is called once per drained batch with the list of
+        matching events instead of once per event.
+
+        With a lane (lane=True, the bus-wide lanes default, or concurrency > 1) the
+        handler runs on its own bounded queue and worker task(s). ordering is "fifo" per
+        subscriber (requires concurrency=1), "correlation_id" (FIFO per correlation_id
+        across concurrency workers) or "none".
+
+        Sync handlers run on the bus thread pool unless inline=True, which calls them
+        directly on the event loop; use it only for cheap, non-blocking handlers.
+
+        With coalesce (a window in seconds), matching events are held for the window and
+        only the latest per coalesce_key(event) is delivered; the default key is
+        (type, task_id). Events with a duplicate id are dropped. This suits subscribers
+        that only track the latest state, such as dashboards.
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be >= 1")
+        if ordering == "fifo" and concurrency > 1:
+            raise ValueError("ordering='fifo' requires concurrency=1")
+        if ordering not in ("fifo", "correlation_id", "none"):
+            raise ValueError(f"Unknown lane ordering: {ordering}")
+        if coalesce is not None and coalesce <= 0:
+            raise ValueError("coalesce must be > 0")
         if pattern not in self._subscribers:
             self._subscribers[pattern] = []
-        self._subscribers[pattern].append(handler)
+            self._pattern_seq[pattern] = next(self._pattern_counter)
+            if _is_wildcard(pattern):
+                self._wildcards[pattern] = re.compile(fnmatch.translate(pattern)).match
+            else:
+                self._exact.add(pattern)
+        sub = Subscription(pattern, handler, batch, inline)
+        if self.instrument:
+            sub.stats = self._stats.handlers.setdefault(pattern, _HandlerStats())
+        if lane or (lane is None and (self.lanes or concurrency > 1)):
+            sub.lane = _Lane(self, sub, concurrency, ordering, self.lane_size, self.lane_overflow)
+            if self._running:
+                sub.lane.start()
+        if coalesce is not None:
+            sub.coalescer = _Coalescer(self, sub, coalesce, coalesce_key)
+            if self._running:
+                sub.coalescer.start()
+        self._subscribers[pattern].append(sub)
+        self._routes.clear()
+
+    def unsubscribe(self, pattern: str, handler: Callable[..., Any]) -> bool:
+        """Remove a handler previously subscribed to pattern.
+
+        Returns:
+            True if the handler was subscribed and has been removed
+        """
+        subs = self._subscribers.get(pattern, [])
+        sub = next((s for s in subs if s.handler == handler), None)
+        if sub is None:
+            return False
+        subs.remove(sub)
+        if sub.lane:
+            sub.lane.cancel()
+        if sub.coalescer:
+            sub.coalescer.cancel()
+        if not subs:
+            del self._subscribers[pattern]
+            del self._pattern_seq[pattern]
+            self._exact.discard(pattern)
+            self._wildcards.pop(pattern, None)
+        self._routes.clear()
+        return True
+
+    def _resolve(self, event_type: str) -> list[Subscription]:
+        """Return the subscriptions matching event_type, in subscription order."""
+        routes = self._routes.get(event_type)
+        if routes is not None:
+            return routes
+        patterns = [p for p, match in self._wildcards.items() if match(event_type)]
+        if event_type in self._exact:
+            patterns.append(event_type)
+        patterns.sort(key=self._pattern_seq.__getitem__)
+        routes = [sub for p in patterns for sub in self._subscribers[p]]
+        self._routes[event_type] = routes
+        return routes
+
+    def _priority(self, event: BaseEvent) -> int:
+        """Priority class of an event: its own priority field, else by type pattern."""
+        level = _field(event, "priority")
+        if level is not None:
+            return level
+        level = self._type_priority.get(event.type)
+        if level is None:
+            levels = [lvl for match, lvl in self._priority_matchers if match(event.type)]
+            level = self._type_priority[event.type] = max(levels, default=0)
+        return level
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of events waiting to be dispatched."""
+        return self._queue.qsize()
 
     async def emit(self, event: BaseEvent):
-        """Emit an event to the bus."""
-        await self._queue.put(event)
+        """Emit an event to the bus, applying the overflow policy if the queue is full."""
+        if self._held is not None:
+            self._held.append(event)
+            return
+        if self.overflow != "block" and self._queue.full():
+            self._overflow(event)
+        else:
+            await self._queue.put((time.perf_counter(), event))
+        self.metrics.gauge("event_bus.queue_depth", self._queue.qsize())
+
+    async def emit_many(self, events: Iterable[BaseEvent]):
+        """Emit several events to the bus, preserving their order."""
+        if self._held is not None:
+            self._held.extend(events)
+            return
+        queue = self._queue
+        now = time.perf_counter()
+        items = [(now, event) for event in events]
+        # The queue is full from here on, unless a blocked put let the consumer drain it
+        for item in items[queue.put_many_nowait(items) :]:
+            if not queue.full():
+                queue.put_nowait(item)
+            elif self.overflow == "block":
+                await queue.put(item)
+            else:
+                self._overflow(item[1])
+        self.metrics.gauge("event_bus.queue_depth", queue.qsize())
+
+    async def replay(
+        self,
+        wal: WAL,
+        since: int | datetime | None = None,
+        rate: float | None = None,
+        batch_size: int = 256,
+        types: Iterable[str] | None = None,
+        live: bool = False,
+    ) -> int:
+        """Stream events recovered from a WAL to the subscribers, in log order.
+
+        Replayed events never hit the overflow policy: when the queue is full, replay
+        waits for room instead of dropping or spilling them.
+
+        Args:
+            wal: WAL to read (a SegmentedWAL starts at its checkpoint by default)
+            since: WAL offset of the first entry to replay, or a datetime: only events
+                   stamped at or after it are replayed
+            rate: Maximum average events per second; batches are held back to keep to it
+            batch_size: Events recovered and queued at a time
+            types: Only replay events whose type matches one of these patterns
+            live: Catch-up-then-live mode: events emitted while the replay runs are held
+                  back and delivered after the replayed ones
+
+        Returns:
+            Number of replayed events, once all are queued for dispatch
+        """
+        if rate is not None and rate <= 0:
+            raise ValueError("rate must be > 0")
+        if live:
+            if self._held is not None:
+                raise RuntimeError("A live replay is already in progress")
+            self._held = []
+        # Without an offset, each WAL picks its own start (e.g. the checkpoint)
+        start = {"from_offset": since} if isinstance(since, int) else {}
+        cutoff = since if isinstance(since, datetime) else None
+        if cutoff is not None and cutoff.tzinfo is not None:
+            # Event timestamps are naive UTC
+            cutoff = cutoff.astimezone(UTC).replace(tzinfo=None)
+
+        replayed = 0
+        started = time.monotonic()
+        try:
+            batches = wal.arecover_iter(types, batch_size=batch_size, **start)
+            async with contextlib.aclosing(batches):
+                async for batch in batches:
+                    if cutoff is not None:
+                        batch = [e for e in batch if e.timestamp >= cutoff]
+                    if rate is not None:
+                        delay = started + replayed / rate - time.monotonic()
+                        if delay > 0:
+                            await asyncio.sleep(delay)
+                    for event in batch:
+                        await self._queue.put((time.perf_counter(), event))
+                    replayed += len(batch)
+                    self.metrics.increment("event_bus.replayed", len(batch))
+                    self.metrics.gauge("event_bus.queue_depth", self._queue.qsize())
+        finally:
+            if live:
+                # Release held live events; emits arriving meanwhile are appended and
+                # drained too, so nothing overtakes them
+                held = self._held
+                i = 0
+                while i < len(held):
+                    await self._queue.put((time.perf_counter(), held[i]))
+                    i += 1
+                self._held = None
+        return replayed
+
+    def stats(self) -> dict[str, Any]:
+        """Snapshot of the bus instrumentation.
+
+        Returns:
+            queue_depth (current), priority_depths (current, per priority class, when
+            priorities are set), lane_depths (current, per pattern), dropped (by the queue
+            and lane overflow policies) and spilled counts, and histogram summaries (count,
+            mean, min, max, p50/p90/p99): dispatch_latency (seconds from emit to dispatch),
+            queue_depth_samples (depth after each drain) and, per pattern, handler calls,
+            errors and time (seconds)
+        """
+        metrics = self.metrics.get_metrics()
+        lane_depths: dict[str, int] = {}
+        dropped = metrics.get("event_bus.dropped", 0)
+        for pattern, subs in self._subscribers.items():
+            for sub in subs:
+                if sub.lane:
+                    lane_depths[pattern] = lane_depths.get(pattern, 0) + sub.lane.depth
+            if pattern in lane_depths:
+                # One counter per pattern, shared by its lanes
+                dropped += metrics.get(f"event_bus.lane.{pattern}.dropped", 0)
+        current: dict[str, Any] = {}
+        if isinstance(self._queue, _PriorityQueue):
+            current["priority_depths"] = self._queue.depths()
+        return self._stats.snapshot(
+            queue_depth=self._queue.qsize(),
+            **current,
+            lane_depths=lane_depths,
+            dropped=int(dropped),
+            spilled=int(metrics.get("event_bus.spilled", 0)),
+        )
+
+    def _overflow(self, event: BaseEvent):
+        """Apply the non-blocking overflow policy to an event that does not fit the queue."""
+        if self.overflow == "spill":
+            self._spill_wal.append(event)
+            self.metrics.increment("event_bus.spilled")
+            return
+        if self.overflow == "drop_oldest":
+            item = (time.perf_counter(), event)
+            if isinstance(self._queue, _PriorityQueue):
+                # Evict from the lowest class, or drop the event if it is lower still
+                self._queue.replace_lowest(item)
+            else:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self._queue.put_nowait(item)
+        self.metrics.increment("event_bus.dropped")
 
     async def _process_queue(self):
-        """Process events from the queue in FIFO order."""
+        """Process events in queue order, draining up to batch_size per wakeup.
+
+        The order is FIFO, or FIFO per priority class with higher classes first.
+        """
+        queue = self._queue
         while self._running:
             try:
-                event = await self._queue.get()
-                await self._handle_event(event)
-                self._queue.task_done()
+                items = [await queue.get()]
+                items += queue.get_many_nowait(self.batch_size - 1)
+                depth = queue.qsize()
+                self.metrics.gauge("event_bus.queue_depth", depth)
+                if self.instrument:
+                    self._record_latency(items)
+                    self._stats.queue_depth.record(depth)
+                await self._handle_batch([event for _, event in items])
+                queue.tasks_done(len(items))
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 # Log error, but continue processing
                 print(f"Error processing event: {e}")
 
+    def _record_latency(self, items: list[tuple[float, BaseEvent]]):
+        """Record the emit-to-dispatch latency of drained (enqueued_at, event) items."""
+        now = time.perf_counter()
+        record = self._stats.dispatch_latency.record
+        # Events from one emit_many call share their enqueue time: record them at once
+        last = items[0][0]
+        n = 0
+        for t, _ in items:
+            if t != last:
+                record(now - last, n)
+                last = t
+                n = 0
+            n += 1
+        record(now - last, n)
+
+    async def _handle_batch(self, batch: list[BaseEvent]):
+        """Dispatch a drained batch: per-event handlers in order, then batch handlers.
+
+        Subscriptions with a coalescing window or a lane only get the event queued there.
+        """
+        grouped: dict[int, tuple[Subscription, list[BaseEvent]]] = {}
+        etype: str | None = None
+        subs: list[Subscription] = []
+        for event in batch:
+            if event.type != etype:  # runs of one type resolve once
+                etype = event.type
+                subs = self._resolve(etype)
+            for sub in subs:
+                if sub.coalescer:
+                    sub.coalescer.add(event)
+                elif sub.lane:
+                    await sub.lane.put(event)
+                elif sub.batch:
+                    grouped.setdefault(id(sub), (sub, []))[1].append(event)
+                else:
+                    await self._call(sub, event)
+        for sub, events in grouped.values():
+            await self._call(sub, events)
+
     async def _handle_event(self, event: BaseEvent):
         """Handle a single event by calling matching subscribers."""
-        for pattern, handlers in self._subscribers.items():
-            if fnmatch.fnmatch(event.type, pattern):
-                for handler in handlers:
-                    try:
-                        if asyncio.iscoroutinefunction(handler):
-                            await handler(event)
-                        else:
-                            # Run sync handler in thread pool
-                            await asyncio.get_event_loop().run_in_executor(None, handler, event)
-                    except Exception as e:
-                        print(f"Error in handler for {pattern}: {e}")
+        await self._handle_batch([event])
+
+    async def _call(self, sub: Subscription, payload: Any):
+        """Invoke one handler with an event (or a list of events for batch handlers)."""
+        stats = sub.stats
+        start = time.perf_counter()
+        try:
+            if sub.is_async:
+                await sub.handler(payload)
+            elif sub.inline:
+                sub.handler(payload)
+            else:
+                await self._run_sync(sub.handler, payload)
+        except Exception as e:
+            if stats is not None:
+                stats.errors += 1
+            self.metrics.increment("event_bus.handler_errors")
+            print(f"Error in handler for {sub.pattern}: {e}")
+        finally:
+            if stats is not None:
+                stats.calls += 1
+                stats.time.record(time.perf_counter() - start)
+
+    async def _run_sync(self, handler: Callable[..., Any], payload: Any):
+        """Run a sync handler on the bus thread pool, tracking queue depth and saturation."""
+        async with self._sync_slots:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.sync_workers, thread_name_prefix=self.sync_thread_name
+                )
+            if self._sync_in_flight >= self.sync_workers:
+                self.metrics.increment("event_bus.sync.saturated")
+            self._sync_in_flight += 1
+            self._record_sync_load()
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, handler, payload)
+            finally:
+                self._sync_in_flight -= 1
+                self._record_sync_load()
+
+    def _record_sync_load(self):
+        in_flight = self._sync_in_flight
+        self.metrics.gauge("event_bus.sync.queue_depth", max(0, in_flight - self.sync_workers))
+        self.metrics.gauge(
+            "event_bus.sync.saturation", min(in_flight, self.sync_workers) / self.sync_workers
+        )
@@ -0,0 +1,174 @@
+import asyncio
+import threading
+from collections.abc import Callable, Coroutine, Iterable
+from typing import Any
+
+from core.events import BaseEvent
+from services.event_bus.bus_inmem import InMemoryEventBus, _BusStats
+
+
+def correlation_key(event: BaseEvent) -> Any:
+    """Default partition key: the correlation_id, or the event id when there is none."""
+    return event.correlation_id or event.id
+
+
+class _PartitionLoop:
+    """A dedicated thread running its own asyncio event loop."""
+
+    def __init__(self, name: str):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def start(self):
+        self.thread.start()
+
+    async def call(self, coro: Coroutine) -> Any:
+        """Run coro on this loop and await its result from the caller's loop."""
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+    def call_sync(self, coro: Coroutine) -> Any:
+        """Run coro on this loop and block until it finishes."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+async def _invoke(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    return fn(*args, **kwargs)
+
+
+class PartitionedEventBus:
+    """Event bus sharded over N InMemoryEventBus partitions keyed by correlation_id.
+
+    Events with the same key always land on the same partition, so ordering is kept per
+    key while dispatch is spread over independent consumers. With threaded=True every
+    partition runs on its own thread and event loop; handlers then run on those threads
+    and must be thread-safe.
+    """
+
+    def __init__(
+        self,
+        partitions: int = 4,
+        key: Callable[[BaseEvent], Any] = correlation_key,
+        threaded: bool = False,
+        **bus_options: Any,
+    ):
+        """Initialize the partitioned bus.
+
+        Args:
+            partitions: Number of partitions
+            key: Function mapping an event to its partition key
+            threaded: Run each partition on a dedicated thread and event loop
+            **bus_options: Options passed to every InMemoryEventBus partition
+        """
+        if partitions < 1:
+            raise ValueError("partitions must be >= 1")
+        self.key = key
+        self.threaded = threaded
+        self.partitions = [InMemoryEventBus(**bus_options) for _ in range(partitions)]
+        self._loops: list[_PartitionLoop] = []
+        self._running = False
+
+    async def start(self):
+        """Start every partition."""
+        if self._running:
+            return
+        self._running = True
+        if not self.threaded:
+            for bus in self.partitions:
+                await bus.start()
+            return
+        self._loops = [
+            _PartitionLoop(f"lunacore-event-bus-p{i}") for i in range(len(self.partitions))
+        ]
+        for loop, bus in zip(self._loops, self.partitions, strict=True):
+            loop.start()
+            await loop.call(bus.start())
+
+    async def stop(self):
+        """Stop every partition (and its thread when threaded)."""
+        if not self._running:
+            return
+        self._running = False
+        if not self.threaded:
+            for bus in self.partitions:
+                await bus.stop()
+            return
+        for loop, bus in zip(self._loops, self.partitions, strict=True):
+            await loop.call(bus.stop())
+            loop.stop()
+        self._loops = []
+
+    def subscribe(self, pattern: str, handler: Callable[..., Any], **options: Any):
+        """Subscribe handler on every partition; options are those of InMemoryEventBus."""
+        self._broadcast(InMemoryEventBus.subscribe, pattern, handler, **options)
+
+    def unsubscribe(self, pattern: str, handler: Callable[..., Any]) -> bool:
+        """Remove handler from every partition."""
+        return any(self._broadcast(InMemoryEventBus.unsubscribe, pattern, handler))
+
+    def _broadcast(self, method: Callable[..., Any], *args: Any, **kwargs: Any) -> list[Any]:
+        if not self._loops:
+            return [method(bus, *args, **kwargs) for bus in self.partitions]
+        # Running partitions own their state; mutate it on their own loop
+        return [
+            loop.call_sync(_invoke(method, bus, *args, **kwargs))
+            for loop, bus in zip(self._loops, self.partitions, strict=True)
+        ]
+
+    def partition_for(self, event: BaseEvent) -> int:
+        """Index of the partition an event is routed to."""
+        return hash(self.key(event)) % len(self.partitions)
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of events waiting to be dispatched across all partitions."""
+        return sum(bus.queue_depth for bus in self.partitions)
+
+    def stats(self) -> dict[str, Any]:
+        """Instrumentation merged over all partitions, plus each partition's own stats.
+
+        Same keys as InMemoryEventBus.stats(); "partitions" lists per-partition snapshots.
+        """
+        merged = _BusStats()
+        lane_depths: dict[str, int] = {}
+        parts = []
+        for bus in self.partitions:
+            merged.merge(bus._stats)
+            part = bus.stats()
+            for pattern, depth in part["lane_depths"].items():
+                lane_depths[pattern] = lane_depths.get(pattern, 0) + depth
+            parts.append(part)
+        return merged.snapshot(
+            queue_depth=sum(p["queue_depth"] for p in parts),
+            lane_depths=lane_depths,
+            dropped=sum(p["dropped"] for p in parts),
+            spilled=sum(p["spilled"] for p in parts),
+            partitions=parts,
+        )
+
+    async def emit(self, event: BaseEvent):
+        """Emit an event to the partition owning its key."""
+        i = self.partition_for(event)
+        if self._loops:
+            await self._loops[i].call(self.partitions[i].emit(event))
+        else:
+            await self.partitions[i].emit(event)
+
+    async def emit_many(self, events: Iterable[BaseEvent]):
+        """Emit several events, handing each partition its share in one call."""
+        shares: dict[int, list[BaseEvent]] = {}
+        for event in events:
+            shares.setdefault(self.partition_for(event), []).append(event)
+        for i, share in shares.items():
+            if self._loops:
+                await self._loops[i].call(self.partitions[i].emit_many(share))
+            else:
+                await self.partitions[i].emit_many(share)
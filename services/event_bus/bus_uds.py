@@ -0,0 +1,252 @@
+import asyncio
+import contextlib
+import fnmatch
+import os
+import re
+import struct
+from collections import Counter
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from core.events import BaseEvent
+from services.event_bus.bus_inmem import InMemoryEventBus
+from services.event_bus.codec import (
+    decode_event,
+    encode_event,
+    pack_frames,
+    peek_type,
+    unpack_frames,
+)
+
+# Wire message: u32 body length, u8 kind, body
+_HEADER = struct.Struct("!IB")
+SUBSCRIBE, UNSUBSCRIBE, EVENTS = 1, 2, 3
+
+
+def _message(kind: int, body: bytes) -> bytes:
+    return _HEADER.pack(len(body), kind) + body
+
+
+async def _read_message(reader: asyncio.StreamReader) -> tuple[int, bytes]:
+    length, kind = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    return kind, await reader.readexactly(length)
+
+
+class _BrokerConnection:
+    """A connected bus client and the patterns it subscribed to."""
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.patterns: Counter[str] = Counter()
+        self._matchers: list[Callable[[str], Any]] = []
+        self._routes: dict[str, bool] = {}
+
+    def update(self, pattern: str, delta: int):
+        self.patterns[pattern] += delta
+        if self.patterns[pattern] <= 0:
+            del self.patterns[pattern]
+        self._matchers = [re.compile(fnmatch.translate(p)).match for p in self.patterns]
+        self._routes.clear()
+
+    def matches(self, event_type: str) -> bool:
+        hit = self._routes.get(event_type)
+        if hit is None:
+            hit = self._routes[event_type] = any(m(event_type) for m in self._matchers)
+        return hit
+
+
+class EventBroker:
+    """Local broker relaying events between UnixSocketEventBus clients.
+
+    Events are forwarded as encoded frames, without decoding, to every connection
+    (the publisher included) with a matching subscription. Each incoming batch is sent
+    to each destination as a single message.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._server: asyncio.AbstractServer | None = None
+        self._connections: set[_BrokerConnection] = set()
+
+    async def start(self):
+        """Start listening on the socket path."""
+        if self._server:
+            return
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._serve, path=self.path)
+
+    async def stop(self):
+        """Stop listening and disconnect all clients."""
+        if not self._server:
+            return
+        self._server.close()
+        for conn in list(self._connections):
+            conn.writer.close()
+        await self._server.wait_closed()
+        self._server = None
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.path)
+
+    async def serve_forever(self):
+        """Run the broker until cancelled."""
+        await self.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.stop()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        conn = _BrokerConnection(writer)
+        self._connections.add(conn)
+        try:
+            while True:
+                kind, body = await _read_message(reader)
+                if kind == SUBSCRIBE:
+                    conn.update(body.decode("utf-8"), 1)
+                elif kind == UNSUBSCRIBE:
+                    conn.update(body.decode("utf-8"), -1)
+                elif kind == EVENTS:
+                    await self._route(body)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._connections.discard(conn)
+            writer.close()
+
+    async def _route(self, body: bytes):
+        outgoing: dict[_BrokerConnection, list[memoryview]] = {}
+        for frame in unpack_frames(body):
+            event_type = peek_type(frame)
+            for conn in self._connections:
+                if conn.matches(event_type):
+                    outgoing.setdefault(conn, []).append(frame)
+        for conn, frames in outgoing.items():
+            conn.writer.write(_message(EVENTS, pack_frames(frames)))
+        for conn in outgoing:
+            with contextlib.suppress(ConnectionError):
+                await conn.writer.drain()
+
+
+class UnixSocketEventBus:
+    """Event bus shared between processes through an EventBroker on a Unix socket.
+
+    Same interface as InMemoryEventBus: emitted events are batched on the wire to the
+    broker, and events received from it are dispatched by a local InMemoryEventBus, so
+    all its subscribe options apply.
+    """
+
+    def __init__(self, path: str, batch_size: int = 256, **bus_options: Any):
+        """Initialize the client.
+
+        Args:
+            path: Socket path of the EventBroker
+            batch_size: Maximum number of events per wire message
+            **bus_options: Options for the local InMemoryEventBus dispatching received events
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self._local = InMemoryEventBus(**bus_options)
+        self._patterns: Counter[str] = Counter()
+        self._pending: list[bytes] = []
+        self._flush_scheduled = False
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._recv_task: asyncio.Task | None = None
+
+    @property
+    def metrics(self):
+        return self._local.metrics
+
+    @property
+    def queue_depth(self) -> int:
+        return self._local.queue_depth
+
+    def stats(self) -> dict[str, Any]:
+        """Instrumentation of the local bus dispatching received events."""
+        return self._local.stats()
+
+    async def start(self):
+        """Connect to the broker and start dispatching."""
+        if self._writer:
+            return
+        await self._local.start()
+        self._reader, self._writer = await asyncio.open_unix_connection(self.path)
+        for pattern in self._patterns:
+            self._writer.write(_message(SUBSCRIBE, pattern.encode("utf-8")))
+        self._recv_task = asyncio.create_task(self._receive())
+        await self.flush()
+
+    async def stop(self):
+        """Flush pending events, disconnect and stop dispatching."""
+        if not self._writer:
+            return
+        await self.flush()
+        if self._recv_task:
+            self._recv_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._recv_task
+        self._writer.close()
+        with contextlib.suppress(ConnectionError):
+            await self._writer.wait_closed()
+        self._reader = self._writer = None
+        await self._local.stop()
+
+    def subscribe(self, pattern: str, handler: Callable[..., Any], **options: Any):
+        """Subscribe to events matching the pattern, from any process on the broker."""
+        self._local.subscribe(pattern, handler, **options)
+        self._patterns[pattern] += 1
+        if self._patterns[pattern] == 1 and self._writer:
+            self._writer.write(_message(SUBSCRIBE, pattern.encode("utf-8")))
+
+    def unsubscribe(self, pattern: str, handler: Callable[..., Any]) -> bool:
+        """Remove a handler previously subscribed to pattern."""
+        if not self._local.unsubscribe(pattern, handler):
+            return False
+        self._patterns[pattern] -= 1
+        if self._patterns[pattern] == 0:
+            del self._patterns[pattern]
+            if self._writer:
+                self._writer.write(_message(UNSUBSCRIBE, pattern.encode("utf-8")))
+        return True
+
+    async def emit(self, event: BaseEvent):
+        """Emit an event to every subscribed process."""
+        self._pending.append(encode_event(event))
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+        elif not self._flush_scheduled:
+            # Coalesce events emitted in the same loop iteration into one message
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._write_pending)
+
+    async def emit_many(self, events: Iterable[BaseEvent]):
+        """Emit several events, preserving their order."""
+        for event in events:
+            self._pending.append(encode_event(event))
+            if len(self._pending) >= self.batch_size:
+                await self.flush()
+        await self.flush()
+
+    async def flush(self):
+        """Send pending events to the broker and wait for the socket buffer to drain."""
+        self._write_pending()
+        if self._writer:
+            await self._writer.drain()
+
+    def _write_pending(self):
+        self._flush_scheduled = False
+        if not self._pending or not self._writer:
+            return
+        pending, self._pending = self._pending, []
+        self._writer.write(_message(EVENTS, pack_frames(pending)))
+
+    async def _receive(self):
+        assert self._reader is not None
+        try:
+            while True:
+                kind, body = await _read_message(self._reader)
+                if kind == EVENTS:
+                    await self._local.emit_many(decode_event(f) for f in unpack_frames(body))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
@@ -0,0 +1,554 @@
+import json
+import struct
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from pydantic_core import to_jsonable_python
+
+from core.events import (
+    BaseEvent,
+    EscalationNeededEvent,
+    LiteEvent,
+    TaskCompletedEvent,
+    TaskFailedEvent,
+    TaskStartedEvent,
+    model_for,
+)
+
+# Event classes rebuilt by type on decode; other types decode as BaseEvent
+EVENT_TYPES: dict[str, type[BaseEvent]] = {
+    cls.model_fields["type"].default: cls
+    for cls in (TaskStartedEvent, TaskCompletedEvent, TaskFailedEvent, EscalationNeededEvent)
+}
+
+_BASE_FIELDS = frozenset(BaseEvent.model_fields)
+_EPOCH = datetime(1970, 1, 1)
+
+_U32 = struct.Struct("!I")
+_I64 = struct.Struct("!q")
+_F64 = struct.Struct("!d")
+
+# Value tags. _TDICT is a dict whose keys are string table indices.
+_NONE, _TRUE, _FALSE, _INT, _FLOAT, _STR, _BYTES, _LIST, _DICT, _BIGINT, _TDICT = range(11)
+
+# Binary stream record kinds
+_STRING_DEF, _EVENT = 0, 1
+
+
+def register_event_type(cls: type[BaseEvent]) -> type[BaseEvent]:
+    """Register an event class so it is rebuilt with its own fields on decode."""
+    EVENT_TYPES[cls.model_fields["type"].default] = cls
+    return cls
+
+
+def event_class(event_type: str) -> type[BaseEvent]:
+    """Class events of event_type are rebuilt as: the registered one, else the BaseEvent
+    subclass declaring event_type as its default type (core.events.model_for)."""
+    return EVENT_TYPES.get(event_type) or model_for(event_type)
+
+
+def _pack_uvarint(out: bytearray, n: int) -> None:
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _unpack_uvarint(buf: Any, pos: int) -> tuple[int, int]:
+    b = buf[pos]
+    if b < 0x80:
+        return b, pos + 1
+    result = b & 0x7F
+    shift = 7
+    while True:
+        pos += 1
+        b = buf[pos]
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos + 1
+        shift += 7
+
+
+def _pack_str(out: bytearray, s: str) -> None:
+    b = s.encode("utf-8")
+    n = len(b)
+    if n < 0x80:
+        out.append(n)
+    else:
+        _pack_uvarint(out, n)
+    out += b
+
+
+def _unpack_str(buf: bytes, pos: int) -> tuple[str, int]:
+    n = buf[pos]
+    if n < 0x80:
+        pos += 1
+    else:
+        n, pos = _unpack_uvarint(buf, pos)
+    end = pos + n
+    return buf[pos:end].decode("utf-8"), end
+
+
+class StringTable:
+    """Strings interned by a binary stream; indices are assigned in first-use order."""
+
+    def __init__(self):
+        self.index: dict[str, int] = {}
+        self.strings: list[str] = []
+        self.new: list[str] = []  # defined since the last record was written
+
+    def intern(self, s: str) -> int:
+        i = self.index.get(s)
+        if i is None:
+            i = self.index[s] = len(self.strings)
+            self.strings.append(s)
+            self.new.append(s)
+        return i
+
+
+def _pack_value(out: bytearray, v: Any, table: StringTable | None) -> None:
+    # Exact type checks first: they cover nearly all payload values and are cheaper
+    # than the isinstance chain below
+    t = type(v)
+    if t is str:
+        out.append(_STR)
+        _pack_str(out, v)
+    elif t is dict:
+        _pack_dict(out, v, table)
+    elif v is None:
+        out.append(_NONE)
+    elif v is True:
+        out.append(_TRUE)
+    elif v is False:
+        out.append(_FALSE)
+    elif isinstance(v, int):
+        if -(2**63) <= v < 2**63:
+            out.append(_INT)
+            _pack_uvarint(out, (v << 1) ^ (v >> 63))  # zigzag
+        else:
+            out.append(_BIGINT)
+            _pack_str(out, str(v))
+    elif isinstance(v, float):
+        out.append(_FLOAT)
+        out += _F64.pack(v)
+    elif isinstance(v, str):
+        out.append(_STR)
+        _pack_str(out, v)
+    elif isinstance(v, bytes | bytearray):
+        out.append(_BYTES)
+        _pack_uvarint(out, len(v))
+        out += v
+    elif isinstance(v, list | tuple):
+        out.append(_LIST)
+        _pack_uvarint(out, len(v))
+        for item in v:
+            _pack_value(out, item, table)
+    elif isinstance(v, dict):
+        _pack_dict(out, v, table)
+    else:
+        # Models, datetimes, sets...: fall back to their JSON-compatible form
+        _pack_value(out, to_jsonable_python(v), table)
+
+
+def _pack_dict(out: bytearray, d: dict, table: StringTable | None) -> None:
+    out.append(_DICT if table is None else _TDICT)
+    _pack_uvarint(out, len(d))
+    for k, item in d.items():
+        if table is None:
+            _pack_str(out, str(k))
+        else:
+            _pack_uvarint(out, table.intern(str(k)))
+        _pack_value(out, item, table)
+
+
+def _unpack_value(buf: bytes, pos: int, strings: list[str] | None) -> tuple[Any, int]:
+    tag = buf[pos]
+    pos += 1
+    if tag == _STR:
+        return _unpack_str(buf, pos)
+    if tag == _INT:
+        z, pos = _unpack_uvarint(buf, pos)
+        return (z >> 1) ^ -(z & 1), pos
+    if tag == _TDICT:
+        return _unpack_tdict(buf, pos, strings)  # type: ignore[arg-type]
+    if tag == _DICT:
+        n, pos = _unpack_uvarint(buf, pos)
+        d = {}
+        for _ in range(n):
+            k, pos = _unpack_str(buf, pos)
+            d[k], pos = _unpack_value(buf, pos, strings)
+        return d, pos
+    if tag == _NONE:
+        return None, pos
+    if tag == _TRUE:
+        return True, pos
+    if tag == _FALSE:
+        return False, pos
+    if tag == _FLOAT:
+        return _F64.unpack_from(buf, pos)[0], pos + 8
+    if tag == _BIGINT:
+        s, pos = _unpack_str(buf, pos)
+        return int(s), pos
+    if tag == _BYTES:
+        n, pos = _unpack_uvarint(buf, pos)
+        return bytes(buf[pos : pos + n]), pos + n
+    if tag == _LIST:
+        n, pos = _unpack_uvarint(buf, pos)
+        items = []
+        for _ in range(n):
+            item, pos = _unpack_value(buf, pos, strings)
+            items.append(item)
+        return items, pos
+    raise ValueError(f"Unknown value tag: {tag}")
+
+
+def _unpack_tdict(buf: bytes, pos: int, strings: list[str]) -> tuple[dict[str, Any], int]:
+    # The hot path of stream decoding: short keys, strings and ints (one-byte lengths
+    # and varints) are read inline rather than through calls
+    n, pos = _unpack_uvarint(buf, pos)
+    d = {}
+    for _ in range(n):
+        i = buf[pos]
+        if i < 0x80:
+            pos += 1
+        else:
+            i, pos = _unpack_uvarint(buf, pos)
+        k = strings[i]
+        tag = buf[pos]
+        if tag == _STR and buf[pos + 1] < 0x80:
+            end = pos + 2 + buf[pos + 1]
+            d[k] = buf[pos + 2 : end].decode("utf-8")
+            pos = end
+        elif tag == _INT and buf[pos + 1] < 0x80:
+            z = buf[pos + 1]
+            d[k] = (z >> 1) ^ -(z & 1)
+            pos += 2
+        else:
+            d[k], pos = _unpack_value(buf, pos, strings)
+    return d, pos
+
+
+def _to_micros(ts: datetime) -> int:
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(UTC).replace(tzinfo=None)
+    delta = ts - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _encode_payload(event: BaseEvent | LiteEvent, table: StringTable | None) -> bytes:
+    """Encode type, id, correlation_id, epoch micros, data and extra fields.
+
+    Without a table the type is written inline; with one it is a table index.
+    """
+    out = bytearray()
+    if table is None:
+        _pack_str(out, event.type)
+    else:
+        _pack_uvarint(out, table.intern(event.type))
+    _pack_str(out, event.id)
+    _pack_value(out, event.correlation_id, table)
+    if isinstance(event, LiteEvent):
+        out += _I64.pack(event.ts_ns // 1000)
+        _pack_value(out, event.data, table)
+        _pack_value(out, event.fields, table)
+    else:
+        out += _I64.pack(_to_micros(event.timestamp))
+        _pack_value(out, event.data, table)
+        extra = {k: v for k, v in event.__dict__.items() if k not in _BASE_FIELDS}
+        _pack_value(out, extra, table)
+    return bytes(out)
+
+
+# Field names of the event classes _construct can build without model_construct
+_DIRECT_FIELDS: dict[type[BaseEvent], Any] = {}
+_setattr = object.__setattr__
+
+
+def _construct(cls: type[BaseEvent], values: dict[str, Any]) -> BaseEvent:
+    """cls.model_construct(**values), faster when values holds exactly cls's fields.
+
+    That is the case for every event encoded from an instance of a registered class.
+    The model's attributes are then set directly, as model_construct does, which takes
+    about a third of the time.
+    """
+    fields = _DIRECT_FIELDS.get(cls)
+    if fields is None:
+        simple = not cls.__private_attributes__ and cls.model_config.get("extra") != "allow"
+        fields = _DIRECT_FIELDS[cls] = cls.model_fields.keys() if simple else ()
+    if values.keys() != fields:
+        return cls.model_construct(**values)
+    event = cls.__new__(cls)
+    _setattr(event, "__dict__", values)
+    _setattr(event, "__pydantic_fields_set__", set(values))
+    _setattr(event, "__pydantic_extra__", None)
+    _setattr(event, "__pydantic_private__", None)
+    return event
+
+
+def _decode_payload(payload: bytes | memoryview, strings: list[str] | None) -> BaseEvent:
+    buf = payload if type(payload) is bytes else bytes(payload)
+    if strings is None:
+        etype, pos = _unpack_str(buf, 0)
+    else:
+        i, pos = _unpack_uvarint(buf, 0)
+        etype = strings[i]
+    eid, pos = _unpack_str(buf, pos)
+    correlation_id, pos = _unpack_value(buf, pos, strings)
+    (micros,) = _I64.unpack_from(buf, pos)
+    pos += 8
+    data, pos = _unpack_value(buf, pos, strings)
+    extra, pos = _unpack_value(buf, pos, strings)
+    values = {
+        "type": etype,
+        "data": data,
+        "id": eid,
+        "timestamp": _EPOCH + timedelta(microseconds=micros),
+        "correlation_id": correlation_id,
+    }
+    values.update(extra)
+    return _construct(event_class(etype), values)
+
+
+def encode_event(event: BaseEvent | LiteEvent) -> bytes:
+    """Encode a self-contained event (no string table), as used by transports.
+
+    The type comes first so routers can read it with peek_type without decoding the rest.
+    """
+    return _encode_payload(event, None)
+
+
+def peek_type(payload: bytes | memoryview) -> str:
+    """Read the event type of an event encoded by encode_event."""
+    view = memoryview(payload)
+    n, pos = _unpack_uvarint(view, 0)
+    return str(view[pos : pos + n], "utf-8")
+
+
+def decode_event(payload: bytes | memoryview) -> BaseEvent:
+    """Decode an event produced by encode_event, without re-running validation."""
+    return _decode_payload(payload, None)
+
+
+def pack_frames(payloads: list[bytes]) -> bytes:
+    """Concatenate length-prefixed payloads into one wire batch."""
+    out = bytearray()
+    for p in payloads:
+        out += _U32.pack(len(p))
+        out += p
+    return bytes(out)
+
+
+def unpack_frames(buf: bytes | memoryview) -> list[memoryview]:
+    """Split a wire batch produced by pack_frames back into payloads."""
+    view = memoryview(buf)
+    frames = []
+    pos = 0
+    while pos < len(view):
+        (n,) = _U32.unpack_from(view, pos)
+        pos += 4
+        frames.append(view[pos : pos + n])
+        pos += n
+    return frames
+
+
+# ---------- stream codecs (WAL segments) ----------
+
+
+class StreamEncoder(ABC):
+    """Encodes the events of one stream (e.g. a WAL segment), in write order."""
+
+    @abstractmethod
+    def encode(self, event: BaseEvent | LiteEvent) -> bytes:
+        """Return the bytes to append for event, including any framing or table entries."""
+
+
+class StreamDecoder(ABC):
+    """Decodes the records of one stream produced by the matching StreamEncoder."""
+
+    #: Length of the valid prefix read so far; a torn tail after it is ignored
+    end: int = 0
+
+    @abstractmethod
+    def records(self, buf: Any) -> Iterator[tuple[str | None, Any]]:
+        """Yield (event type if cheaply known else None, record) for each event record."""
+
+    @abstractmethod
+    def decode(self, record: Any) -> BaseEvent | None:
+        """Decode a record yielded by records(), or return None if it is corrupted."""
+
+
+class EventCodec(ABC):
+    """Pluggable event encoding for WAL segments and other event streams."""
+
+    name: str
+
+    @abstractmethod
+    def new_encoder(self) -> StreamEncoder:
+        """Encoder for a new, empty stream."""
+
+    @abstractmethod
+    def new_decoder(self) -> StreamDecoder:
+        """Decoder for a stream read from its start."""
+
+    def resume_encoder(self, buf: Any) -> tuple[StreamEncoder, int]:
+        """Encoder continuing an existing stream, and the length of its valid prefix."""
+        return self.new_encoder(), len(buf)
+
+
+# Entries are written with "type" as the first key, which lets scans read the type
+# without decoding the whole entry.
+_TYPE_PREFIX = b'{"type": "'
+
+
+def _peek_json_type(line: bytes) -> str | None:
+    if not line.startswith(_TYPE_PREFIX):
+        return None
+    start = len(_TYPE_PREFIX)
+    end = line.find(b'"', start)
+    if end < 0 or b"\\" in line[start:end]:
+        return None
+    return line[start:end].decode("utf-8")
+
+
+class _JsonLinesEncoder(StreamEncoder):
+    def encode(self, event: BaseEvent | LiteEvent) -> bytes:
+        entry = {
+            "type": event.type,
+            "data": event.data,
+            "id": event.id,
+            "timestamp": event.timestamp.isoformat(),
+            "correlation_id": event.correlation_id,
+        }
+        return (json.dumps(entry) + "\n").encode("ascii")
+
+
+class _JsonLinesDecoder(StreamDecoder):
+    def records(self, buf: Any) -> Iterator[tuple[str | None, Any]]:
+        pos = 0
+        size = len(buf)
+        while pos < size:
+            nl = buf.find(b"\n", pos)
+            end = size if nl < 0 else nl
+            line = buf[pos:end].strip()
+            pos = self.end = min(end + 1, size)
+            if line:
+                yield _peek_json_type(line), line
+
+    def decode(self, record: Any) -> BaseEvent | None:
+        try:
+            entry = json.loads(record)
+            return BaseEvent(
+                type=entry["type"],
+                data=entry["data"],
+                id=entry["id"],
+                timestamp=entry["timestamp"],
+                correlation_id=entry.get("correlation_id"),
+            )
+        except (json.JSONDecodeError, KeyError):
+            return None
+
+
+class JsonLinesCodec(EventCodec):
+    """One JSON object per line with an ISO timestamp; the original WAL format."""
+
+    name = "jsonl"
+
+    def new_encoder(self) -> StreamEncoder:
+        return _JsonLinesEncoder()
+
+    def new_decoder(self) -> StreamDecoder:
+        return _JsonLinesDecoder()
+
+    def resume_encoder(self, buf: Any) -> tuple[StreamEncoder, int]:
+        # Every entry ends with a newline: bytes after the last one are a torn write
+        return _JsonLinesEncoder(), buf.rfind(b"\n") + 1
+
+
+class _BinaryEncoder(StreamEncoder):
+    def __init__(self, strings: list[str] | None = None):
+        self.table = StringTable()
+        for s in strings or []:
+            self.table.intern(s)
+        self.table.new.clear()
+
+    def encode(self, event: BaseEvent | LiteEvent) -> bytes:
+        payload = _encode_payload(event, self.table)
+        out = bytearray()
+        for s in self.table.new:
+            b = s.encode("utf-8")
+            _pack_uvarint(out, len(b) + 1)
+            out.append(_STRING_DEF)
+            out += b
+        self.table.new.clear()
+        _pack_uvarint(out, len(payload) + 1)
+        out.append(_EVENT)
+        out += payload
+        return bytes(out)
+
+
+class _BinaryDecoder(StreamDecoder):
+    def __init__(self):
+        self.strings: list[str] = []
+
+    def records(self, buf: Any) -> Iterator[tuple[str | None, Any]]:
+        pos = 0
+        size = len(buf)
+        strings = self.strings
+        while pos < size:
+            try:
+                length, body = _unpack_uvarint(buf, pos)
+            except IndexError:
+                return  # torn length prefix
+            end = body + length
+            if length == 0 or end > size:
+                return  # torn record
+            kind = buf[body]
+            record = buf[body + 1 : end]
+            if kind == _STRING_DEF:
+                try:
+                    s = str(record, "utf-8")
+                except UnicodeDecodeError:
+                    # Later records may refer to this string by index: the valid
+                    # prefix of the stream ends here
+                    return
+                strings.append(s)
+            pos = self.end = end
+            if kind == _EVENT:
+                try:
+                    i, _ = _unpack_uvarint(record, 0)
+                except IndexError:
+                    i = -1  # corrupted entry: decode() skips it
+                yield (strings[i] if 0 <= i < len(strings) else None), record
+
+    def decode(self, record: Any) -> BaseEvent | None:
+        try:
+            return _decode_payload(record, self.strings)
+        except (ValueError, IndexError, KeyError, struct.error, UnicodeDecodeError):
+            return None
+
+
+class BinaryCodec(EventCodec):
+    """Length-prefixed binary records with a per-stream string table.
+
+    Each record is a varint length, a kind byte and a payload. Event types, dict keys
+    and event field names are interned: the first use of a string appends a definition
+    record, later uses are small integers. Timestamps are integer epoch microseconds.
+    Events decode as their own class (see event_class) with all their fields and
+    without validation.
+    """
+
+    name = "binary"
+
+    def new_encoder(self) -> StreamEncoder:
+        return _BinaryEncoder()
+
+    def new_decoder(self) -> StreamDecoder:
+        return _BinaryDecoder()
+
+    def resume_encoder(self, buf: Any) -> tuple[StreamEncoder, int]:
+        decoder = _BinaryDecoder()
+        for _ in decoder.records(buf):
+            pass
+        return _BinaryEncoder(decoder.strings), decoder.end
@@ -1,45 +1,342 @@
 import asyncio
-from collections.abc import Callable
+import contextlib
+import fnmatch
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from typing import Any
 
-from core.events import BaseEvent
+from core.events import BaseEvent, LiteEvent, as_model
+from services.event_bus.codec import event_class
+from services.event_bus.timer_wheel import TimerWheel
+
+
+@dataclass(slots=True)
+class DeadLetter:
+    """An event that exhausted its retries."""
+
+    seq: int  # position in the store, stable across restarts
+    event: BaseEvent
+    retry_count: int
+    error: str | None = None
+    failed_at: float = 0.0  # epoch seconds
+
+
+class DeadLetterStore:
+    """Append-only store of dead letters, persisted as JSON lines.
+
+    Each dead letter is appended once; redriving it appends a marker instead of
+    rewriting the file. Only the file offset of each live dead letter is kept in
+    memory, so paging reads just the requested entries. Without a path the store is
+    kept in memory.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._next_seq = 0
+        # seq -> (file offset, event type) of live dead letters, in seq order
+        self._index: dict[int, tuple[int, str]] = {}
+        self._memory: dict[int, DeadLetter] = {}
+        if path is not None:
+            self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    seq = entry["seq"]
+                    if entry["op"] == "add":
+                        self._index[seq] = (offset, entry["event"]["type"])
+                    else:
+                        self._index.pop(seq, None)
+                    self._next_seq = max(self._next_seq, seq + 1)
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    pass  # Skip a corrupted or torn entry
+                offset += len(line)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _append(self, entries: list[dict[str, Any]]) -> list[int]:
+        """Append entries with one write and one fsync; return the file offset of each."""
+        lines = [(json.dumps(e) + "\n").encode("utf-8") for e in entries]
+        with open(self.path, "ab") as f:
+            offset = f.tell()
+            f.write(b"".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+        offsets = []
+        for line in lines:
+            offsets.append(offset)
+            offset += len(line)
+        return offsets
+
+    def add(
+        self, event: BaseEvent | LiteEvent, retry_count: int, error: str | None = None
+    ) -> DeadLetter:
+        """Persist a dead letter."""
+        return self.add_many([(event, retry_count, error)])[0]
+
+    def add_many(
+        self, letters: Iterable[tuple[BaseEvent | LiteEvent, int, str | None]]
+    ) -> list[DeadLetter]:
+        """Persist (event, retry_count, error) dead letters with a single fsync."""
+        with self._lock:
+            added = []
+            for event, retry_count, error in letters:
+                letter = DeadLetter(
+                    self._next_seq, as_model(event), retry_count, error, time.time()
+                )
+                self._next_seq += 1
+                added.append(letter)
+            if self.path is None:
+                self._memory.update((letter.seq, letter) for letter in added)
+                offsets = [0] * len(added)
+            else:
+                offsets = self._append(
+                    [
+                        {
+                            "op": "add",
+                            "seq": letter.seq,
+                            "retry_count": letter.retry_count,
+                            "error": letter.error,
+                            "failed_at": letter.failed_at,
+                            "event": letter.event.model_dump(mode="json"),
+                        }
+                        for letter in added
+                    ]
+                )
+            for letter, offset in zip(added, offsets, strict=True):
+                self._index[letter.seq] = (offset, letter.event.type)
+            return added
+
+    def _read(self, seq: int, f: Any) -> DeadLetter:
+        if self.path is None:
+            return self._memory[seq]
+        f.seek(self._index[seq][0])
+        entry = json.loads(f.readline())
+        data = entry["event"]
+        return DeadLetter(
+            seq,
+            event_class(data["type"]).model_validate(data),
+            entry["retry_count"],
+            entry["error"],
+            entry["failed_at"],
+        )
+
+    def _matching(self, types: Iterable[str] | None) -> list[int]:
+        """Seqs of the live dead letters whose event type matches types, in seq order."""
+        match = None
+        if types is not None:
+            match = re.compile("|".join(fnmatch.translate(t) for t in types) or "(?!)").match
+        with self._lock:
+            return [s for s, (_, etype) in self._index.items() if match is None or match(etype)]
+
+    def _letters(self, seqs: list[int]) -> Iterator[DeadLetter]:
+        if not seqs:
+            return
+        f = open(self.path, "rb") if self.path is not None else None  # noqa: SIM115
+        try:
+            for seq in seqs:
+                yield self._read(seq, f)
+        finally:
+            if f is not None:
+                f.close()
+
+    def page(
+        self,
+        offset: int = 0,
+        limit: int = 100,
+        types: Iterable[str] | None = None,
+        where: Callable[[DeadLetter], bool] | None = None,
+    ) -> list[DeadLetter]:
+        """Return up to limit live dead letters, oldest first, after skipping offset.
+
+        Args:
+            offset: Number of matching dead letters to skip
+            limit: Maximum number of dead letters returned
+            types: Only dead letters whose event type matches one of these patterns
+            where: Only dead letters for which this predicate is true
+        """
+        seqs = self._matching(types)
+        if where is None:
+            # Skipped letters are never read
+            return list(self._letters(seqs[offset : offset + limit]))
+        page: list[DeadLetter] = []
+        with contextlib.closing(self._letters(seqs)) as letters:
+            matched = (letter for letter in letters if where(letter))
+            for i, letter in enumerate(matched):
+                if len(page) >= limit:
+                    break
+                if i >= offset:
+                    page.append(letter)
+        return page
+
+    def remove(self, seqs: Iterable[int]) -> None:
+        """Mark dead letters as redriven; they no longer appear in pages."""
+        with self._lock:
+            seqs = [s for s in seqs if s in self._index]
+            if self.path is not None and seqs:
+                self._append([{"op": "redrive", "seq": s} for s in seqs])
+            for s in seqs:
+                del self._index[s]
+                self._memory.pop(s, None)
+
+    def clear(self) -> None:
+        """Delete all dead letters."""
+        with self._lock:
+            self._index.clear()
+            self._memory.clear()
+            if self.path is not None:
+                with open(self.path, "w"):
+                    pass
 
 
 class DLQ:
-    """Dead Letter Queue for failed events with retry logic."""
+    """Dead Letter Queue for failed events with retry logic.
 
-    def __init__(self, max_retries: int = 3):
+    Retries use exponential backoff with jitter: retry n waits base_delay * 2**n, reduced
+    by a random fraction of up to `jitter`, so a burst of failures does not retry in
+    lockstep. All retries are driven by one timer wheel rather than a sleeping task
+    each. Events that exhaust max_retries go to the dead-letter store, from where they
+    can be paged through and redriven.
+
+    On an event loop, dead letters for a persistent store are written by a background
+    thread, batched into one fsync per write: a burst of failures does not block the
+    loop. flush() waits until they are stored.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        base_delay: float = 0.1,
+        jitter: float = 0.5,
+        store: DeadLetterStore | None = None,
+        wheel: TimerWheel | None = None,
+    ):
+        """Initialize the DLQ.
+
+        Args:
+            max_retries: Retries before an event becomes a dead letter
+            base_delay: Delay before the first retry, in seconds
+            jitter: Fraction (0-1) of each delay that is randomized
+            store: Dead-letter store; defaults to an in-memory one
+            wheel: Timer wheel scheduling retries; can be shared between DLQs
+        """
+        if not 0 <= jitter <= 1:
+            raise ValueError("jitter must be between 0 and 1")
         self.max_retries = max_retries
-        self.failed_events: list[tuple[BaseEvent, int]] = []  # (event, retry_count)
+        self.base_delay = base_delay
+        self.jitter = jitter
+        self.store = store if store is not None else DeadLetterStore()
+        self.wheel = wheel if wheel is not None else TimerWheel()
         self.handlers: list[Callable[[BaseEvent], Any]] = []
+        self._retries: set[asyncio.Task] = set()
+        self._pending: list[tuple[BaseEvent, int, str | None]] = []
+        self._writer: asyncio.Task | None = None
+        self._io: ThreadPoolExecutor | None = None
+
+    @property
+    def failed_events(self) -> list[tuple[BaseEvent, int]]:
+        return self.get_failed_events()
 
     def add_handler(self, handler: Callable[[BaseEvent], Any]) -> None:
         """Add a handler for processing events."""
         self.handlers.append(handler)
 
-    def enqueue_failed(self, event: BaseEvent, retry_count: int = 0) -> None:
+    def backoff(self, retry_count: int) -> float:
+        """Delay before retry number retry_count (0-based)."""
+        delay = self.base_delay * (2**retry_count)
+        return delay * (1 - self.jitter * random.random())
+
+    def enqueue_failed(
+        self, event: BaseEvent, retry_count: int = 0, error: str | None = None
+    ) -> None:
         """Enqueue a failed event for retry or DLQ."""
         if retry_count < self.max_retries:
-            # Schedule retry
-            asyncio.create_task(self._retry_event(event, retry_count))
-        else:
-            # Move to DLQ
-            self.failed_events.append((event, retry_count))
+            self.wheel.schedule(self.backoff(retry_count), self._start_retry, event, retry_count)
+            return
+        if self.store.path is not None:
+            with contextlib.suppress(RuntimeError):  # no running loop: store it inline
+                loop = asyncio.get_running_loop()
+                self._pending.append((event, retry_count, error))
+                if self._writer is None:
+                    self._writer = loop.create_task(self._write_pending())
+                return
+        self.store.add(event, retry_count, error)
+
+    async def _write_pending(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._io is None:
+            self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lunacore-dlq")
+        try:
+            while self._pending:
+                letters, self._pending = self._pending, []
+                try:
+                    await loop.run_in_executor(self._io, self.store.add_many, letters)
+                except Exception as e:
+                    print(f"Error storing {len(letters)} dead letters: {e}")
+        finally:
+            self._writer = None
+
+    async def flush(self) -> None:
+        """Wait until the dead letters queued so far are stored."""
+        if self._writer is not None:
+            await asyncio.shield(self._writer)
+
+    def _start_retry(self, event: BaseEvent, retry_count: int) -> None:
+        # Runs on the wheel; the task is referenced until the handlers finish, so it
+        # cannot be garbage-collected mid-flight
+        task = asyncio.create_task(self._retry_event(event, retry_count))
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
 
     async def _retry_event(self, event: BaseEvent, retry_count: int) -> None:
         """Retry processing the event."""
-        await asyncio.sleep(0.1 * (2**retry_count))  # Exponential backoff
         try:
             for handler in self.handlers:
                 await handler(event) if asyncio.iscoroutinefunction(handler) else handler(event)
-        except Exception:
+        except Exception as e:
             # Failed again, enqueue with incremented retry count
-            self.enqueue_failed(event, retry_count + 1)
+            self.enqueue_failed(event, retry_count + 1, repr(e))
+
+    def redrive(
+        self,
+        types: Iterable[str] | None = None,
+        where: Callable[[DeadLetter], bool] | None = None,
+        limit: int | None = None,
+    ) -> int:
+        """Retry dead letters again from scratch (retry count 0).
+
+        Args:
+            types: Only redrive dead letters whose event type matches these patterns
+            where: Only redrive dead letters for which this predicate is true
+            limit: Maximum number of dead letters redriven; all matching ones by default
+
+        Returns:
+            Number of redriven dead letters
+        """
+        letters = self.store.page(0, limit if limit is not None else len(self.store), types, where)
+        self.store.remove(letter.seq for letter in letters)
+        for letter in letters:
+            self.wheel.schedule(0, self._start_retry, letter.event, 0)
+        return len(letters)
 
     def get_failed_events(self) -> list[tuple[BaseEvent, int]]:
         """Get all events in the DLQ."""
-        return self.failed_events.copy()
+        return [(d.event, d.retry_count) for d in self.store.page(0, len(self.store))]
 
     def clear_dlq(self) -> None:
         """Clear the DLQ (for testing)."""
-        self.failed_events.clear()
+        self.store.clear()
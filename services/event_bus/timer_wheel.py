@@ -0,0 +1,132 @@
+import asyncio
+import math
+import time
+from collections.abc import Callable
+from typing import Any
+
+
+class Timer:
+    """A callback scheduled on a TimerWheel; pass it to cancel() to unschedule it."""
+
+    __slots__ = ("expires", "callback", "args", "cancelled")
+
+    def __init__(self, expires: int, callback: Callable[..., Any], args: tuple):
+        self.expires = expires  # tick at which the timer fires
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+
+class TimerWheel:
+    """Hierarchical timer wheel driving any number of timers from one asyncio task.
+
+    Level 0 has `slots` slots of `tick` seconds each; every level above covers `slots`
+    times the span of the one below. A timer is placed on the lowest level whose span
+    covers its delay and cascades down as its slot comes up, so scheduling and firing
+    are O(1) however many timers are pending. Timers fire on the tick at or after their
+    deadline (at most one tick late, plus event loop lag).
+
+    The driver task only runs while timers are pending.
+    """
+
+    def __init__(self, tick: float = 0.01, slots: int = 64, levels: int = 4):
+        """Initialize the wheel.
+
+        Args:
+            tick: Resolution in seconds
+            slots: Slots per level
+            levels: Number of levels; delays beyond tick * slots**levels are re-cascaded
+                    from the top level until due
+        """
+        if tick <= 0:
+            raise ValueError("tick must be > 0")
+        if slots < 2 or levels < 1:
+            raise ValueError("slots must be >= 2 and levels >= 1")
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self._wheels: list[list[list[Timer]]] = [[[] for _ in range(slots)] for _ in range(levels)]
+        self._origin = time.monotonic()
+        self._now = 0  # last processed tick
+        self._pending = 0
+        self._driver: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        """Number of pending (not yet fired) timers, cancelled ones included."""
+        return self._pending
+
+    def schedule(self, delay: float, callback: Callable[..., Any], *args: Any) -> Timer:
+        """Call callback(*args) on the event loop after delay seconds."""
+        if self._pending == 0:
+            # Nothing pending: skip the idle ticks instead of walking through them
+            self._now = self._current_tick()
+        due = math.ceil((time.monotonic() + delay - self._origin) / self.tick)
+        timer = Timer(max(due, self._now + 1), callback, args)
+        self._insert(timer)
+        self._pending += 1
+        if self._driver is None:
+            self._driver = asyncio.get_running_loop().create_task(self._drive())
+        return timer
+
+    def cancel(self, timer: Timer) -> None:
+        """Prevent a scheduled timer from firing."""
+        timer.cancelled = True
+
+    def _current_tick(self) -> int:
+        return int((time.monotonic() - self._origin) / self.tick)
+
+    def _insert(self, timer: Timer) -> None:
+        delta = timer.expires - self._now
+        span = 1
+        for level in range(self.levels):
+            if delta < span * self.slots or level == self.levels - 1:
+                slot = (timer.expires // span) % self.slots
+                self._wheels[level][slot].append(timer)
+                return
+            span *= self.slots
+
+    def _advance(self) -> list[Timer]:
+        """Move to the next tick and return the timers due on it."""
+        self._now += 1
+        now = self._now
+        # Cascade the higher levels whose slot starts on this tick, bottom-up: level 1
+        # first, stopping at the first level whose slot does not start here. Each timer
+        # is re-inserted relative to now, so it lands on a lower level or on level 0.
+        span = self.slots
+        for level in range(1, self.levels):
+            if now % span:
+                break
+            slot = self._wheels[level][(now // span) % self.slots]
+            if slot:
+                timers = slot[:]
+                slot.clear()
+                for timer in timers:
+                    self._insert(timer)
+            span *= self.slots
+        slot = self._wheels[0][now % self.slots]
+        if not slot:
+            return []
+        due = [t for t in slot if t.expires <= now]
+        if len(due) < len(slot):
+            slot[:] = [t for t in slot if t.expires > now]
+        else:
+            slot.clear()
+        return due
+
+    async def _drive(self) -> None:
+        try:
+            while self._pending:
+                target = self._now + 1
+                await asyncio.sleep(max(0.0, self._origin + target * self.tick - time.monotonic()))
+                # Catch up on every tick that elapsed (the loop may have been busy)
+                while self._pending and self._now < self._current_tick():
+                    for timer in self._advance():
+                        self._pending -= 1
+                        if timer.cancelled:
+                            continue
+                        try:
+                            timer.callback(*timer.args)
+                        except Exception as e:
+                            print(f"Error in timer callback: {e}")
+        finally:
+            self._driver = None
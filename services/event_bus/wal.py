@@ -1,14 +1,120 @@
+import asyncio
+import bisect
+import contextlib
+import fnmatch
 import json
+import mmap
 import os
+import queue
+import re
+import threading
+import time
+from collections.abc import AsyncIterator, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Literal
 
 from core.events import BaseEvent
+from services.event_bus.codec import EventCodec, JsonLinesCodec, StreamEncoder
+
+FsyncPolicy = Literal["always", "batch", "never"]
+
+_DONE = object()
+
+
+def _type_filter(types: Iterable[str] | None):
+    """Compile event type patterns (wildcards allowed) into a predicate, or None."""
+    if types is None:
+        return None
+    rx = re.compile("|".join(f"(?:{fnmatch.translate(t)})" for t in types) or "(?!)")
+    return rx.match
+
+
+def _prefetched(source: Iterator[Any], prefetch: int) -> Iterator[Any]:
+    """Run source in a background thread, buffering up to prefetch items ahead."""
+    buf: queue.Queue = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in source:
+                while not stop.is_set():
+                    try:
+                        buf.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            buf.put(_DONE)
+        except BaseException as e:  # forwarded to the consumer
+            buf.put(e)
+
+    threading.Thread(target=produce, name="lunacore-wal-recover", daemon=True).start()
+    try:
+        while True:
+            item = buf.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+@contextlib.contextmanager
+def _mapped(path: str) -> Iterator[Any]:
+    """Map the file read-only; an empty file (which cannot be mapped) reads as b""."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
 
 
 class WAL:
-    """Write-Ahead Log for event persistence."""
+    """Write-Ahead Log for event persistence.
 
-    def __init__(self, log_file: str):
+    The log file stays open for the lifetime of the WAL. append() writes synchronously;
+    append_async() joins a commit group that is written (and fsynced) in one go, and
+    resolves once the group is durable according to the fsync policy:
+
+    - "always": a group is committed as soon as the previous commit finishes, so every
+      append waits for an fsync; appends arriving during an fsync share the next one
+    - "batch": a group is committed every group_size appends or group_interval_ms,
+      whichever comes first, with one fsync per group
+    - "never": grouped like "batch" but never fsynced; appends resolve once the data
+      has been handed to the OS
+
+    Entries are encoded by a pluggable EventCodec: JSON lines by default, or the
+    compact BinaryCodec.
+    """
+
+    def __init__(
+        self,
+        log_file: str,
+        fsync: FsyncPolicy = "batch",
+        group_size: int = 256,
+        group_interval_ms: float = 5.0,
+        codec: EventCodec | None = None,
+    ):
+        if fsync not in ("always", "batch", "never"):
+            raise ValueError(f"Unknown fsync policy: {fsync}")
         self.log_file = log_file
+        self.fsync = fsync
+        self.group_size = group_size
+        self.group_interval_ms = group_interval_ms
+        self.codec = codec or JsonLinesCodec()
+        self._fh: Any = None
+        self._encoder: StreamEncoder | None = None
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._io: ThreadPoolExecutor | None = None
+        self._group: list[BaseEvent] = []
+        self._waiters: list[asyncio.Future] = []
+        self._group_full: asyncio.Event | None = None
+        self._committer: asyncio.Task | None = None
         self._ensure_log_file()
 
     def _ensure_log_file(self) -> None:
@@ -17,43 +123,418 @@ class WAL:
             with open(self.log_file, "w") as f:
                 f.write("")  # Create empty file
 
+    def _handle(self):
+        if self._fh is None:
+            self._encoder = self._resume_encoder(self.log_file)
+            self._fh = open(self.log_file, "ab")  # noqa: SIM115 (long-lived append handle)
+        return self._fh
+
+    def _resume_encoder(self, path: str) -> StreamEncoder:
+        """Encoder continuing the file at path, dropping a torn tail left by a crash."""
+        try:
+            with open(path, "r+b") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size == 0:
+                    return self.codec.new_encoder()
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    encoder, valid = self.codec.resume_encoder(mm)
+                if valid < size:
+                    f.truncate(valid)
+                return encoder
+        except FileNotFoundError:
+            return self.codec.new_encoder()
+
+    def _write(self, events: list[BaseEvent], sync: bool) -> None:
+        # Encoding happens under the lock, so stateful codecs (string tables) see the
+        # entries in file order and start afresh with each file
+        with self._lock:
+            fh = self._handle()
+            encode = self._encoder.encode
+            data = b"".join([encode(e) for e in events])
+            fh.write(data)
+            fh.flush()
+            if sync:
+                os.fsync(fh.fileno())
+                self._unsynced = 0
+            else:
+                self._unsynced += len(events)
+            self._written(len(data), len(events))
+
+    def _written(self, nbytes: int, count: int) -> None:
+        """Hook called under the write lock after count entries (nbytes) were written."""
+
     def append(self, event: BaseEvent) -> None:
-        """Append an event to the WAL."""
-        with open(self.log_file, "a") as f:
-            entry = {
-                "type": event.type,
-                "data": event.data,
-                "id": event.id,
-                "timestamp": event.timestamp.isoformat(),
-                "correlation_id": event.correlation_id,
-            }
-            f.write(json.dumps(entry) + "\n")
+        """Append an event to the WAL.
 
-    def recover(self) -> list[BaseEvent]:
-        """Recover events from the WAL."""
-        events = []
-        if not os.path.exists(self.log_file):
-            return events
+        Under the "batch" policy the file is fsynced every group_size appends.
+        """
+        sync = self.fsync == "always" or (
+            self.fsync == "batch" and self._unsynced + 1 >= self.group_size
+        )
+        self._write([event], sync)
 
-        with open(self.log_file) as f:
-            for line in f:
-                if line.strip():
-                    try:
-                        entry = json.loads(line.strip())
-                        event = BaseEvent(
-                            type=entry["type"],
-                            data=entry["data"],
-                            id=entry["id"],
-                            timestamp=entry["timestamp"],
-                            correlation_id=entry.get("correlation_id"),
+    async def append_async(self, event: BaseEvent) -> None:
+        """Append an event and wait until its commit group is durable."""
+        waiter = asyncio.get_running_loop().create_future()
+        self._group.append(event)
+        self._waiters.append(waiter)
+        if self._committer is None:
+            self._group_full = asyncio.Event()
+            self._committer = asyncio.create_task(self._commit_loop())
+        elif len(self._group) >= self.group_size and self._group_full:
+            self._group_full.set()
+        await waiter
+
+    async def flush(self) -> None:
+        """Commit pending async appends now and wait for them."""
+        if self._committer is None:
+            return
+        if self._group_full:
+            self._group_full.set()
+        await asyncio.shield(self._committer)
+
+    async def _commit_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._io is None:
+            self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lunacore-wal")
+        try:
+            while self._group:
+                if self.fsync != "always" and len(self._group) < self.group_size:
+                    with contextlib.suppress(TimeoutError):
+                        await asyncio.wait_for(
+                            self._group_full.wait(), self.group_interval_ms / 1000
                         )
-                        events.append(event)
-                    except (json.JSONDecodeError, KeyError):
+                self._group_full.clear()
+                if not self._group:  # committed by close() meanwhile
+                    break
+                events, waiters = self._group, self._waiters
+                self._group, self._waiters = [], []
+                try:
+                    await loop.run_in_executor(self._io, self._write, events, self.fsync != "never")
+                except Exception as e:
+                    for w in waiters:
+                        if not w.done():
+                            w.set_exception(e)
+                    continue
+                for w in waiters:
+                    if not w.done():
+                        w.set_result(None)
+        finally:
+            self._committer = None
+
+    def _files(self, start: int) -> list[tuple[int, str]]:
+        """(offset of first entry, path) of the files holding entries at or after start."""
+        return [(0, self.log_file)]
+
+    def _scan(
+        self, from_offset: int = 0, types: Iterable[str] | None = None
+    ) -> Iterator[tuple[int, BaseEvent]]:
+        """Yield (offset, event) for entries at or after from_offset, read via mmap.
+
+        The offset of an entry is its index among the entries of the log (the non-empty
+        lines, for JSON lines). Corrupted entries keep their offset but are skipped.
+        """
+        match = _type_filter(types)
+        for base, path in self._files(from_offset):
+            try:
+                with _mapped(path) as mm:
+                    decoder = self.codec.new_decoder()
+                    offset = base
+                    for etype, record in decoder.records(mm):
+                        offset += 1
+                        if offset <= from_offset:
+                            continue
+                        if match is not None and etype is not None and not match(etype):
+                            continue
+                        event = decoder.decode(record)
                         # Skip corrupted entries
-                        continue
-        return events
+                        if event is None or (match is not None and not match(event.type)):
+                            continue
+                        yield offset - 1, event
+            except FileNotFoundError:
+                continue
+
+    def recover_iter(
+        self,
+        types: Iterable[str] | None = None,
+        from_offset: int = 0,
+        prefetch: int = 0,
+    ) -> Iterator[BaseEvent]:
+        """Lazily recover events from the WAL.
+
+        Args:
+            types: Only yield events whose type matches one of these (wildcards allowed)
+            from_offset: Offset of the first entry to consider
+            prefetch: When > 0, decode in a background thread up to prefetch events ahead
+                      of the consumer
+        """
+        events = (event for _, event in self._scan(from_offset, types))
+        return _prefetched(events, prefetch) if prefetch > 0 else events
+
+    async def arecover_iter(
+        self,
+        types: Iterable[str] | None = None,
+        from_offset: int = 0,
+        batch_size: int = 256,
+        prefetch: int = 4,
+    ) -> AsyncIterator[list[BaseEvent]]:
+        """Recover events in batches, decoding in a background thread.
+
+        Decoding runs up to prefetch batches ahead, so the consumer can dispatch a batch
+        while the rest of the log is still being read.
+        """
+        loop = asyncio.get_running_loop()
+        buf: asyncio.Queue = asyncio.Queue(maxsize=prefetch)
+        stop = threading.Event()
+        finished = threading.Event()
+
+        def produce():
+            try:
+                batch: list[BaseEvent] = []
+                for event in self.recover_iter(types, from_offset):
+                    batch.append(event)
+                    if len(batch) >= batch_size:
+                        asyncio.run_coroutine_threadsafe(buf.put(batch), loop).result()
+                        batch = []
+                        if stop.is_set():
+                            return
+                if batch:
+                    asyncio.run_coroutine_threadsafe(buf.put(batch), loop).result()
+                asyncio.run_coroutine_threadsafe(buf.put(_DONE), loop).result()
+            except BaseException as e:  # forwarded to the consumer
+                if not stop.is_set():
+                    asyncio.run_coroutine_threadsafe(buf.put(e), loop).result()
+            finally:
+                finished.set()
+
+        # A dedicated thread, so long replays do not hold a default executor worker
+        threading.Thread(target=produce, name="lunacore-wal-recover", daemon=True).start()
+        try:
+            while True:
+                item = await buf.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            # Unblock a producer waiting on a full queue
+            while not finished.is_set():
+                while not buf.empty():
+                    buf.get_nowait()
+                await asyncio.sleep(0.001)
+
+    def recover(self) -> list[BaseEvent]:
+        """Recover events from the WAL."""
+        return list(self.recover_iter())
+
+    def close(self) -> None:
+        """Commit pending async appends, fsync (unless the policy is "never") and close.
+
+        Call it from the event loop thread when async appends may be pending: their
+        waiters are resolved here.
+        """
+        events, waiters = self._group, self._waiters
+        self._group, self._waiters = [], []
+        if self._group_full:
+            self._group_full.set()  # let the committer see the group is gone
+        if events:
+            try:
+                self._write(events, self.fsync != "never")
+            except Exception as e:
+                for w in waiters:
+                    if not w.done():
+                        w.set_exception(e)
+            else:
+                for w in waiters:
+                    if not w.done():
+                        w.set_result(None)
+        with self._lock:
+            if self._fh is not None:
+                self._fh.flush()
+                if self.fsync != "never":
+                    os.fsync(self._fh.fileno())
+                self._fh.close()
+                self._fh = None
+        if self._io is not None:
+            self._io.shutdown(wait=False)
+            self._io = None
 
     def clear(self) -> None:
         """Clear the WAL (for testing)."""
-        with open(self.log_file, "w") as f:
-            f.write("")
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            with open(self.log_file, "w") as f:
+                f.write("")
+
+
+class SegmentedWAL(WAL):
+    """WAL split into size- or time-bounded segment files with a checkpoint.
+
+    Every entry has a logical offset (0, 1, 2... across segments). Segment files are
+    named after the offset of their first entry. checkpoint(offset) records that all
+    entries before offset have been processed and deletes the segments holding only
+    such entries, so recover() only reads the unprocessed tail.
+    """
+
+    SUFFIX = ".wal"
+    CHECKPOINT = "checkpoint.json"
+
+    def __init__(
+        self,
+        directory: str,
+        segment_max_bytes: int = 64 * 1024 * 1024,
+        segment_max_age_s: float | None = None,
+        **wal_options: Any,
+    ):
+        """Initialize the segmented WAL.
+
+        Args:
+            directory: Directory holding the segment files and the checkpoint
+            segment_max_bytes: Size after which the active segment is rotated
+            segment_max_age_s: Age after which the active segment is rotated (optional)
+            **wal_options: fsync, group_size, group_interval_ms and codec, as for WAL
+        """
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.segment_max_age_s = segment_max_age_s
+        os.makedirs(directory, exist_ok=True)
+        self._segments = sorted(
+            int(name[: -len(self.SUFFIX)])
+            for name in os.listdir(directory)
+            if name.endswith(self.SUFFIX)
+        ) or [0]
+        self._checkpoint = self._read_checkpoint()
+        active = self._segment_path(self._segments[-1])
+        self._next_offset = self._segments[-1]
+        self._segment_bytes = 0
+        super().__init__(active, **wal_options)
+        with contextlib.suppress(FileNotFoundError):
+            with _mapped(active) as mm:
+                # Count the entries of the valid prefix only: a torn tail is dropped
+                # before the next append, so the entries after it follow that prefix
+                _, valid = self.codec.resume_encoder(mm)
+                decoder = self.codec.new_decoder()
+                for _ in decoder.records(mm):
+                    if decoder.end > valid:
+                        break
+                    self._next_offset += 1
+                self._segment_bytes = valid
+        self._segment_opened = time.monotonic()
+
+    def _segment_path(self, base: int) -> str:
+        return os.path.join(self.directory, f"{base:020d}{self.SUFFIX}")
+
+    def _read_checkpoint(self) -> int:
+        try:
+            with open(os.path.join(self.directory, self.CHECKPOINT)) as f:
+                return int(json.load(f)["offset"])
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, ValueError):
+            return 0
+
+    @property
+    def segments(self) -> list[str]:
+        """Paths of the segment files, oldest first."""
+        return [self._segment_path(base) for base in self._segments]
+
+    @property
+    def next_offset(self) -> int:
+        """Offset the next appended entry will get."""
+        return self._next_offset
+
+    @property
+    def checkpoint_offset(self) -> int:
+        """Offset of the first entry not yet processed."""
+        return self._checkpoint
+
+    def _handle(self):
+        rotate = self._segment_bytes >= self.segment_max_bytes or (
+            self.segment_max_age_s is not None
+            and time.monotonic() - self._segment_opened >= self.segment_max_age_s
+        )
+        if rotate and self._segment_bytes > 0:
+            if self._fh is not None:
+                if self.fsync != "never":
+                    os.fsync(self._fh.fileno())
+                self._fh.close()
+                self._fh = None
+            self._segments.append(self._next_offset)
+            self.log_file = self._segment_path(self._next_offset)
+            self._segment_bytes = 0
+            self._segment_opened = time.monotonic()
+        return super()._handle()
+
+    def _written(self, nbytes: int, count: int) -> None:
+        self._segment_bytes += nbytes
+        self._next_offset += count
+
+    def checkpoint(self, offset: int) -> None:
+        """Record that entries before offset are processed and drop consumed segments."""
+        with self._lock:
+            offset = min(offset, self._next_offset)
+            if offset <= self._checkpoint:
+                return
+            path = os.path.join(self.directory, self.CHECKPOINT)
+            tmp = path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"offset": offset}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+            self._checkpoint = offset
+            # A segment is consumed once the next one starts at or before the checkpoint;
+            # the active (last) segment is never deleted
+            while len(self._segments) > 1 and self._segments[1] <= offset:
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(self._segment_path(self._segments.pop(0)))
+
+    def _files(self, start: int) -> list[tuple[int, str]]:
+        first = max(bisect.bisect_right(self._segments, start) - 1, 0)
+        return [(base, self._segment_path(base)) for base in self._segments[first:]]
+
+    def recover_iter(
+        self,
+        types: Iterable[str] | None = None,
+        from_offset: int | None = None,
+        prefetch: int = 0,
+    ) -> Iterator[BaseEvent]:
+        """Lazily recover events from the checkpoint (or from_offset) onwards."""
+        start = self._checkpoint if from_offset is None else from_offset
+        return super().recover_iter(types, start, prefetch)
+
+    async def arecover_iter(
+        self,
+        types: Iterable[str] | None = None,
+        from_offset: int | None = None,
+        batch_size: int = 256,
+        prefetch: int = 4,
+    ) -> AsyncIterator[list[BaseEvent]]:
+        """Recover events in batches from the checkpoint (or from_offset) onwards."""
+        start = self._checkpoint if from_offset is None else from_offset
+        async for batch in super().arecover_iter(types, start, batch_size, prefetch):
+            yield batch
+
+    def recover(self, from_offset: int | None = None) -> list[BaseEvent]:
+        """Recover events from the checkpoint (or from_offset) onwards."""
+        return list(self.recover_iter(from_offset=from_offset))
+
+    def clear(self) -> None:
+        """Delete all segments and the checkpoint (for testing)."""
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            for path in self.segments:
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(path)
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(os.path.join(self.directory, self.CHECKPOINT))
+            self._segments = [0]
+            self._checkpoint = 0
+            self._next_offset = 0
+            self._segment_bytes = 0
+            self.log_file = self._segment_path(0)
+            self._ensure_log_file()
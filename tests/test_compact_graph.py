@@ -0,0 +1,48 @@
+import pytest
+
+from core.compact_graph import CompactTaskGraph
+from core.task_graph import Artifact, Task, TaskGraph
+
+
+def _graph() -> TaskGraph:
+    a = Task(name="A", type="generate_code", params={"lang": "py"})
+    b = Task(name="B", type="test", depends_on=[a.compute_id("p")])
+    c = Task(name="C", id="c", outputs=[Artifact(name="pkg")], depends_on=[a.compute_id("p")])
+    d = Task(name="D", depends_on=[b.compute_id("p"), "c"])
+    return TaskGraph(plan_id="p", tasks=[d, c, b, a])
+
+
+def test_compact_round_trip_and_traversals():
+    graph = _graph()
+    compact = CompactTaskGraph.from_task_graph(graph)
+    assert len(compact) == 4
+    assert compact.to_task_graph() == graph
+    assert compact.to_task_graph().stable_hash() == graph.stable_hash()
+
+    compact.validate_acyclic()
+    assert compact.topological_order() == graph.topological_order()
+    a, b, c, d = (t.compute_id("p") for t in reversed(graph.tasks))
+    assert compact.levels() == [[a], sorted([b, c]), [d]]
+    assert list(compact.level_indices()) == [2, 1, 1, 0]
+    assert compact.index("c") == 1
+
+
+def test_compact_cycles_and_unknown_dependencies():
+    a = Task(name="A", id="a", depends_on=["b"])
+    b = Task(name="B", id="b", depends_on=["a"])
+    compact = CompactTaskGraph.from_task_graph(TaskGraph(plan_id="p", tasks=[a, b]))
+    with pytest.raises(ValueError):
+        compact.validate_acyclic()
+    with pytest.raises(ValueError):
+        compact.levels()
+
+    # As in TaskGraph, a dependency outside the graph can never be satisfied
+    dangling = TaskGraph(plan_id="p", tasks=[Task(name="A", depends_on=["missing"])])
+    compact = CompactTaskGraph.from_task_graph(dangling)
+    assert compact.external_ids == ["missing"]
+    assert compact.to_task_graph() == dangling
+    with pytest.raises(ValueError):
+        compact.topological_order()
+
+    with pytest.raises(ValueError):
+        CompactTaskGraph.from_task_graph(TaskGraph(plan_id="p", tasks=[a, a]))
@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from core.task_graph import Task, TaskGraph
+from orchestrator.duration_history import TaskDurationHistory
+from orchestrator.parallel_executor import ParallelExecutor
+from services.memory.mem_inmem import InMemProjectMemory
+
+
+def test_estimates_fall_back_from_name_to_type_to_default():
+    history = TaskDurationHistory(default=3.0)
+    history.record(Task(name="build", type="assemble", params={"v": 1}), 2.0)
+    history.record(Task(name="build", type="assemble", params={"v": 2}), 4.0)
+    assert history.estimate(Task(name="build", type="assemble", params={"v": 3})) == 3.0
+    history.record(Task(name="other", type="assemble"), 6.0)
+    assert history.estimate(Task(name="new", type="assemble")) == 4.0
+    assert history.estimate(Task(name="new", type="deploy")) == 3.0
+
+
+@pytest.mark.asyncio
+async def test_executor_records_durations_for_analysis():
+    slow = Task(name="slow", id="slow")
+    fast = Task(name="fast", id="fast")
+    last = Task(name="last", id="last", depends_on=["slow", "fast"])
+    graph = TaskGraph(plan_id="p", tasks=[slow, fast, last])
+    history = TaskDurationHistory()
+
+    async def run(task: Task) -> str:
+        await asyncio.sleep(0.05 if task.name == "slow" else 0.0)
+        return task.name
+
+    await ParallelExecutor().execute_graph(graph, run, history=history)
+    assert history.estimate(slow) >= 0.05 > history.estimate(fast)
+    assert graph.analyze(history.estimate).critical_path == ["slow", "last"]
+
+    memory = InMemProjectMemory()
+    await history.save(memory)
+    loaded = await TaskDurationHistory.load(memory)
+    assert loaded.estimate(slow) == history.estimate(slow)
+    assert (await TaskDurationHistory.load(InMemProjectMemory(), default=2.0)).default == 2.0
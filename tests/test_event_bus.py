@@ -1,9 +1,19 @@
 import asyncio
+import threading
+import time
+from datetime import UTC, datetime, timedelta
 
 import pytest
 
-from core.events import BaseEvent, TaskCompletedEvent, TaskStartedEvent
+from core.events import (
+    BaseEvent,
+    LiteEvent,
+    TaskCompletedEvent,
+    TaskFailedEvent,
+    TaskStartedEvent,
+)
 from services.event_bus.bus_inmem import InMemoryEventBus
+from services.event_bus.wal import WAL
 
 
 @pytest.mark.asyncio
@@ -146,3 +156,531 @@ async def test_multiple_subscribers():
     assert events1[0] == events2[0] == event
 
     await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_exact_and_wildcard_subscription_order():
+    """Test that exact and wildcard subscribers run in subscription order."""
+    bus = InMemoryEventBus()
+    await bus.start()
+
+    calls = []
+
+    async def wildcard(event):
+        calls.append("wildcard")
+
+    async def exact(event):
+        calls.append("exact")
+
+    async def catch_all(event):
+        calls.append("catch_all")
+
+    bus.subscribe("task.*", wildcard)
+    bus.subscribe("task.started", exact)
+    bus.subscribe("*", catch_all)
+
+    await bus.emit(TaskStartedEvent(task_id="task1", agent_id="agent1"))
+    await asyncio.sleep(0.01)
+
+    assert calls == ["wildcard", "exact", "catch_all"]
+
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_subscription_order_after_unsubscribe():
+    """Test that a pattern subscribed after an unsubscribe still runs last."""
+    bus = InMemoryEventBus()
+    await bus.start()
+
+    calls = []
+
+    async def a(event):
+        calls.append("a")
+
+    async def b(event):
+        calls.append("b")
+
+    async def c(event):
+        calls.append("c")
+
+    bus.subscribe("q.1", a)
+    bus.subscribe("x.y", b)
+    bus.unsubscribe("q.1", a)
+    bus.subscribe("x.*", c)
+
+    await bus.emit(BaseEvent(type="x.y"))
+    await asyncio.sleep(0.01)
+
+    assert calls == ["b", "c"]
+
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_subscribe_and_unsubscribe_invalidate_routes():
+    """Test that the cached routes follow subscribe/unsubscribe."""
+    bus = InMemoryEventBus()
+    await bus.start()
+
+    events1 = []
+    events2 = []
+
+    async def handler1(event):
+        events1.append(event.data)
+
+    async def handler2(event):
+        events2.append(event.data)
+
+    bus.subscribe("test.event", handler1)
+    await bus.emit(BaseEvent(type="test.event", data=1))
+    await asyncio.sleep(0.01)
+
+    # A later wildcard subscription must see events of an already-routed type
+    bus.subscribe("test.*", handler2)
+    await bus.emit(BaseEvent(type="test.event", data=2))
+    await asyncio.sleep(0.01)
+
+    assert bus.unsubscribe("test.event", handler1) is True
+    assert bus.unsubscribe("test.event", handler1) is False
+    await bus.emit(BaseEvent(type="test.event", data=3))
+    await asyncio.sleep(0.01)
+
+    assert events1 == [1, 2]
+    assert events2 == [2, 3]
+
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_emit_many_and_batch_handler():
+    """Test emit_many ordering and batch handlers receiving lists."""
+    bus = InMemoryEventBus(batch_size=4)
+    await bus.start()
+
+    single = []
+    batches = []
+
+    async def handler(event):
+        single.append(event.data)
+
+    def batch_handler(events):
+        batches.append([e.data for e in events])
+
+    bus.subscribe("test.*", handler)
+    bus.subscribe("test.*", batch_handler, batch=True)
+
+    await bus.emit_many(BaseEvent(type="test.event", data=i) for i in range(10))
+    await asyncio.sleep(0.05)
+
+    assert single == list(range(10))
+    assert [x for b in batches for x in b] == list(range(10))
+    assert all(1 <= len(b) <= 4 for b in batches)
+
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("policy,expected", [("drop_oldest", [2, 3]), ("drop_newest", [0, 1])])
+async def test_bounded_queue_drop_policies(policy, expected):
+    """Test drop_oldest/drop_newest policies and their metrics."""
+    bus = InMemoryEventBus(max_queue_size=2, overflow=policy)
+    received = []
+
+    async def handler(event):
+        received.append(event.data)
+
+    bus.subscribe("test.*", handler)
+
+    # Not started yet, so the queue fills up
+    await bus.emit_many(BaseEvent(type="test.event", data=i) for i in range(4))
+    assert bus.queue_depth == 2
+    assert bus.metrics.get_metrics()["event_bus.dropped"] == 2
+
+    await bus.start()
+    await asyncio.sleep(0.01)
+    assert received == expected
+    assert bus.metrics.get_metrics()["event_bus.queue_depth"] == 0
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_bounded_queue_block_policy():
+    """Test that the block policy applies backpressure to the producer."""
+    bus = InMemoryEventBus(max_queue_size=1)
+    received = []
+
+    async def handler(event):
+        received.append(event.data)
+
+    bus.subscribe("test.*", handler)
+    await bus.emit(BaseEvent(type="test.event", data=1))
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(bus.emit(BaseEvent(type="test.event", data=2)), 0.05)
+
+    await bus.start()
+    await bus.emit(BaseEvent(type="test.event", data=3))
+    await asyncio.sleep(0.01)
+    assert received == [1, 3]
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_emit_many_blocks_on_bounded_queue():
+    """Test that emit_many fills a bounded queue, then waits for room, in order."""
+    bus = InMemoryEventBus(max_queue_size=3, batch_size=2)
+    received = []
+
+    async def handler(events):
+        received.extend(e.data for e in events)
+
+    bus.subscribe("test.*", handler, batch=True)
+    emitting = asyncio.create_task(
+        bus.emit_many(BaseEvent(type="test.event", data=i) for i in range(10))
+    )
+    await asyncio.sleep(0.01)
+    assert not emitting.done() and bus.queue_depth == 3
+
+    await bus.start()
+    await asyncio.wait_for(emitting, 1)
+    await asyncio.sleep(0.01)
+    assert received == list(range(10))
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_bounded_queue_spill_policy(tmp_path):
+    """Test that the spill policy persists overflowing events to the WAL."""
+    wal = WAL(str(tmp_path / "spill.wal"))
+    bus = InMemoryEventBus(max_queue_size=1, overflow="spill", spill_wal=wal)
+
+    await bus.emit(BaseEvent(type="test.event", data=1))
+    await bus.emit(BaseEvent(type="test.event", data=2))
+    await bus.emit(BaseEvent(type="test.event", data=3))
+
+    assert bus.queue_depth == 1
+    assert bus.metrics.get_metrics()["event_bus.spilled"] == 2
+    assert [e.data for e in wal.recover()] == [2, 3]
+
+    with pytest.raises(ValueError):
+        InMemoryEventBus(max_queue_size=1, overflow="spill")
+
+
+@pytest.mark.asyncio
+async def test_priority_classes_with_starvation_limit():
+    """Test that higher priority classes jump the queue without starving lower ones."""
+    bus = InMemoryEventBus(
+        batch_size=1, priorities={"escalation.*": 2, "task.failed": 1}, starvation_limit=3
+    )
+    received = []
+    bus.subscribe("*", lambda e: received.append(e.type), inline=True)
+
+    await bus.emit_many(BaseEvent(type="task.started") for _ in range(10))
+    await bus.emit_many(BaseEvent(type="task.failed") for _ in range(10))
+    await bus.emit(BaseEvent(type="escalation.needed"))
+    # An explicit priority field overrides the type patterns
+    await bus.emit(LiteEvent("task.started", task_id="urgent", priority=5))
+    assert bus.stats()["priority_depths"] == {0: 10, 1: 10, 2: 1, 5: 1}
+
+    await bus.start()
+    await asyncio.sleep(0.02)
+    await bus.stop()
+
+    started, failed = "task.started", "task.failed"
+    # Classes 5 (the explicit field), 2 and 1 go first; after every 3 events taken ahead
+    # of the waiting task.started events, one of those goes next
+    expected = [started, "escalation.needed", failed, started]
+    expected += ([failed] * 3 + [started]) * 2 + [failed] * 3 + [started] * 7
+    assert received == expected
+
+
+@pytest.mark.asyncio
+async def test_priority_drop_oldest_evicts_lowest_class():
+    """Test that drop_oldest makes room by dropping from the lowest priority class."""
+    bus = InMemoryEventBus(max_queue_size=2, overflow="drop_oldest", priorities={"escalation.*": 1})
+    received = []
+    bus.subscribe("*", lambda e: received.append(e.data), inline=True)
+
+    await bus.emit(BaseEvent(type="escalation.needed", data="escalation"))
+    await bus.emit(BaseEvent(type="task.started", data="a"))
+    await bus.emit(BaseEvent(type="task.started", data="b"))  # evicts a
+    await bus.emit(BaseEvent(type="escalation.needed", data="escalation2"))  # evicts b
+    await bus.emit(LiteEvent("task.started", data="c", priority=-1))  # lowest, dropped
+    assert bus.metrics.get_metrics()["event_bus.dropped"] == 3
+
+    await bus.start()
+    await asyncio.sleep(0.01)
+    await bus.stop()
+    assert received == ["escalation", "escalation2"]
+
+
+@pytest.mark.asyncio
+async def test_lanes_isolate_slow_subscriber():
+    """Test that a slow laned subscriber does not hold up a fast one."""
+    bus = InMemoryEventBus(lanes=True)
+    await bus.start()
+
+    fast = []
+    slow = []
+
+    async def fast_handler(event):
+        fast.append(event.data)
+
+    async def slow_handler(event):
+        await asyncio.sleep(0.05)
+        slow.append(event.data)
+
+    bus.subscribe("test.*", slow_handler)
+    bus.subscribe("test.*", fast_handler)
+
+    await bus.emit_many(BaseEvent(type="test.event", data=i) for i in range(5))
+    await asyncio.sleep(0.02)
+
+    assert fast == [0, 1, 2, 3, 4]
+    assert len(slow) < 5
+
+    await asyncio.sleep(0.3)
+    assert slow == [0, 1, 2, 3, 4]
+
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_lane_concurrency_keeps_correlation_order():
+    """Test concurrent lane workers with FIFO ordering per correlation_id."""
+    bus = InMemoryEventBus()
+    await bus.start()
+
+    received: dict[str, list[int]] = {}
+
+    async def handler(event):
+        await asyncio.sleep(0.01)
+        received.setdefault(event.correlation_id, []).append(event.data)
+
+    bus.subscribe("test.*", handler, concurrency=4, ordering="correlation_id")
+
+    events = [BaseEvent(type="test.event", data=i, correlation_id=f"c{i % 4}") for i in range(12)]
+    await bus.emit_many(events)
+    for _ in range(100):
+        if sum(map(len, received.values())) == 12:
+            break
+        await asyncio.sleep(0.01)
+
+    assert received == {f"c{k}": [k, k + 4, k + 8] for k in range(4)}
+
+    with pytest.raises(ValueError):
+        bus.subscribe("test.*", handler, concurrency=2)
+
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_coalescing_window_keeps_latest_per_task():
+    """Test that a coalescing subscriber gets the latest event per (type, task_id)."""
+    bus = InMemoryEventBus()
+    batches = []
+    everything = []
+    bus.subscribe("task.*", batches.append, batch=True, inline=True, coalesce=0.05)
+    bus.subscribe("task.*", everything.append, inline=True)
+    await bus.start()
+
+    started1 = TaskStartedEvent(task_id="t1", agent_id="a")
+    failed = TaskFailedEvent(task_id="t1", error="boom")
+    started2 = TaskStartedEvent(task_id="t1", agent_id="a")  # retry
+    other = TaskStartedEvent(task_id="t2", agent_id="a")
+    completed = TaskCompletedEvent(task_id="t1", result=1)
+    notes = [BaseEvent(type="task.note"), BaseEvent(type="task.note")]  # no task_id
+    await bus.emit_many([started1, failed, started2, other, completed, failed, *notes])
+    await asyncio.sleep(0.1)
+
+    assert len(everything) == 8
+    # Latest event per key, in the order those arrived; the re-emitted failed is dropped
+    assert [[e.id for e in b] for b in batches] == [
+        [failed.id, started2.id, other.id, completed.id, notes[0].id, notes[1].id]
+    ]
+    metrics = bus.metrics.get_metrics()
+    assert (metrics["event_bus.coalesced"], metrics["event_bus.deduplicated"]) == (1, 1)
+
+    # Ids from the previous window are still recognised as duplicates
+    started3 = TaskStartedEvent(task_id="t1", agent_id="a")
+    await bus.emit_many([failed, started3])
+    await asyncio.sleep(0.1)
+    assert [e.id for e in batches[1]] == [started3.id]
+    await bus.stop()
+
+    with pytest.raises(ValueError):
+        bus.subscribe("task.*", batches.append, coalesce=0)
+
+
+@pytest.mark.asyncio
+async def test_sync_handlers_use_bus_thread_pool():
+    """Test sync handlers run on the named bus pool, or inline on the loop."""
+    bus = InMemoryEventBus(sync_workers=1, sync_thread_name="bus-test")
+    await bus.start()
+
+    pooled = []
+    inline = []
+
+    def slow_handler(event):
+        time.sleep(0.02)
+        pooled.append(threading.current_thread().name)
+
+    def inline_handler(event):
+        inline.append(threading.current_thread() is threading.main_thread())
+
+    bus.subscribe("test.*", slow_handler, concurrency=3, ordering="none")
+    bus.subscribe("test.*", inline_handler, inline=True)
+
+    await bus.emit_many(BaseEvent(type="test.event", data=i) for i in range(3))
+    await asyncio.sleep(0.15)
+
+    assert len(pooled) == 3
+    assert all(name.startswith("bus-test") for name in pooled)
+    assert inline == [True, True, True]
+    metrics = bus.metrics.get_metrics()
+    assert metrics["event_bus.sync.saturated"] >= 1
+    assert metrics["event_bus.sync.queue_depth"] == 0
+    assert metrics["event_bus.sync.saturation"] == 0
+
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_replay_from_wal(tmp_path):
+    """Test replaying WAL events by offset, timestamp and type, with rate limiting."""
+    wal = WAL(str(tmp_path / "events.wal"))
+    base = datetime(2025, 1, 1)
+    for i in range(10):
+        etype = "task.started" if i % 2 else "task.completed"
+        wal.append(BaseEvent(type=etype, data=i, timestamp=base + timedelta(seconds=i)))
+    bus = InMemoryEventBus()
+    received = []
+
+    async def handler(event):
+        received.append(event.data)
+
+    bus.subscribe("task.*", handler)
+    await bus.start()
+
+    assert await bus.replay(wal, since=7, batch_size=2) == 3
+    await asyncio.sleep(0.05)
+    assert received == [7, 8, 9]
+
+    received.clear()
+    cutoff = datetime(2025, 1, 1, 0, 0, 5, tzinfo=UTC)
+    assert await bus.replay(wal, since=cutoff, types=["task.started"]) == 3
+    await asyncio.sleep(0.05)
+    assert received == [5, 7, 9]
+
+    received.clear()
+    start = time.monotonic()
+    assert await bus.replay(wal, rate=100, batch_size=2) == 10
+    # 4 batches are held back 20 ms each
+    assert time.monotonic() - start >= 0.08
+    await asyncio.sleep(0.05)
+    assert received == list(range(10))
+    assert bus.metrics.get_metrics()["event_bus.replayed"] == 16
+
+    with pytest.raises(ValueError):
+        await bus.replay(wal, rate=0)
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_replay_catch_up_then_live(tmp_path):
+    """Test that live events emitted during a live replay are delivered after it."""
+    wal = WAL(str(tmp_path / "events.wal"))
+    for i in range(6):
+        wal.append(BaseEvent(type="test.event", data=i))
+    bus = InMemoryEventBus()
+    received = []
+
+    async def handler(event):
+        received.append(event.data)
+
+    bus.subscribe("test.*", handler)
+    await bus.start()
+
+    replay = asyncio.create_task(bus.replay(wal, rate=200, batch_size=2, live=True))
+    await asyncio.sleep(0.005)
+    await bus.emit(BaseEvent(type="test.event", data="live1"))
+    await bus.emit_many([BaseEvent(type="test.event", data="live2")])
+    assert await replay == 6
+    await bus.emit(BaseEvent(type="test.event", data="live3"))
+    await asyncio.sleep(0.05)
+
+    assert received == [0, 1, 2, 3, 4, 5, "live1", "live2", "live3"]
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_stats_histograms():
+    """Test latency, queue depth and per-pattern handler instrumentation."""
+    bus = InMemoryEventBus(batch_size=1, instrument=True)
+
+    async def slow(event):
+        await asyncio.sleep(0.01)
+
+    def failing(event):
+        if event.data % 2:
+            raise RuntimeError("odd")
+
+    bus.subscribe("task.*", slow)
+    bus.subscribe("task.started", failing, inline=True)
+    bus.subscribe("other.*", slow, lane=True)
+
+    await bus.emit_many(BaseEvent(type="task.started", data=i) for i in range(6))
+    await bus.start()
+    await asyncio.sleep(0.15)
+
+    stats = bus.stats()
+    assert stats["queue_depth"] == 0
+    assert stats["lane_depths"] == {"other.*": 0}
+    assert stats["dispatch_latency"]["count"] == 6
+    # Later events waited in the queue behind the slow handler
+    assert stats["dispatch_latency"]["max"] >= 0.04
+    assert stats["queue_depth_samples"]["count"] >= 1
+
+    slow_stats = stats["handlers"]["task.*"]
+    assert (slow_stats["calls"], slow_stats["errors"]) == (6, 0)
+    assert 0.01 <= slow_stats["time"]["p50"] < 0.05
+    failing_stats = stats["handlers"]["task.started"]
+    assert (failing_stats["calls"], failing_stats["errors"]) == (6, 3)
+    assert stats["handlers"]["other.*"]["calls"] == 0
+    assert bus.metrics.get_metrics()["event_bus.handler_errors"] == 3
+    await bus.stop()
+
+    quiet = InMemoryEventBus()
+    quiet.subscribe("task.*", slow)
+    await quiet.start()
+    await quiet.emit(BaseEvent(type="task.started", data=0))
+    await asyncio.sleep(0.03)
+    assert quiet.stats()["handlers"] == {}
+    assert quiet.stats()["dispatch_latency"]["count"] == 0
+    await quiet.stop()
+
+
+@pytest.mark.asyncio
+async def test_stats_count_lane_drops():
+    """Test that events dropped by a full lane are part of the dropped total."""
+    bus = InMemoryEventBus(lane_size=1, lane_overflow="drop_newest")
+    release = asyncio.Event()
+    received = []
+
+    async def blocked(event):
+        await release.wait()
+        received.append(event.data)
+
+    bus.subscribe("test.*", blocked, lane=True)
+    await bus.start()
+    # One dispatch fills the lane with the first event before its worker runs
+    await bus.emit_many(BaseEvent(type="test.event", data=i) for i in range(5))
+    await asyncio.sleep(0.01)
+    release.set()
+    await asyncio.sleep(0.01)
+
+    assert received == [0]
+    assert bus.metrics.get_metrics()["event_bus.lane.test.*.dropped"] == 4
+    assert bus.stats()["dropped"] == 4
+    await bus.stop()
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+
+import pytest
+
+from core.events import BaseEvent
+from services.event_bus.bus_partitioned import PartitionedEventBus
+
+
+async def _wait_for(predicate, timeout=1.0):
+    for _ in range(int(timeout / 0.01)):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("threaded", [False, True])
+async def test_partitioned_order_per_correlation_id(threaded):
+    bus = PartitionedEventBus(partitions=4, threaded=threaded)
+
+    received: dict[str, list[int]] = {}
+    threads = set()
+    lock = threading.Lock()
+
+    def handler(event):
+        with lock:
+            received.setdefault(event.correlation_id, []).append(event.data)
+            threads.add(threading.current_thread().name)
+
+    bus.subscribe("test.*", handler, inline=True)
+    await bus.start()
+
+    events = [BaseEvent(type="test.event", data=i, correlation_id=f"c{i % 8}") for i in range(80)]
+    await bus.emit_many(events[:40])
+    for event in events[40:]:
+        await bus.emit(event)
+
+    await _wait_for(lambda: sum(map(len, received.values())) == 80)
+    await bus.stop()
+
+    assert received == {f"c{k}": list(range(k, 80, 8)) for k in range(8)}
+    if threaded:
+        assert all(name.startswith("lunacore-event-bus-p") for name in threads)
+
+
+@pytest.mark.asyncio
+async def test_partitioned_subscribe_while_running():
+    bus = PartitionedEventBus(partitions=2, threaded=True)
+    await bus.start()
+
+    received = []
+
+    def handler(event):
+        received.append(event.data)
+
+    bus.subscribe("test.event", handler, inline=True)
+    await bus.emit(BaseEvent(type="test.event", data=1, correlation_id="a"))
+    await _wait_for(lambda: received == [1])
+
+    assert bus.unsubscribe("test.event", handler) is True
+    await bus.emit(BaseEvent(type="test.event", data=2, correlation_id="a"))
+    await asyncio.sleep(0.02)
+    await bus.stop()
+
+    assert received == [1]
+    assert bus.partition_for(BaseEvent(correlation_id="a")) == bus.partition_for(
+        BaseEvent(correlation_id="a")
+    )
+
+
+@pytest.mark.asyncio
+async def test_partitioned_stats_merge_partitions():
+    bus = PartitionedEventBus(partitions=3, instrument=True)
+    received = []
+    bus.subscribe("test.*", lambda e: received.append(e.data), inline=True)
+    await bus.start()
+    await bus.emit_many(
+        BaseEvent(type="test.event", data=i, correlation_id=f"c{i}") for i in range(30)
+    )
+    await _wait_for(lambda: len(received) == 30)
+    await bus.stop()
+
+    stats = bus.stats()
+    assert stats["dispatch_latency"]["count"] == 30
+    assert stats["handlers"]["test.*"]["calls"] == 30
+    assert len(stats["partitions"]) == 3
+    assert sum(p["handlers"]["test.*"]["calls"] for p in stats["partitions"]) == 30
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from core.events import BaseEvent, TaskCompletedEvent, TaskStartedEvent
+from services.event_bus.bus_uds import EventBroker, UnixSocketEventBus
+from services.event_bus.codec import decode_event, encode_event
+
+
+async def _wait_for(predicate, timeout=1.0):
+    for _ in range(int(timeout / 0.01)):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+
+
+def test_codec_roundtrip():
+    event = TaskStartedEvent(
+        task_id="t1", agent_id="a1", data={"n": [1, 2.5, None, b"raw"]}, correlation_id="c"
+    )
+    decoded = decode_event(encode_event(event))
+    assert isinstance(decoded, TaskStartedEvent)
+    assert decoded == event
+
+
+@pytest.mark.asyncio
+async def test_uds_fan_out_between_clients(tmp_path):
+    path = str(tmp_path / "bus.sock")
+    broker = EventBroker(path)
+    await broker.start()
+
+    publisher = UnixSocketEventBus(path)
+    worker1 = UnixSocketEventBus(path)
+    worker2 = UnixSocketEventBus(path)
+
+    received1 = []
+    received2 = []
+
+    async def handler1(event):
+        received1.append(event)
+
+    async def handler2(events):
+        received2.extend(events)
+
+    worker1.subscribe("task.*", handler1)
+    worker2.subscribe("task.completed", handler2, batch=True)
+    for bus in (publisher, worker1, worker2):
+        await bus.start()
+    await asyncio.sleep(0.01)
+
+    await publisher.emit(TaskStartedEvent(task_id="t1", agent_id="a1"))
+    await publisher.emit_many(
+        [TaskCompletedEvent(task_id=f"t{i}", result=i) for i in range(100)]
+        + [BaseEvent(type="other.event")]
+    )
+
+    await _wait_for(lambda: len(received1) == 101 and len(received2) == 100)
+
+    assert received1[0].task_id == "t1"
+    assert [e.result for e in received1[1:]] == list(range(100))
+    assert [e.task_id for e in received2] == [f"t{i}" for i in range(100)]
+
+    # Unsubscribed patterns stop flowing from the broker
+    assert worker1.unsubscribe("task.*", handler1) is True
+    await asyncio.sleep(0.01)
+    await publisher.emit(TaskStartedEvent(task_id="t2", agent_id="a1"))
+    await asyncio.sleep(0.05)
+    assert len(received1) == 101
+
+    for bus in (publisher, worker1, worker2):
+        await bus.stop()
+    await broker.stop()
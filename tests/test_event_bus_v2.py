@@ -1,12 +1,23 @@
 import asyncio
+import contextlib
 import os
 import tempfile
+import time
 
 import pytest
 
-from core.events import BaseEvent
-from services.event_bus.dlq import DLQ
-from services.event_bus.wal import WAL
+from core.events import BaseEvent, TaskCompletedEvent, TaskFailedEvent, TaskStartedEvent
+from services.event_bus.codec import BinaryCodec
+from services.event_bus.dlq import DLQ, DeadLetterStore
+from services.event_bus.timer_wheel import TimerWheel
+from services.event_bus.wal import WAL, SegmentedWAL
+
+
+async def _wait_for(predicate, timeout=1.0):
+    for _ in range(int(timeout / 0.01)):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
 
 
 def test_wal_append_and_recover():
@@ -119,3 +130,408 @@ async def test_dlq_clear():
 
     dlq.clear_dlq()
     assert len(dlq.get_failed_events()) == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("policy", ["always", "batch", "never"])
+async def test_wal_group_commit(tmp_path, monkeypatch, policy):
+    fsyncs = 0
+    real_fsync = os.fsync
+
+    def counting_fsync(fd):
+        nonlocal fsyncs
+        fsyncs += 1
+        real_fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", counting_fsync)
+
+    wal = WAL(str(tmp_path / "events.wal"), fsync=policy, group_size=50, group_interval_ms=50)
+    events = [BaseEvent(type="test.event", data=i) for i in range(100)]
+    await asyncio.gather(*(wal.append_async(e) for e in events))
+
+    assert [e.data for e in wal.recover()] == list(range(100))
+    if policy == "never":
+        assert fsyncs == 0
+    else:
+        # Concurrent appends share commits instead of one fsync each
+        assert 1 <= fsyncs <= 4
+    wal.close()
+
+
+@pytest.mark.asyncio
+async def test_wal_flush_commits_partial_group(tmp_path):
+    wal = WAL(str(tmp_path / "events.wal"), group_size=1000, group_interval_ms=10_000)
+
+    pending = asyncio.ensure_future(wal.append_async(BaseEvent(type="test.event", data=1)))
+    await asyncio.sleep(0.01)
+    assert not pending.done()
+
+    await wal.flush()
+    await pending
+    assert [e.data for e in wal.recover()] == [1]
+
+    # Sync appends share the same long-lived handle
+    wal.append(BaseEvent(type="test.event", data=2))
+    assert [e.data for e in wal.recover()] == [1, 2]
+    wal.close()
+
+
+@pytest.mark.asyncio
+async def test_wal_close_commits_pending_group(tmp_path, monkeypatch):
+    fsyncs = 0
+    real_fsync = os.fsync
+
+    def counting_fsync(fd):
+        nonlocal fsyncs
+        fsyncs += 1
+        real_fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", counting_fsync)
+    path = str(tmp_path / "events.wal")
+    wal = WAL(path, group_size=1000, group_interval_ms=10_000)
+    pending = [
+        asyncio.ensure_future(wal.append_async(BaseEvent(type="test.event", data=i)))
+        for i in range(3)
+    ]
+    await asyncio.sleep(0.01)
+    assert fsyncs == 0
+
+    wal.close()
+    assert fsyncs >= 1
+    await asyncio.wait_for(asyncio.gather(*pending), 1)
+    assert [e.data for e in WAL(path).recover()] == [0, 1, 2]
+
+
+def test_segmented_wal_rotation_checkpoint_and_truncation(tmp_path):
+    wal = SegmentedWAL(str(tmp_path / "wal"), segment_max_bytes=1000)
+    for i in range(50):
+        wal.append(BaseEvent(type="test.event", data=i))
+
+    assert len(wal.segments) > 3
+    assert wal.next_offset == 50
+    assert [e.data for e in wal.recover()] == list(range(50))
+
+    wal.checkpoint(30)
+    assert wal.checkpoint_offset == 30
+    # Segments entirely before the checkpoint are gone; recovery reads only the tail
+    assert all(os.path.exists(p) for p in wal.segments)
+    first_base = int(os.path.basename(wal.segments[0]).split(".")[0])
+    assert 0 < first_base <= 30
+    assert [e.data for e in wal.recover()] == list(range(30, 50))
+    wal.close()
+
+    # Reopening picks up segments, offsets and checkpoint from disk
+    reopened = SegmentedWAL(str(tmp_path / "wal"), segment_max_bytes=1000)
+    assert reopened.next_offset == 50
+    assert reopened.checkpoint_offset == 30
+    reopened.append(BaseEvent(type="test.event", data=50))
+    assert [e.data for e in reopened.recover()] == list(range(30, 51))
+    assert [e.data for e in reopened.recover(from_offset=45)] == list(range(45, 51))
+
+    reopened.checkpoint(51)
+    assert reopened.recover() == []
+    assert len(reopened.segments) == 1
+    reopened.close()
+
+
+def test_segmented_wal_time_rotation(tmp_path):
+    wal = SegmentedWAL(str(tmp_path / "wal"), segment_max_age_s=0)
+    wal.append(BaseEvent(type="test.event", data=1))
+    wal.append(BaseEvent(type="test.event", data=2))
+    assert len(wal.segments) == 2
+    assert [e.data for e in wal.recover()] == [1, 2]
+    wal.close()
+
+
+def test_wal_recover_iter_filters_and_prefetch(tmp_path):
+    wal = WAL(str(tmp_path / "events.wal"))
+    for i in range(20):
+        wal.append(BaseEvent(type="task.started" if i % 2 else "task.completed", data=i))
+    with open(wal.log_file, "a") as f:
+        f.write("not json\n")
+    wal.append(BaseEvent(type="task.failed", data=20))
+
+    it = wal.recover_iter()
+    assert next(it).data == 0  # lazy
+
+    assert [e.data for e in wal.recover_iter(types=["task.started"])] == list(range(1, 20, 2))
+    assert [e.data for e in wal.recover_iter(types=["task.f*"], from_offset=5)] == [20]
+    # The corrupted line still takes an offset
+    assert [e.data for e in wal.recover_iter(from_offset=18)] == [18, 19, 20]
+    assert [e.data for e in wal.recover_iter(prefetch=4)] == list(range(21))
+    wal.close()
+
+
+@pytest.mark.asyncio
+async def test_segmented_wal_arecover_iter(tmp_path):
+    wal = SegmentedWAL(str(tmp_path / "wal"), segment_max_bytes=2000)
+    for i in range(100):
+        wal.append(BaseEvent(type="test.event", data=i))
+    wal.checkpoint(10)
+
+    batches = [b async for b in wal.arecover_iter(batch_size=32, prefetch=2)]
+    assert [len(b) for b in batches] == [32, 32, 26]
+    assert [e.data for b in batches for e in b] == list(range(10, 100))
+
+    # Stopping early does not leave the decoding thread blocked
+    async with contextlib.aclosing(wal.arecover_iter(batch_size=8, prefetch=1)) as batches:
+        async for batch in batches:
+            assert batch[0].data == 10
+            break
+    wal.close()
+
+
+def test_binary_codec_wal(tmp_path):
+    events = [
+        TaskStartedEvent(task_id=f"task{i}", agent_id="coder", data={"attempt": i, "ok": True})
+        for i in range(40)
+    ]
+    wal = SegmentedWAL(str(tmp_path / "bin"), segment_max_bytes=500, codec=BinaryCodec())
+    for e in events[:30]:
+        wal.append(e)
+    assert len(wal.segments) > 2
+
+    recovered = wal.recover()
+    assert [(e.id, e.task_id, e.data) for e in recovered] == [
+        (e.id, e.task_id, e.data) for e in events[:30]
+    ]
+    assert isinstance(recovered[0], TaskStartedEvent)
+    assert recovered[0].timestamp == events[0].timestamp
+    assert list(wal.recover_iter(types=["task.completed"], from_offset=0)) == []
+    wal.close()
+
+    # Simulate a crash mid-write: the torn record is dropped on reopen
+    with open(wal.segments[-1], "ab") as f:
+        f.write(b"\x7f\x01partial")
+    reopened = SegmentedWAL(str(tmp_path / "bin"), segment_max_bytes=500, codec=BinaryCodec())
+    assert reopened.next_offset == 30
+    for e in events[30:]:
+        reopened.append(e)
+    assert [e.task_id for e in reopened.recover()] == [e.task_id for e in events]
+    reopened.close()
+
+    # Interned strings make the binary log smaller than JSON lines
+    json_wal = WAL(str(tmp_path / "events.jsonl"))
+    for e in events:
+        json_wal.append(e)
+    json_wal.close()
+    binary_size = sum(os.path.getsize(p) for p in reopened.segments)
+    assert binary_size < os.path.getsize(json_wal.log_file)
+
+
+def test_binary_codec_rebuilds_models():
+    events = [
+        TaskStartedEvent(task_id="t", agent_id="a", data={"n": 300, "s": "x" * 200}),
+        TaskCompletedEvent(task_id="t", result=None),  # ends the payload with a None
+    ]
+    codec = BinaryCodec()
+    encoder, decoder = codec.new_encoder(), codec.new_decoder()
+    data = b"".join(encoder.encode(e) for e in events)
+    decoded = [decoder.decode(record) for _, record in decoder.records(data)]
+    assert decoded == events
+    assert [type(e) for e in decoded] == [TaskStartedEvent, TaskCompletedEvent]
+    assert decoded[1].model_fields_set == set(TaskCompletedEvent.model_fields)
+    assert decoded[1].model_dump() == events[1].model_dump()
+
+
+def test_jsonl_wal_drops_torn_tail_before_appending(tmp_path):
+    wal = WAL(str(tmp_path / "events.wal"))
+    wal.append(BaseEvent(type="a"))
+    wal.close()
+    with open(wal.log_file, "ab") as f:
+        f.write(b'{"type": "par')  # crash mid-write
+    reopened = WAL(wal.log_file)
+    reopened.append(BaseEvent(type="b"))
+    assert [e.type for e in reopened.recover()] == ["a", "b"]
+    reopened.close()
+
+    segmented = SegmentedWAL(str(tmp_path / "seg"))
+    segmented.append(BaseEvent(type="a"))
+    segmented.close()
+    with open(segmented.segments[-1], "ab") as f:
+        f.write(b'{"type": "par')
+    segmented = SegmentedWAL(str(tmp_path / "seg"))
+    assert segmented.next_offset == 1
+    segmented.append(BaseEvent(type="b"))
+    assert segmented.next_offset == 2
+    assert [e.type for e in segmented.recover_iter(from_offset=1)] == ["b"]
+    assert [e.type for e in segmented.recover()] == ["a", "b"]
+    segmented.close()
+
+
+def _corrupt_string(path, s: bytes) -> None:
+    with open(path, "r+b") as f:
+        data = f.read()
+        f.seek(data.index(s))
+        f.write(b"\xff")
+
+
+def test_binary_wal_stops_at_undecodable_string(tmp_path):
+    # Each event defines a new key string; corrupting the third one ends the valid prefix
+    events = [
+        TaskStartedEvent(task_id=f"t{i}", agent_id="a", data={f"key{i}": i}) for i in range(6)
+    ]
+    wal = WAL(str(tmp_path / "events.wal"), codec=BinaryCodec())
+    for e in events[:5]:
+        wal.append(e)
+    wal.close()
+    _corrupt_string(wal.log_file, b"key2")
+
+    reopened = WAL(wal.log_file, codec=BinaryCodec())
+    assert [e.task_id for e in reopened.recover()] == ["t0", "t1"]
+    reopened.append(events[5])  # truncates the log before appending
+    assert [e.task_id for e in reopened.recover()] == ["t0", "t1", "t5"]
+    reopened.close()
+
+    segmented = SegmentedWAL(str(tmp_path / "seg"), codec=BinaryCodec())
+    for e in events[:5]:
+        segmented.append(e)
+    segmented.close()
+    _corrupt_string(segmented.segments[-1], b"key2")
+    segmented = SegmentedWAL(str(tmp_path / "seg"), codec=BinaryCodec())
+    assert segmented.next_offset == 2
+    segmented.append(events[5])  # takes offset 2, not 5
+    assert [e.task_id for e in segmented.recover_iter(from_offset=2)] == ["t5"]
+    assert [e.task_id for e in segmented.recover()] == ["t0", "t1", "t5"]
+    segmented.close()
+
+
+@pytest.mark.asyncio
+async def test_timer_wheel_cascades_and_cancels():
+    # 4 slots x 3 levels covers 64 ticks: longer delays go through every level
+    wheel = TimerWheel(tick=0.002, slots=4, levels=3)
+    start = time.monotonic()
+    fired: list[tuple[float, float]] = []
+
+    def record(delay):
+        fired.append((delay, time.monotonic() - start))
+
+    delays = [0, 0.001, 0.005, 0.02, 0.05, 0.2, 0.01, 0.13]
+    for d in delays:
+        wheel.schedule(d, record, d)
+    cancelled = wheel.schedule(0.03, record, "cancelled")
+    wheel.cancel(cancelled)
+    assert len(wheel) == len(delays) + 1
+
+    await asyncio.sleep(0.3)
+    assert [d for d, _ in fired] == sorted(delays)
+    assert all(elapsed >= d for d, elapsed in fired)  # never early
+    assert len(wheel) == 0
+
+
+@pytest.mark.asyncio
+async def test_dlq_jittered_backoff():
+    dlq = DLQ(base_delay=0.1, jitter=0.5)
+    for n in range(4):
+        delays = [dlq.backoff(n) for _ in range(50)]
+        assert all(0.05 * 2**n <= d <= 0.1 * 2**n for d in delays)
+        assert len(set(delays)) > 1
+    assert DLQ(jitter=0).backoff(2) == pytest.approx(0.4)
+    with pytest.raises(ValueError):
+        DLQ(jitter=2)
+
+
+class _DeployEvent(BaseEvent):
+    type: str = "deploy.requested"
+    env: str | None = None
+
+
+def test_dead_letters_keep_unregistered_event_classes(tmp_path):
+    path = str(tmp_path / "dead.jsonl")
+    DeadLetterStore(path).add(_DeployEvent(env="prod"), 3, "boom")
+    [letter] = DeadLetterStore(path).page()
+    assert isinstance(letter.event, _DeployEvent)
+    assert letter.event.env == "prod"
+
+
+@pytest.mark.asyncio
+async def test_dlq_persistent_store_paging_and_redrive(tmp_path):
+    path = str(tmp_path / "dead.jsonl")
+    # No jitter: equal delays retry, and so dead-letter, in enqueue order
+    dlq = DLQ(max_retries=1, base_delay=0.01, jitter=0, store=DeadLetterStore(path))
+    attempts: list[str] = []
+    healthy = False
+
+    async def handler(event):
+        attempts.append(event.task_id)
+        if not healthy:
+            raise RuntimeError("downstream unavailable")
+
+    dlq.add_handler(handler)
+    for i in range(6):
+        if i % 2:
+            event = TaskFailedEvent(task_id=f"task{i}", error="boom")
+        else:
+            event = TaskStartedEvent(task_id=f"task{i}", agent_id="coder")
+        dlq.enqueue_failed(event, 0)
+    await _wait_for(lambda: len(dlq.store) == 6)
+    assert len(attempts) == 6
+    assert len(dlq.store) == 6
+
+    # Dead letters survive a restart and keep their event class and fields
+    store = DeadLetterStore(path)
+    page = store.page(offset=2, limit=3)
+    assert [d.event.task_id for d in page] == ["task2", "task3", "task4"]
+    assert isinstance(page[1].event, TaskFailedEvent)
+    assert page[0].retry_count == 1
+    assert "downstream unavailable" in page[0].error
+    assert [d.event.task_id for d in store.page(types=["task.failed"])] == [
+        "task1",
+        "task3",
+        "task5",
+    ]
+
+    healthy = True
+    dlq = DLQ(max_retries=1, store=store)
+    dlq.add_handler(handler)
+    attempts.clear()
+    assert dlq.redrive(types=["task.failed"], where=lambda d: d.event.task_id != "task5") == 2
+    await _wait_for(lambda: len(attempts) == 2)
+    assert sorted(attempts) == ["task1", "task3"]
+
+    # Redriven letters are gone, also after a restart; then redrive the rest in bulk
+    assert len(DeadLetterStore(path)) == 4
+    assert dlq.redrive() == 4
+    await _wait_for(lambda: len(attempts) == 6)
+    assert len(attempts) == 6
+    assert len(DeadLetterStore(path)) == 0
+
+
+@pytest.mark.asyncio
+async def test_dlq_batches_dead_letter_writes(tmp_path, monkeypatch):
+    path = str(tmp_path / "dead.jsonl")
+    store = DeadLetterStore(path)
+    batches: list[int] = []
+    add_many = store.add_many
+
+    def counting_add_many(letters):
+        batches.append(len(letters))
+        return add_many(letters)
+
+    monkeypatch.setattr(store, "add_many", counting_add_many)
+    dlq = DLQ(max_retries=0, store=store)
+    for i in range(100):
+        dlq.enqueue_failed(TaskFailedEvent(task_id=f"task{i}", error="boom"), 0, "boom")
+    assert len(store) == 0  # nothing written on the loop
+    await dlq.flush()
+    assert sum(batches) == 100 and len(batches) < 100
+    assert [d.event.task_id for d in DeadLetterStore(path).page(95)] == [
+        f"task{i}" for i in range(95, 100)
+    ]
+
+
+def test_dead_letter_page_reads_only_the_page(tmp_path, monkeypatch):
+    store = DeadLetterStore(str(tmp_path / "dead.jsonl"))
+    store.add_many(
+        [(TaskFailedEvent(task_id=f"task{i}", error="boom"), 3, None) for i in range(50)]
+    )
+    read = store._read
+    reads: list[int] = []
+
+    def counting_read(seq, f):
+        reads.append(seq)
+        return read(seq, f)
+
+    monkeypatch.setattr(store, "_read", counting_read)
+    assert [d.event.task_id for d in store.page(40, 5)] == [f"task{i}" for i in range(40, 45)]
+    assert len(reads) == 5
@@ -0,0 +1,84 @@
+import asyncio
+import re
+import time
+
+import pytest
+
+from core.events import (
+    BaseEvent,
+    LiteEvent,
+    TaskCompletedEvent,
+    TaskStartedEvent,
+    as_model,
+    new_event_id,
+)
+from services.event_bus.bus_inmem import InMemoryEventBus
+from services.event_bus.codec import BinaryCodec, decode_event, encode_event
+from services.event_bus.wal import WAL
+
+
+def test_event_defaults_are_per_instance():
+    first = BaseEvent(type="test.event")
+    time.sleep(0.002)
+    second = BaseEvent(type="test.event")
+    assert first.id != second.id
+    assert first.timestamp < second.timestamp
+
+
+def test_event_ids_are_monotonic_ulids():
+    ids = [new_event_id() for _ in range(10000)]
+    assert len(set(ids)) == len(ids)
+    assert ids == sorted(ids)
+    assert all(re.fullmatch(r"[0-9A-HJKMNP-TV-Z]{26}", i) for i in ids[:100])
+    # The first 10 chars encode the creation time in milliseconds
+    alphabet = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+    ms = 0
+    for c in ids[-1][:10]:
+        ms = ms * 32 + alphabet.index(c)
+    assert abs(ms - time.time() * 1000) < 5000
+
+
+def test_lite_event_fields_and_conversion():
+    event = LiteEvent("task.started", correlation_id="plan1", task_id="t1", agent_id="coder")
+    assert event.task_id == "t1"
+    assert event.agent_id == "coder"
+    with pytest.raises(AttributeError):
+        event.result  # noqa: B018
+
+    model = event.to_model()
+    assert isinstance(model, TaskStartedEvent)
+    assert (model.id, model.task_id, model.correlation_id) == (event.id, "t1", "plan1")
+    assert model.timestamp == event.timestamp
+    assert as_model(event).id == event.id
+    assert as_model(model) is model
+
+    generic = LiteEvent("custom.event", data={"a": 1}).to_model()
+    assert type(generic) is BaseEvent
+    with pytest.raises(ValueError):
+        LiteEvent("task.completed", task_id="t1").to_model()  # result is required
+
+
+@pytest.mark.asyncio
+async def test_lite_events_on_bus_codec_and_wal(tmp_path):
+    bus = InMemoryEventBus()
+    received = []
+    bus.subscribe("task.*", lambda e: received.append(e.task_id), inline=True)
+    await bus.start()
+    await bus.emit_many(LiteEvent("task.completed", task_id=f"t{i}", result=i) for i in range(3))
+    await asyncio.sleep(0.01)
+    await bus.stop()
+    assert received == ["t0", "t1", "t2"]
+
+    event = LiteEvent("task.completed", task_id="t1", result={"ok": True})
+    decoded = decode_event(encode_event(event))
+    assert isinstance(decoded, TaskCompletedEvent)
+    assert (decoded.id, decoded.result, decoded.timestamp) == (
+        event.id,
+        {"ok": True},
+        event.timestamp,
+    )
+
+    wal = WAL(str(tmp_path / "events.wal"), codec=BinaryCodec())
+    wal.append(event)
+    assert wal.recover()[0].task_id == "t1"
+    wal.close()
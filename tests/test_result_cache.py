@@ -0,0 +1,66 @@
+import pytest
+
+from core.task_graph import Artifact, Task, TaskGraph
+from orchestrator.parallel_executor import ParallelExecutor
+from orchestrator.result_cache import TaskResultCache
+from services.memory.mem_inmem import InMemProjectMemory
+
+
+def _graph(source: str, c_params: dict) -> TaskGraph:
+    a = Task(name="A", inputs=[Artifact(name="src", kind="input", uri=source)])
+    b = Task(name="B", depends_on=[a.compute_id("p")])
+    c = Task(name="C", params=c_params)
+    return TaskGraph(plan_id="p", tasks=[a, b, c])
+
+
+@pytest.mark.asyncio
+async def test_execute_graph_skips_unchanged_tasks(tmp_path):
+    source = tmp_path / "a.txt"
+    source.write_text("v1")
+    cache = TaskResultCache(InMemProjectMemory())
+    executor = ParallelExecutor()
+    ran: list[str] = []
+
+    async def run(task: Task) -> dict:
+        ran.append(task.name)
+        return {"task": task.name, "source": source.read_text()}
+
+    graph = _graph(str(source), {"n": 1})
+    first = await executor.execute_graph(graph, run, cache)
+    assert sorted(ran) == ["A", "B", "C"]
+    assert (cache.hits, cache.misses) == (0, 3)
+
+    # Nothing changed: every result comes from the cache
+    ran.clear()
+    assert await executor.execute_graph(_graph(str(source), {"n": 1}), run, cache) == first
+    assert ran == []
+    assert cache.hits == 3
+
+    # A changed input re-runs its task and everything downstream
+    ran.clear()
+    source.write_text("v2, longer")
+    results = await executor.execute_graph(_graph(str(source), {"n": 1}), run, cache)
+    assert sorted(ran) == ["A", "B"]
+    assert results[graph.tasks[0].compute_id("p")]["source"] == "v2, longer"
+
+    # A changed task definition only re-runs that task
+    ran.clear()
+    await executor.execute_graph(_graph(str(source), {"n": 2}), run, cache)
+    assert ran == ["C"]
+
+
+@pytest.mark.asyncio
+async def test_result_cache_keys_and_uncacheable_results():
+    cache = TaskResultCache(InMemProjectMemory())
+    task = Task(name="A", inputs=[Artifact(name="src", kind="input", uri="s3://bucket/a@v1")])
+    key = await cache.key(task, "p", [])
+    assert key == await cache.key(task, "p", [])
+    # Non-file inputs are identified by their uri; upstream keys are part of the key
+    moved = task.model_copy(update={"inputs": [Artifact(name="src", uri="s3://bucket/a@v2")]})
+    assert await cache.key(moved, "p", []) != key
+    assert await cache.key(task, "p", ["upstream"]) != key
+
+    await cache.put(key, object(), task_id="A")  # not JSON-serializable: skipped
+    assert await cache.get(key) == (False, None)
+    await cache.put(key, [1, "two"], task_id="A")
+    assert await cache.get(key) == (True, [1, "two"])
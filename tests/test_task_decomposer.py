@@ -21,3 +21,13 @@ def test_decompose_sample_plan_yaml():
     h1 = g.stable_hash()
     h2 = agent.decompose(SAMPLE).stable_hash()
     assert h1 == h2
+
+
+def test_decompose_loads_ndjson_task_graph(tmp_path):
+    g = TaskDecomposerAgent().decompose(SAMPLE)
+    path = tmp_path / "graph.ndjson"
+    with open(path, "w", encoding="utf-8") as f:
+        g.write_ndjson(f)
+    loaded = TaskDecomposerAgent().decompose(str(path))
+    assert loaded.stable_hash() == g.stable_hash()
+    assert loaded.task_ids() == g.task_ids()
@@ -1,4 +1,8 @@
-from core.task_graph import Task, TaskGraph
+import io
+
+import pytest
+
+from core.task_graph import Artifact, Task, TaskGraph, ndjson_stable_hash
 
 
 def test_cycle_detection():
@@ -32,3 +36,127 @@ def test_export_json_deterministic():
     j1 = g.to_json()
     j2 = g.to_json()
     assert j1 == j2
+
+
+def test_cached_index_follows_mutations():
+    a = Task(name="A", type="custom", depends_on=[])
+    b = Task(name="B", type="custom", depends_on=[a.compute_id("p")])
+    g = TaskGraph(plan_id="p", tasks=[a, b])
+    h = g.stable_hash()
+    assert g.topological_order() == [a.compute_id("p"), b.compute_id("p")]
+    # A cached index does not take part in equality
+    assert g == TaskGraph(plan_id="p", tasks=[a, b])
+
+    c = Task(name="C", type="custom", depends_on=[b.compute_id("p")])
+    g.tasks.append(c)
+    assert g.topological_order()[-1] == c.compute_id("p")
+    assert g.stable_hash() != h
+
+    # In-place changes are detected too
+    a.depends_on.append(c.compute_id("p"))
+    try:
+        g.validate_acyclic()
+        raise AssertionError("Expected cycle detection to fail")
+    except ValueError:
+        pass
+
+    c.name = "C2"
+    assert f"{c.compute_id('p')}[C2]" in g.to_mermaid()
+    h = g.stable_hash()
+    c.params["n"] = {"k": 1}
+    h1 = g.stable_hash()
+    assert h1 != h
+    c.params["n"]["k"] = True  # equal to 1, but not the same canonical JSON
+    assert g.stable_hash() != h1
+    assert g.task_digests() == TaskGraph(plan_id="p", tasks=[a, b, c]).task_digests()
+    g.plan_id = "q"
+    assert g.task_ids() == [t.compute_id("q") for t in g.tasks]
+
+
+def test_task_digests_and_differing_tasks():
+    a = Task(name="A", type="custom", depends_on=[])
+    b = Task(name="B", type="custom", depends_on=[a.compute_id("p")])
+    c = Task(name="C", id="c", params={"n": 1})
+    g1 = TaskGraph(plan_id="p", tasks=[a, b, c])
+    g2 = TaskGraph(plan_id="p", tasks=[c.model_copy(), b, a.model_copy()])
+    # The root does not depend on task order
+    assert g1.stable_hash() == g2.stable_hash()
+    assert g1.differing_tasks(g2) == []
+    digests = g1.task_digests()
+    assert set(digests) == {a.compute_id("p"), b.compute_id("p"), "c"}
+
+    # Editing a task changes its digest and the root; other digests are kept
+    g2.tasks[0].params = {"n": 2}
+    assert g1.differing_tasks(g2) == ["c"]
+    assert g2.stable_hash() != g1.stable_hash()
+    assert g2.task_digests()[b.compute_id("p")] == digests[b.compute_id("p")]
+
+    # A computed id changes with the content: old and new ids are reported
+    g2.tasks[2].name = "A2"
+    assert g1.differing_tasks(g2) == sorted(["c", a.compute_id("p"), g2.tasks[2].compute_id("p")])
+    assert TaskGraph(plan_id="q", tasks=[a, b, c]).stable_hash() != g1.stable_hash()
+
+
+def test_diff_and_impacted_subgraph():
+    a = Task(name="A", id="a")
+    b = Task(name="B", id="b", depends_on=["a"])
+    c = Task(name="C", id="c", depends_on=["b"])
+    d = Task(name="D", id="d")
+    old = TaskGraph(plan_id="p", tasks=[a, b, c, d])
+
+    e = Task(name="E", id="e", depends_on=["d"])
+    new = TaskGraph(plan_id="p", tasks=[a.model_copy(update={"params": {"v": 2}}), b, c, e])
+    diff = old.diff(new)
+    assert (diff.added, diff.removed, diff.changed) == (["e"], ["d"], ["a"])
+
+    impacted = new.impacted_subgraph(diff.added + diff.removed + diff.changed)
+    assert impacted.task_ids() == ["a", "b", "c", "e"]
+    assert impacted.tasks[3].depends_on == []  # d was removed
+    impacted = new.impacted_subgraph(["b"])
+    assert impacted.task_ids() == ["b", "c"]
+    # Dependencies on unaffected tasks are dropped so the subgraph runs on its own
+    assert impacted.tasks[0].depends_on == []
+    assert impacted.topological_order() == ["b", "c"]
+    assert new.impacted_subgraph(["unknown"]).tasks == []
+
+
+def test_analyze_levels_critical_path_and_slack():
+    a = Task(name="A", id="a")
+    b = Task(name="B", id="b", params={"d": 5}, depends_on=["a"])
+    c = Task(name="C", id="c", params={"d": 2}, depends_on=["a"])
+    d = Task(name="D", id="d", depends_on=["c", "b"])
+    e = Task(name="E", id="e")
+    g = TaskGraph(plan_id="p", tasks=[d, c, b, a, e])
+
+    analysis = g.analyze(lambda t: t.params.get("d", 1.0))
+    assert analysis.levels == [["a", "e"], ["b", "c"], ["d"]] == g.levels()
+    assert (analysis.widest_level, analysis.max_parallelism) == (0, 2)
+    assert (analysis.makespan, analysis.total_work) == (7.0, 10.0)
+    assert analysis.critical_path == ["a", "b", "d"]
+    assert analysis.earliest_start == {"a": 0.0, "e": 0.0, "b": 1.0, "c": 1.0, "d": 6.0}
+    assert analysis.slack == {"a": 0.0, "b": 0.0, "c": 3.0, "d": 0.0, "e": 6.0}
+
+    # Unit durations: the critical path is the longest chain
+    assert g.analyze().critical_path == ["a", "b", "d"]
+    assert TaskGraph(plan_id="p").analyze().max_parallelism == 0
+
+
+def test_ndjson_round_trip_keeps_stable_hash():
+    a = Task(name="A", inputs=[Artifact(name="src", kind="input", uri="file:///tmp/é")])
+    b = Task(name="B", type="test", params={"n": 1}, depends_on=[a.compute_id("p")])
+    g = TaskGraph(plan_id="p", tasks=[a, b])
+    out = io.StringIO()
+    g.write_ndjson(out)
+    lines = out.getvalue().splitlines()
+    assert len(lines) == 3 and '"plan_id":"p"' in lines[0]
+
+    loaded = TaskGraph.read_ndjson(io.StringIO(out.getvalue()))
+    assert loaded.stable_hash() == g.stable_hash()
+    assert loaded.topological_order() == g.topological_order()
+    assert loaded.to_json() == g.to_json()
+    assert ndjson_stable_hash(io.StringIO(out.getvalue())) == g.stable_hash()
+
+    with pytest.raises(ValueError):
+        TaskGraph.read_ndjson(io.StringIO(lines[1] + "\n"))
+    with pytest.raises(ValueError):
+        TaskGraph.read_ndjson(io.StringIO(lines[0] + '\n{"type": "custom"}\n'))